@@ -0,0 +1,243 @@
+"""
+===============================================================================
+🗄️ ALMACÉN COLUMNAR DEL HISTÓRICO (Parquet)
+===============================================================================
+
+La limpieza publica el histórico en dos formatos:
+
+    base_datos_limpia.parquet   almacén de lectura (tipado, columnar)
+    base_datos_limpia.csv       solo exportación (Excel, revisión manual)
+
+Las apps y el entrenamiento leen el Parquet:
+
+    • Proyección de columnas: solo se leen las columnas pedidas
+    • Filtros (predicate pushdown): las estadísticas min/max de cada grupo
+      de filas permiten saltarse los grupos que no cumplen el filtro
+    • contar_filas lee solo el pie del fichero (O(1)) y leer_filas solo los
+      grupos de filas que contienen las posiciones pedidas
+    • Esquema fijo: Proyecto y demás texto → string, columnas numéricas →
+      float64, así los bloques de la limpieza por bloques son compatibles
+    • Sin compresión ni diccionario: lo que cuesta al cargar es decodificar,
+      no leer del disco (1M filas: ~0,1 s frente a ~1,5 s del CSV)
+
+pyarrow es opcional: sin él (o sin el .parquet) se lee el CSV hermano con
+pandas, con la misma interfaz.
+
+===============================================================================
+"""
+
+import os
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+DIRECTORIO = Path(__file__).parent
+RUTA_HISTORICO_DEFECTO = DIRECTORIO / 'base_datos_limpia.parquet'
+FILAS_POR_GRUPO = 65_536
+OPCIONES_ESCRITURA = {'compression': 'none', 'use_dictionary': False}
+
+_OPERADORES = {
+    '==': lambda s, v: s == v,
+    '!=': lambda s, v: s != v,
+    '<': lambda s, v: s < v,
+    '<=': lambda s, v: s <= v,
+    '>': lambda s, v: s > v,
+    '>=': lambda s, v: s >= v,
+    'in': lambda s, v: s.isin(v),
+    'not in': lambda s, v: ~s.isin(v),
+}
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+        return pyarrow
+    except ImportError:
+        return None
+
+
+def _ruta_csv(ruta):
+    return Path(ruta).with_suffix('.csv')
+
+
+def _usar_parquet(ruta):
+    return Path(ruta).suffix == '.parquet' and Path(ruta).exists() and _pyarrow() is not None
+
+
+# ============================================================================
+# ESQUEMA Y ESCRITURA
+# ============================================================================
+
+def esquema_historico(columnas, columnas_numericas):
+    """
+    Esquema Arrow del histórico: numéricas → float64, el resto → string.
+
+    Args:
+        columnas: Todas las columnas en orden
+        columnas_numericas: Las que son numéricas
+    """
+    pa = _pyarrow()
+    numericas = set(columnas_numericas)
+    return pa.schema([(col, pa.float64() if col in numericas else pa.string()) for col in columnas])
+
+
+def a_tabla(df, esquema):
+    """DataFrame → pyarrow.Table con el esquema indicado (sin índice)"""
+    pa = _pyarrow()
+    return pa.Table.from_pandas(df[esquema.names], schema=esquema, preserve_index=False)
+
+
+class EscritorHistorico:
+    """
+    Escribe el Parquet por grupos de filas (limpieza por bloques).
+
+    Se escribe en un temporal que se renombra en cerrar(), así un lector
+    nunca ve un fichero a medias.
+
+    Uso:
+        with EscritorHistorico(ruta, esquema) as escritor:
+            escritor.escribir(df_bloque)
+    """
+
+    def __init__(self, ruta, esquema):
+        self.ruta = Path(ruta)
+        self.esquema = esquema
+        self._temporal = self.ruta.with_name(f'.{self.ruta.name}.tmp')
+        self._escritor = _pyarrow().parquet.ParquetWriter(self._temporal, esquema, **OPCIONES_ESCRITURA)
+
+    def escribir(self, df):
+        if len(df):
+            self._escritor.write_table(a_tabla(df, self.esquema), row_group_size=FILAS_POR_GRUPO)
+
+    def cerrar(self, confirmar=True):
+        """Cierra el fichero; con confirmar=False descarta lo escrito"""
+        self._escritor.close()
+        if confirmar:
+            os.replace(self._temporal, self.ruta)
+        else:
+            self._temporal.unlink(missing_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo_error, error, traza):
+        self.cerrar(confirmar=tipo_error is None)
+        return False
+
+
+def guardar_historico(df, ruta=RUTA_HISTORICO_DEFECTO, columnas_numericas=None):
+    """
+    Guarda el histórico limpio como Parquet (escritura atómica).
+
+    Args:
+        df: DataFrame limpio
+        ruta: Destino .parquet
+        columnas_numericas: Columnas float64 (por defecto, las numéricas de df)
+    """
+    if columnas_numericas is None:
+        columnas_numericas = [c for c in df.columns if pd.api.types.is_numeric_dtype(df[c])]
+    esquema = esquema_historico(list(df.columns), columnas_numericas)
+
+    ruta = Path(ruta)
+    descriptor, temporal = tempfile.mkstemp(dir=ruta.parent, prefix=f'.{ruta.name}.')
+    os.close(descriptor)
+    try:
+        _pyarrow().parquet.write_table(a_tabla(df, esquema), temporal, row_group_size=FILAS_POR_GRUPO,
+                                       **OPCIONES_ESCRITURA)
+        os.replace(temporal, ruta)
+    except BaseException:
+        os.unlink(temporal)
+        raise
+
+
+# ============================================================================
+# LECTURA
+# ============================================================================
+
+def leer_historico(ruta=RUTA_HISTORICO_DEFECTO, columnas=None, filtros=None):
+    """
+    Lee el histórico limpio cargando solo lo necesario.
+
+    Args:
+        ruta: .parquet (si no existe o falta pyarrow se usa el .csv hermano)
+        columnas: Lista de columnas a leer (None = todas)
+        filtros: Lista de tuplas (columna, operador, valor) combinadas con AND;
+                 operadores ==, !=, <, <=, >, >=, in, not in
+
+    Returns:
+        DataFrame
+    """
+    if _usar_parquet(ruta):
+        tabla = _pyarrow().parquet.read_table(ruta, columns=columnas, filters=filtros or None)
+        return tabla.to_pandas()
+
+    columnas_filtro = [f[0] for f in filtros or []]
+    usecols = None if columnas is None else list(dict.fromkeys(list(columnas) + columnas_filtro))
+    df = pd.read_csv(_ruta_csv(ruta), usecols=usecols)
+    if filtros:
+        mascara = pd.Series(True, index=df.index)
+        for columna, operador, valor in filtros:
+            mascara &= _OPERADORES[operador](df[columna], valor)
+        df = df[mascara].reset_index(drop=True)
+    return df if columnas is None else df[list(columnas)]
+
+
+def leer_filas(ruta, indices, columnas=None):
+    """
+    Filas concretas (posiciones 0..n-1, p. ej. vecinos de comparables), en
+    el orden de indices.
+
+    Con Parquet solo se leen los grupos de filas que contienen alguna de las
+    posiciones: el pie del fichero da las filas de cada grupo.
+    """
+    indices = np.asarray(indices, dtype=np.int64).reshape(-1)
+    if not _usar_parquet(ruta):
+        return leer_historico(ruta, columnas).iloc[indices].reset_index(drop=True)
+
+    fichero = _pyarrow().parquet.ParquetFile(ruta)
+    metadatos = fichero.metadata
+    inicios = np.cumsum([0] + [metadatos.row_group(g).num_rows for g in range(metadatos.num_row_groups)])
+    if len(indices) and (indices.min() < 0 or indices.max() >= inicios[-1]):
+        raise IndexError(f"Posiciones fuera de rango (0..{inicios[-1] - 1})")
+
+    grupo = np.searchsorted(inicios, indices, side='right') - 1
+    grupos = np.unique(grupo)
+    tabla = fichero.read_row_groups(grupos.tolist(), columns=columnas)
+    # Posición de cada índice dentro de la tabla con solo esos grupos
+    filas_grupo = inicios[grupos + 1] - inicios[grupos]
+    desplazamiento = np.cumsum(filas_grupo) - filas_grupo
+    locales = indices - inicios[grupo] + desplazamiento[np.searchsorted(grupos, grupo)]
+    return tabla.take(locales).to_pandas()
+
+
+def contar_filas(ruta=RUTA_HISTORICO_DEFECTO):
+    """Nº de filas del histórico (del pie del Parquet, sin leer datos); 0 si no existe"""
+    if _usar_parquet(ruta):
+        return _pyarrow().parquet.ParquetFile(ruta).metadata.num_rows
+    ruta_csv = _ruta_csv(ruta)
+    if not ruta_csv.exists():
+        return 0
+    with open(ruta_csv, 'rb') as f:
+        return max(sum(bloque.count(b'\n') for bloque in iter(lambda: f.read(1 << 20), b'')) - 1, 0)
+
+
+def resolver_historico(ruta=RUTA_HISTORICO_DEFECTO):
+    """Fichero que se leerá realmente (.parquet o .csv hermano), o None"""
+    if _usar_parquet(ruta):
+        return Path(ruta)
+    return _ruta_csv(ruta) if _ruta_csv(ruta).exists() else None
+
+
+def existe_historico(ruta=RUTA_HISTORICO_DEFECTO):
+    """True si hay .parquet legible o .csv hermano"""
+    return resolver_historico(ruta) is not None
+
+
+def columnas_historico(ruta=RUTA_HISTORICO_DEFECTO):
+    """Nombres de columna (del esquema, sin leer datos)"""
+    if _usar_parquet(ruta):
+        return list(_pyarrow().parquet.read_schema(ruta).names)
+    return list(pd.read_csv(_ruta_csv(ruta), nrows=0).columns)
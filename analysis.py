@@ -47,12 +47,576 @@ import pandas as pd
 import numpy as np
 from sklearn.linear_model import LinearRegression
 from sklearn.preprocessing import StandardScaler
-from sklearn.model_selection import cross_val_score, KFold
+from sklearn.model_selection import KFold
 from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
 import pickle
 import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from pathlib import Path
 import matplotlib.pyplot as plt
+from scipy import stats
+from motor_inferencia import MotorLineal
+from almacen_historico import existe_historico, leer_historico
+
+NIVELES_INTERVALO = (0.80, 0.90, 0.95, 0.99)
+
+# ============================================================================
+# ESTADÍSTICOS SUFICIENTES (ENTRENAMIENTO INCREMENTAL)
+# ============================================================================
+
+class EstadisticasSuficientes:
+    """
+    Estadísticos suficientes de una regresión OLS con intercept.
+
+    Con Z = [1 | X] basta con guardar:
+        G = ZᵀZ, b = Zᵀy, n, Σy, Σy²
+
+    para obtener β = G⁻¹·b y las métricas sin volver a leer las filas:
+        SSE = Σy² - 2·βᵀb + βᵀGβ
+        SST = Σy² - (Σy)²/n
+
+    Añadir o quitar k proyectos cuesta O(k·p²); re-resolver cuesta O(p³)
+    con p = nº de variables (despreciable).
+
+    Atributos:
+        variables: Orden de las columnas de X
+        G, b, n, suma_y, suma_y2: Estadísticos acumulados
+    """
+    
+    def __init__(self, variables):
+        self.variables = list(variables)
+        p = len(self.variables) + 1
+        self.G = np.zeros((p, p))
+        self.b = np.zeros(p)
+        self.n = 0
+        self.suma_y = 0.0
+        self.suma_y2 = 0.0
+    
+    @staticmethod
+    def _aumentar(X):
+        X = np.asarray(X, dtype=float)
+        return np.column_stack([np.ones(len(X)), X])
+    
+    def _acumular(self, X, y, signo):
+        Z = self._aumentar(X)
+        y = np.asarray(y, dtype=float)
+        self.G += signo * (Z.T @ Z)
+        self.b += signo * (Z.T @ y)
+        self.n += signo * len(y)
+        self.suma_y += signo * float(y.sum())
+        self.suma_y2 += signo * float(y @ y)
+    
+    def agregar(self, X, y):
+        """Incorpora nuevas filas (proyectos cerrados)"""
+        self._acumular(X, y, +1)
+        return self
+    
+    def eliminar(self, X, y):
+        """Retira filas incorporadas previamente (p. ej. un proyecto corregido)"""
+        if len(y) > self.n:
+            raise ValueError("No se pueden eliminar más filas de las acumuladas")
+        self._acumular(X, y, -1)
+        return self
+    
+    def _sumar(self, otra, signo):
+        if otra.variables != self.variables:
+            raise ValueError("Las variables de ambas acumulaciones no coinciden")
+        self.G += signo * otra.G
+        self.b += signo * otra.b
+        self.n += signo * otra.n
+        self.suma_y += signo * otra.suma_y
+        self.suma_y2 += signo * otra.suma_y2
+        return self
+    
+    def combinar(self, otra):
+        """Suma los estadísticos de otra acumulación sobre las mismas variables"""
+        return self._sumar(otra, +1)
+    
+    def descontar(self, otra):
+        """Resta una acumulación contenida en esta (p. ej. el fold de test)"""
+        if otra.n > self.n:
+            raise ValueError("No se pueden descontar más filas de las acumuladas")
+        return self._sumar(otra, -1)
+    
+    def subconjunto(self, variables):
+        """Copia restringida a `variables` (sub-bloque de G, sin releer datos)"""
+        idx = [0] + [self.variables.index(v) + 1 for v in variables]
+        est = EstadisticasSuficientes(variables)
+        est.G = self.G[np.ix_(idx, idx)].copy()
+        est.b = self.b[idx].copy()
+        est.n, est.suma_y, est.suma_y2 = self.n, self.suma_y, self.suma_y2
+        return est
+    
+    def correlaciones(self):
+        """Correlación de Pearson de cada variable con y (NaN si varianza nula)"""
+        medias = self.G[0, 1:] / self.n
+        media_y = self.suma_y / self.n
+        var_x = np.diag(self.G)[1:] / self.n - medias ** 2
+        var_y = self.suma_y2 / self.n - media_y ** 2
+        cov_xy = self.b[1:] / self.n - medias * media_y
+        with np.errstate(divide='ignore', invalid='ignore'):
+            r = cov_xy / np.sqrt(var_x * var_y)
+        return np.where((var_x > 0) & (var_y > 0), r, np.nan)
+    
+    def resolver(self):
+        """
+        Returns:
+            (intercept, coeficientes) por mínimos cuadrados
+        """
+        if self.n <= len(self.variables):
+            raise ValueError(f"Datos insuficientes: {self.n} filas para {len(self.variables)} variables")
+        try:
+            beta = np.linalg.solve(self.G, self.b)
+        except np.linalg.LinAlgError:
+            beta = np.linalg.lstsq(self.G, self.b, rcond=None)[0]
+        return float(beta[0]), beta[1:]
+    
+    def metricas(self, intercept, coeficientes):
+        """
+        R², RMSE y MAE de unos coeficientes sobre las filas acumuladas.
+
+        El MAE exacto necesitaría los residuos fila a fila; se estima como
+        RMSE·√(2/π) (valor esperado si los residuos son normales).
+        """
+        beta = np.concatenate([[intercept], coeficientes])
+        sse = max(self.suma_y2 - 2 * beta @ self.b + beta @ self.G @ beta, 0.0)
+        sst = self.suma_y2 - self.suma_y ** 2 / self.n
+        rmse = np.sqrt(sse / self.n)
+        return {
+            'r2': 1 - sse / sst if sst > 0 else 0.0,
+            'rmse': float(rmse),
+            'mae': float(rmse * np.sqrt(2 / np.pi)),
+        }
+    
+    def a_campos(self, prefijo=''):
+        """Dict de arrays para guardar en un .npz (p. ej. dentro del artefacto del modelo)"""
+        return {
+            f'{prefijo}variables': np.array(self.variables, dtype=str),
+            f'{prefijo}G': self.G,
+            f'{prefijo}b': self.b,
+            f'{prefijo}n': np.array(self.n),
+            f'{prefijo}suma_y': np.array(self.suma_y),
+            f'{prefijo}suma_y2': np.array(self.suma_y2),
+        }
+    
+    @classmethod
+    def desde_campos(cls, campos, prefijo=''):
+        est = cls(campos[f'{prefijo}variables'].tolist())
+        est.G = np.array(campos[f'{prefijo}G'], dtype=float)
+        est.b = np.array(campos[f'{prefijo}b'], dtype=float)
+        est.n = int(campos[f'{prefijo}n'])
+        est.suma_y = float(campos[f'{prefijo}suma_y'])
+        est.suma_y2 = float(campos[f'{prefijo}suma_y2'])
+        return est
+    
+    def guardar(self, ruta):
+        np.savez(ruta, **self.a_campos())
+    
+    @classmethod
+    def cargar(cls, ruta):
+        with np.load(ruta, allow_pickle=False) as datos:
+            return cls.desde_campos(datos)
+
+
+def _leer_por_bloques(ruta, columnas, tamano_bloque):
+    """Itera DataFrames de como mucho tamano_bloque filas de un CSV o Parquet"""
+    if Path(ruta).suffix.lower() in ('.parquet', '.pq'):
+        import pyarrow.parquet as pq
+        for lote in pq.ParquetFile(ruta).iter_batches(batch_size=tamano_bloque, columns=columnas):
+            yield lote.to_pandas()
+    else:
+        yield from pd.read_csv(ruta, usecols=columnas, chunksize=tamano_bloque)
+
+
+def _fold_por_hash(valores, n_folds, semilla):
+    """
+    Fold de cada fila a partir del hash de sus valores: la asignación no
+    depende del orden de las filas ni del tamaño de bloque.
+    """
+    h = pd.util.hash_pandas_object(pd.DataFrame(valores), index=False,
+                                   hash_key=f'{semilla:016d}'[-16:])
+    return (h.to_numpy() % np.uint64(n_folds)).astype(np.intp)
+
+
+def _modelo_desde_coeficientes(intercept, coeficientes):
+    """LinearRegression de sklearn con coeficientes ya calculados (sin fit)"""
+    modelo = LinearRegression()
+    modelo.coef_ = np.asarray(coeficientes, dtype=float)
+    modelo.intercept_ = float(intercept)
+    modelo.n_features_in_ = len(modelo.coef_)
+    return modelo
+
+
+def _ajustar_ols(X, y):
+    """
+    Mínimos cuadrados con intercept, igual que LinearRegression: se centran
+    X e y, de modo que si falta rango la solución es la de norma mínima en
+    los coeficientes (sin penalizar el intercept).
+    """
+    media_X = X.mean(axis=0)
+    media_y = y.mean()
+    coefs = np.linalg.lstsq(X - media_X, y - media_y, rcond=None)[0]
+    return media_y - media_X @ coefs, coefs
+
+
+def _ajustar(X, y, regularizacion=None):
+    """
+    Ajuste con intercept: OLS, o el mismo ajuste penalizado que eligió
+    entrenar_regularizado (dict con 'tipo', 'l1_ratio' y 'alpha') para que
+    la validación y el bootstrap evalúen el modelo que se sirve.
+    """
+    if not regularizacion:
+        return _ajustar_ols(X, y)
+    camino = camino_regularizacion(X, y, regularizacion['tipo'], regularizacion['l1_ratio'],
+                                   alphas=[regularizacion['alpha']])
+    return camino['intercepts'][0], camino['coeficientes'][0]
+
+
+def _metricas_prediccion(y, y_pred):
+    return {
+        'r2': r2_score(y, y_pred),
+        'rmse': float(np.sqrt(mean_squared_error(y, y_pred))),
+        'mae': mean_absolute_error(y, y_pred),
+    }
+
+
+def _evaluar_kfold(X, y, n_folds, semilla, regularizacion=None):
+    """
+    Una repetición de K-fold: un único ajuste por fold, y todas las métricas
+    (R², RMSE, MAE) a partir de ese ajuste.
+    """
+    resultados = []
+    for train, test in KFold(n_splits=n_folds, shuffle=True, random_state=semilla).split(X):
+        intercept, coefs = _ajustar(X[train], y[train], regularizacion)
+        resultados.append(_metricas_prediccion(y[test], intercept + X[test] @ coefs))
+    return resultados
+
+
+def _bootstrap_bloque(X, y, n_remuestreos, semilla, regularizacion=None):
+    """
+    Un bloque de remuestreos bootstrap resuelto como lote de mínimos cuadrados.
+
+    Remuestrear filas equivale a pesar cada fila por el nº de veces que sale
+    (matriz W de B×n). Las Gram centradas de todos los remuestreos salen de
+    un único producto matricial W·[xᵢxⱼ], y los B sistemas p×p se resuelven
+    apilados. Con regularización cada remuestreo se reajusta con la misma
+    penalización (alpha fija).
+
+    Returns:
+        Array (n_remuestreos, p + 1) con [intercept, coeficientes...]
+    """
+    n, p = X.shape
+    rng = np.random.default_rng(semilla)
+    indices = rng.integers(0, n, size=(n_remuestreos, n))
+    if regularizacion:
+        return np.array([np.r_[_ajustar(X[i], y[i], regularizacion)] for i in indices])
+    W = np.zeros((n_remuestreos, n))
+    np.add.at(W, (np.arange(n_remuestreos)[:, None], indices), 1.0)
+    
+    media_X = W @ X / n
+    media_y = W @ y / n
+    productos = (X[:, :, None] * X[:, None, :]).reshape(n, p * p)
+    G = (W @ productos).reshape(-1, p, p) / n - media_X[:, :, None] * media_X[:, None, :]
+    cruzado = W @ (X * y[:, None]) / n - media_X * media_y[:, None]
+    
+    # pinv: un remuestreo con filas repetidas puede quedar sin rango completo.
+    # rcond se aplica a autovalores de la Gram (cuadrados de los valores
+    # singulares de X), de ahí un umbral mayor que el de lstsq.
+    coefs = np.einsum('bij,bj->bi', np.linalg.pinv(G, rcond=1e-10, hermitian=True), cruzado)
+    intercepts = media_y - np.einsum('bi,bi->b', media_X, coefs)
+    return np.column_stack([intercepts, coefs])
+
+
+def intervalo_bootstrap(X, coeficientes_bootstrap, ruido_bootstrap, nivel=0.95):
+    """
+    Intervalo de predicción por percentiles a partir de remuestreos ya
+    calculados (no vuelve a hacer bootstrap).
+
+    Args:
+        X: Array (m, p) de ofertas
+        coeficientes_bootstrap: Array (B, p + 1) [intercept, coefs]
+        ruido_bootstrap: Array (B,) de residuos remuestreados
+        nivel: Nivel de confianza
+
+    Returns:
+        (inferior, superior) arrays (m,)
+    """
+    X = np.atleast_2d(np.asarray(X, dtype=float))
+    simuladas = (coeficientes_bootstrap[:, :1] + coeficientes_bootstrap[:, 1:] @ X.T
+                 + ruido_bootstrap[:, None])
+    alfa = (1 - nivel) / 2
+    inferior, superior = np.quantile(simuladas, [alfa, 1 - alfa], axis=0)
+    return inferior, superior
+
+
+# ============================================================================
+# CAMINO DE REGULARIZACIÓN (Ridge / Lasso / ElasticNet)
+# ============================================================================
+
+def _estandarizar(X, y):
+    """Centra y escala X (std poblacional; columnas constantes → escala 1) y centra y"""
+    media_X = X.mean(axis=0)
+    escala = X.std(axis=0)
+    escala[escala == 0] = 1.0
+    return (X - media_X) / escala, y - y.mean(), media_X, escala, y.mean()
+
+
+def _rejilla_alphas(Xs, yc, l1_ratio, n_alphas, relacion_min=1e-4):
+    """
+    Rejilla logarítmica decreciente. Con componente L1 empieza en el alpha
+    que anula todos los coeficientes; en Ridge puro, en 10³·s²_max/n.
+    """
+    n = len(yc)
+    if l1_ratio > 0:
+        alpha_max = np.abs(Xs.T @ yc).max() / (n * l1_ratio)
+    else:
+        alpha_max = 1e3 * np.linalg.norm(Xs, 2) ** 2 / n
+    alpha_max = max(alpha_max, 1e-12)
+    return np.geomspace(alpha_max, alpha_max * relacion_min, n_alphas)
+
+
+def _camino_ridge(Xs, yc, alphas):
+    """
+    Ridge para todas las alphas con una sola SVD:
+        β(α) = V · diag(s / (s² + nα)) · Uᵀy
+
+    Returns:
+        (coefs (A, p), diagonal de la matriz sombrero (A, n))
+    """
+    n = len(yc)
+    U, s, Vt = np.linalg.svd(Xs, full_matrices=False)
+    Uty = U.T @ yc
+    factor = s / (s ** 2 + n * alphas[:, None])                     # (A, k)
+    coefs = (factor * Uty) @ Vt
+    palanca = (U ** 2) @ (s * factor).T                             # (n, A)
+    return coefs, palanca.T + 1.0 / n                               # + intercept
+
+
+def _pulir_conjunto_activo(G, c, beta, alpha, l1_ratio):
+    """
+    Solución exacta dado el patrón de signos de beta: resuelve
+        (G_AA + α(1 - l1)·I)·β_A = c_A - α·l1·signo_A
+    y comprueba las condiciones KKT. Devuelve None si no se cumplen.
+    """
+    activas = np.flatnonzero(beta)
+    signo = np.sign(beta[activas])
+    umbral = alpha * l1_ratio
+    nuevo = np.zeros_like(beta)
+    if len(activas):
+        sistema = G[np.ix_(activas, activas)] + alpha * (1 - l1_ratio) * np.eye(len(activas))
+        try:
+            nuevo[activas] = np.linalg.solve(sistema, c[activas] - umbral * signo)
+        except np.linalg.LinAlgError:
+            return None
+        if np.any(np.sign(nuevo[activas]) != signo):
+            return None
+    gradiente = np.abs(c - G @ nuevo)
+    inactivas = np.setdiff1d(np.arange(len(beta)), activas)
+    if np.any(gradiente[inactivas] > umbral * (1 + 1e-9) + 1e-12):
+        return None
+    return nuevo
+
+
+def _camino_elasticnet(Xs, yc, alphas, l1_ratio, tol=1e-10, max_iter=10_000):
+    """
+    Descenso por coordenadas en forma de covarianza (coste por iteración
+    O(p²), independiente de n) recorriendo alphas de mayor a menor con
+    arranque en caliente: la solución de cada alpha inicia la siguiente.
+
+    En cuanto el patrón de signos deja de cambiar entre dos pasadas se
+    resuelve el sistema lineal del conjunto activo y, si cumple KKT, se da
+    por exacta (evita la convergencia lenta con variables muy correladas).
+
+    Minimiza (1/2n)·||y - Xβ||² + α·(l1_ratio·||β||₁ + (1 - l1_ratio)/2·||β||²)
+    """
+    n, p = Xs.shape
+    G = Xs.T @ Xs / n
+    c = Xs.T @ yc / n
+    diagonal = np.diag(G)
+    beta = np.zeros(p)
+    coefs = np.empty((len(alphas), p))
+
+    for a, alpha in enumerate(alphas):
+        umbral = alpha * l1_ratio
+        denominador = diagonal + alpha * (1 - l1_ratio)
+        patron = None
+        for _ in range(max_iter):
+            cambio = 0.0
+            for j in range(p):
+                if diagonal[j] == 0:
+                    continue
+                rho = c[j] - G[j] @ beta + diagonal[j] * beta[j]
+                nuevo = np.sign(rho) * max(abs(rho) - umbral, 0.0) / denominador[j]
+                cambio = max(cambio, abs(nuevo - beta[j]))
+                beta[j] = nuevo
+            if cambio < tol:
+                break
+            patron_actual = np.sign(beta)
+            if patron is not None and np.array_equal(patron, patron_actual):
+                exacta = _pulir_conjunto_activo(G, c, beta, alpha, l1_ratio)
+                if exacta is not None:
+                    beta = exacta
+                    break
+            patron = patron_actual
+        coefs[a] = beta
+    return coefs
+
+
+def camino_regularizacion(X, y, tipo='ridge', l1_ratio=0.5, alphas=None, n_alphas=100):
+    """
+    Coeficientes a lo largo del camino de regularización.
+
+    Las variables se estandarizan (la penalización no depende de sus
+    unidades) y los coeficientes se devuelven en la escala original.
+
+    Args:
+        X, y: Arrays de entrenamiento
+        tipo: 'ridge', 'lasso' o 'elasticnet'
+        l1_ratio: Mezcla L1/L2 de ElasticNet (lasso = 1, ridge = 0)
+        alphas: Rejilla explícita (None = automática, decreciente)
+        n_alphas: Tamaño de la rejilla automática
+
+    Returns:
+        Dict con 'alphas' (A,), 'intercepts' (A,), 'coeficientes' (A, p) y,
+        en Ridge, 'palanca' (A, n) para LOOCV en forma cerrada
+    """
+    l1_ratio = {'ridge': 0.0, 'lasso': 1.0, 'elasticnet': l1_ratio}[tipo]
+    X = np.asarray(X, dtype=float)
+    y = np.asarray(y, dtype=float)
+    Xs, yc, media_X, escala, media_y = _estandarizar(X, y)
+
+    if alphas is None:
+        alphas = _rejilla_alphas(Xs, yc, l1_ratio, n_alphas)
+    alphas = np.sort(np.asarray(alphas, dtype=float))[::-1]
+
+    resultado = {'alphas': alphas, 'tipo': tipo, 'l1_ratio': l1_ratio}
+    if l1_ratio == 0:
+        coefs, resultado['palanca'] = _camino_ridge(Xs, yc, alphas)
+    else:
+        coefs = _camino_elasticnet(Xs, yc, alphas, l1_ratio)
+
+    coefs = coefs / escala
+    resultado['coeficientes'] = coefs
+    resultado['intercepts'] = media_y - coefs @ media_X
+    return resultado
+
+
+def _error_cv_camino(X, y, tipo, l1_ratio, alphas, n_folds, semilla):
+    """
+    Error cuadrático medio de validación para cada alpha.
+
+    Ridge: LOOCV exacto con la palanca de la SVD (eᵢ / (1 - hᵢᵢ)).
+    Lasso/ElasticNet: K-fold (mismos folds que validacion_cruzada), un
+    camino con arranque en caliente por fold.
+    """
+    if tipo == 'ridge':
+        camino = camino_regularizacion(X, y, tipo, alphas=alphas)
+        residuos = y - camino['intercepts'][:, None] - camino['coeficientes'] @ X.T
+        with np.errstate(divide='ignore', invalid='ignore'):
+            loo = residuos / (1 - camino['palanca'])
+        return np.nanmean(loo ** 2, axis=1)
+
+    errores = np.zeros(len(alphas))
+    for train, test in KFold(n_splits=n_folds, shuffle=True, random_state=semilla).split(X):
+        camino = camino_regularizacion(X[train], y[train], tipo, l1_ratio, alphas=alphas)
+        pred = camino['intercepts'][:, None] + camino['coeficientes'] @ X[test].T
+        errores += ((y[test] - pred) ** 2).sum(axis=1)
+    return errores / len(y)
+
+
+# ============================================================================
+# SELECCIÓN EXHAUSTIVA DE SUBCONJUNTOS (Gram compartida)
+# ============================================================================
+
+LIMITE_SUBCONJUNTOS_EXHAUSTIVO = 5_000_000
+
+
+def _rss_subconjunto(C, subconjunto):
+    """
+    RSS de la regresión (con intercept) sobre las columnas `subconjunto`,
+    a partir de la Gram centrada C = [Xc | yc]ᵀ[Xc | yc] (y es la última
+    columna). No reajusta: resuelve un sistema k×k sobre un sub-bloque de C.
+    """
+    syy = C[-1, -1]
+    if not subconjunto:
+        return syy
+    S = list(subconjunto)
+    c = C[S, -1]
+    try:
+        sol = np.linalg.solve(C[np.ix_(S, S)], c)
+    except np.linalg.LinAlgError:
+        sol = np.linalg.lstsq(C[np.ix_(S, S)], c, rcond=None)[0]
+    return max(syy - c @ sol, syy * 1e-15)
+
+
+def _puntuacion_ic(rss, n, k, penalizacion):
+    """AIC (penalizacion=2) o BIC (penalizacion=ln n) con k variables + intercept"""
+    return n * np.log(rss / n) + penalizacion * (k + 1)
+
+
+def _buscar_rama(C, n, penalizacion, incluidas, pendientes, max_variables):
+    """
+    Ramificación y acotación en profundidad para AIC/BIC.
+
+    Cota de un nodo: ningún descendiente (que añade ≥1 variable de
+    `pendientes`) puede tener RSS menor que el de incluidas ∪ pendientes,
+    ni penalización menor que la de |incluidas| + 1 variables.
+
+    Returns:
+        (mejor_puntuacion, mejor_subconjunto, subconjuntos_evaluados)
+    """
+    mejor = [np.inf, (), 0]
+    
+    def visitar(incluidas, pendientes):
+        k = len(incluidas)
+        puntuacion = _puntuacion_ic(_rss_subconjunto(C, incluidas), n, k, penalizacion)
+        mejor[2] += 1
+        if puntuacion < mejor[0]:
+            mejor[0], mejor[1] = puntuacion, tuple(incluidas)
+        
+        if not pendientes or k >= max_variables:
+            return
+        cota = _puntuacion_ic(_rss_subconjunto(C, incluidas + pendientes), n, k + 1, penalizacion)
+        if cota >= mejor[0]:
+            return
+        for i, var in enumerate(pendientes):
+            visitar(incluidas + [var], pendientes[i + 1:])
+    
+    visitar(list(incluidas), list(pendientes))
+    return mejor[0], mejor[1], mejor[2]
+
+
+def _evaluar_subconjuntos_loocv(Xc, C, subconjuntos):
+    """
+    Error LOO (PRESS/n) de cada subconjunto sin reajustar: se reutiliza el
+    sub-bloque de la Gram y hᵢᵢ = 1/n + xcᵢᵀ·C_SS⁻¹·xcᵢ.
+
+    Returns:
+        ((mejor_error, mejor_subconjunto), subconjuntos_evaluados)
+    """
+    n = len(Xc)
+    mejor = (np.inf, ())
+    for S in subconjuntos:
+        S = list(S)
+        if not S:
+            # Modelo solo con intercept: eᵢ/(1 - 1/n)
+            error = C[-1, -1] / n * (n / (n - 1)) ** 2
+        else:
+            inv = np.linalg.pinv(C[np.ix_(S, S)])
+            Xs = Xc[:, S]
+            h = 1.0 / n + np.einsum('ij,jk,ik->i', Xs, inv, Xs)
+            residuos = Xc[:, -1] - Xs @ (inv @ C[S, -1])
+            with np.errstate(divide='ignore', invalid='ignore'):
+                error = np.sum((residuos / (1 - h)) ** 2) / n
+            if not np.isfinite(error):
+                error = np.inf
+        if error < mejor[0]:
+            mejor = (error, tuple(S))
+    return mejor, len(subconjuntos)
+
 
 class ModeloRegresionLineal:
     """
@@ -80,6 +644,8 @@ class ModeloRegresionLineal:
         self.mae = None
         self.historial_entrenamiento = {}
         self.datos_entrenamiento = None
+        self.estadisticas = None
+        self.resultado_bootstrap = None
         
     # ========================================================================
     # PASO 1: SELECCIONAR VARIABLES (Feature Selection)
@@ -121,6 +687,128 @@ class ModeloRegresionLineal:
         
         return self.variables_entrada
     
+    def seleccionar_variables_exhaustivo(self, df, candidatas=None, criterio='bic',
+                                         max_variables=None, n_procesos=None):
+        """
+        Selección del mejor subconjunto de variables (best subset).
+
+        A diferencia de seleccionar_variables (R² univariante con umbral),
+        evalúa subconjuntos completos, por lo que tiene en cuenta la
+        multicolinealidad. Todos los subconjuntos se puntúan a partir de
+        sub-bloques de una única matriz de Gram, sin reajustar el modelo.
+
+        Criterios:
+            'aic' / 'bic': ramificación y acotación (poda ramas que no pueden
+                           mejorar a la mejor solución encontrada)
+            'loocv':       error Leave-One-Out exacto (forma cerrada),
+                           búsqueda exhaustiva
+
+        Args:
+            df: DataFrame limpio
+            candidatas: Columnas candidatas (None = todas las numéricas)
+            criterio: 'aic', 'bic' o 'loocv'
+            max_variables: Tamaño máximo del subconjunto (None = n - 2)
+            n_procesos: Procesos para repartir las ramas (None = todos los núcleos)
+
+        Returns:
+            Lista de variables seleccionadas
+        """
+        print("\n" + "="*80)
+        print(f"🎯 PASO 1: SELECCIÓN EXHAUSTIVA DE VARIABLES (criterio: {criterio.upper()})")
+        print("="*80)
+        
+        if candidatas is None:
+            candidatas = [c for c in df.select_dtypes(include=[np.number]).columns
+                          if c != self.variable_salida]
+        
+        # Variables constantes no aportan información (y hacen singular la Gram)
+        constantes = [c for c in candidatas if df[c].nunique() <= 1]
+        candidatas = [c for c in candidatas if c not in constantes]
+        if constantes:
+            print(f"\n  Descartadas por ser constantes: {', '.join(constantes)}")
+        
+        # Ordenar por correlación univariante: mejores soluciones antes → más poda
+        correlaciones = df[candidatas].corrwith(df[self.variable_salida]).abs()
+        candidatas = correlaciones.sort_values(ascending=False).index.tolist()
+        
+        datos = df[candidatas + [self.variable_salida]].values.astype(float)
+        Xc = datos - datos.mean(axis=0)
+        C = Xc.T @ Xc
+        n, p = len(datos), len(candidatas)
+        
+        if max_variables is None:
+            max_variables = p
+        max_variables = min(max_variables, p, n - 2)
+        
+        inicio = time.perf_counter()
+        
+        if criterio in ('aic', 'bic'):
+            penalizacion = 2.0 if criterio == 'aic' else np.log(n)
+            ramas = [([i], list(range(i + 1, p))) for i in range(p)] if max_variables > 0 else []
+            if n_procesos is None:
+                n_procesos = os.cpu_count() if p >= 15 else 1
+            
+            argumentos = (repeat(C), repeat(n), repeat(penalizacion),
+                          [r[0] for r in ramas], [r[1] for r in ramas], repeat(max_variables))
+            if n_procesos == 1:
+                resultados = list(map(_buscar_rama, *argumentos))
+            else:
+                with ProcessPoolExecutor(max_workers=n_procesos) as pool:
+                    resultados = list(pool.map(_buscar_rama, *argumentos))
+            
+            # Modelo nulo (solo intercept) como referencia
+            resultados.append((_puntuacion_ic(C[-1, -1], n, 0, penalizacion), (), 1))
+            puntuacion, mejor, evaluados = min(resultados, key=lambda r: r[0])[:2] + (
+                sum(r[2] for r in resultados),)
+        
+        elif criterio == 'loocv':
+            from itertools import combinations
+            from math import comb
+            
+            total = sum(comb(p, k) for k in range(max_variables + 1))
+            if total > LIMITE_SUBCONJUNTOS_EXHAUSTIVO:
+                raise ValueError(
+                    f"{total:,} subconjuntos: demasiados para LOOCV exhaustivo. "
+                    f"Reduce max_variables o usa criterio 'aic'/'bic'."
+                )
+            subconjuntos = [S for k in range(max_variables + 1) for S in combinations(range(p), k)]
+            if n_procesos is None:
+                n_procesos = os.cpu_count() if total >= 10_000 else 1
+            
+            if n_procesos == 1:
+                resultados = [_evaluar_subconjuntos_loocv(Xc, C, subconjuntos)]
+            else:
+                bloques = [subconjuntos[i::n_procesos] for i in range(n_procesos)]
+                with ProcessPoolExecutor(max_workers=n_procesos) as pool:
+                    resultados = list(pool.map(_evaluar_subconjuntos_loocv,
+                                               repeat(Xc), repeat(C), bloques))
+            puntuacion, mejor = min((r[0] for r in resultados), key=lambda r: r[0])
+            evaluados = sum(r[1] for r in resultados)
+        
+        else:
+            raise ValueError(f"Criterio desconocido: {criterio} (usar 'aic', 'bic' o 'loocv')")
+        
+        segundos = time.perf_counter() - inicio
+        variables = [candidatas[i] for i in mejor]
+        
+        print(f"\n📌 Candidatas: {p} | Tamaño máximo: {max_variables} | Muestras: {n}")
+        print(f"   Subconjuntos evaluados: {evaluados:,} (de {2**p:,}) en {segundos*1000:.1f} ms")
+        print(f"\n✅ Variables seleccionadas ({len(variables)}):\n")
+        for var in variables:
+            print(f"  • {var}")
+        print(f"\n   Puntuación {criterio.upper()}: {puntuacion:.4f}")
+        
+        self.variables_entrada = variables
+        self.historial_entrenamiento['variables_seleccionadas'] = self.variables_entrada
+        self.historial_entrenamiento['seleccion_exhaustiva'] = {
+            'criterio': criterio,
+            'puntuacion': float(puntuacion),
+            'subconjuntos_evaluados': evaluados,
+            'segundos': segundos,
+        }
+        
+        return self.variables_entrada
+    
     # ========================================================================
     # PASO 2: ENTRENAR MODELO
     # ========================================================================
@@ -165,12 +853,306 @@ class ModeloRegresionLineal:
         # Calcular coeficientes (pesos)
         self._calcular_pesos()
         
+        # Estadísticos suficientes para futuras actualizaciones incrementales
+        self.estadisticas = EstadisticasSuficientes(self.variables_entrada).agregar(X, y)
+        
         # Guardar datos
         self.datos_entrenamiento = df
         self.historial_entrenamiento['r2'] = self.r2_score
         self.historial_entrenamiento['rmse'] = self.rmse
         self.historial_entrenamiento['mae'] = self.mae
+        # Ajuste OLS: deja de aplicar la regularización de un ajuste anterior
+        self.historial_entrenamiento.pop('regularizacion', None)
+        
+    # ========================================================================
+    # PASO 2b: ENTRENAMIENTO INCREMENTAL
+    # ========================================================================
+    
+    def entrenar_incremental(self, df_nuevos=None, df_eliminados=None):
+        """
+        Actualiza el modelo con proyectos nuevos (o retirados) sin reentrenar
+        sobre el histórico completo.
+
+        Usa los estadísticos suficientes (XᵀX, Xᵀy, n, Σy, Σy²) acumulados en
+        entrenar() o leídos en cargar(): el coste es proporcional a las filas
+        nuevas, no al histórico.
+
+        Args:
+            df_nuevos: DataFrame con proyectos a añadir
+            df_eliminados: DataFrame con proyectos a retirar (ya incluidos antes)
+        """
+        if self.estadisticas is None:
+            raise ValueError("Sin estadísticos acumulados. Ejecuta .entrenar() o .cargar() primero.")
+        
+        print("\n" + "="*80)
+        print("⚡ ENTRENAMIENTO INCREMENTAL")
+        print("="*80)
+        
+        for df_cambios, operacion in ((df_nuevos, self.estadisticas.agregar),
+                                      (df_eliminados, self.estadisticas.eliminar)):
+            if df_cambios is not None and len(df_cambios) > 0:
+                operacion(df_cambios[self.variables_entrada].values,
+                          df_cambios[self.variable_salida].values)
+        
+        intercept, coefs = self.estadisticas.resolver()
+        self.modelo = _modelo_desde_coeficientes(intercept, coefs)
+        
+        metricas = self.estadisticas.metricas(intercept, coefs)
+        self.r2_score = metricas['r2']
+        self.rmse = metricas['rmse']
+        self.mae = metricas['mae']
+        
+        print(f"\n📊 Muestras acumuladas: {self.estadisticas.n}")
+        print(f"   • R² score: {self.r2_score:.4f}")
+        print(f"   • RMSE: {self.rmse:.2f} segundos")
+        print(f"   • MAE (estimado): {self.mae:.2f} segundos")
+        
+        self._calcular_pesos()
+        
+        self.historial_entrenamiento['r2'] = self.r2_score
+        self.historial_entrenamiento['rmse'] = self.rmse
+        self.historial_entrenamiento['mae'] = self.mae
+        # Ajuste OLS: deja de aplicar la regularización de un ajuste anterior
+        self.historial_entrenamiento.pop('regularizacion', None)
+        self.historial_entrenamiento['n_muestras'] = self.estadisticas.n
+        
+    # ========================================================================
+    # PASO 2c: ENTRENAMIENTO EN STREAMING (fuera de memoria)
+    # ========================================================================
+    
+    def entrenar_por_bloques(self, ruta, candidatas=None, umbral_correlacion=0.5, n_folds=5,
+                             tamano_bloque=100_000, semilla=42):
+        """
+        Selección de variables, entrenamiento y K-fold en una sola pasada
+        por bloques sobre un CSV o Parquet, sin cargar el histórico entero.
+
+        Por cada bloque se acumulan estadísticos suficientes por fold (cada
+        fila va al fold hash(fila) mod n_folds). Con ellos:
+            • total = Σ folds  → correlaciones, selección y ajuste final
+            • fold k: entrenar con total - fold_k, evaluar con fold_k
+        La memoria depende de tamano_bloque y del nº de variables, no del
+        número de filas. El MAE se estima como RMSE·√(2/π).
+
+        Args:
+            ruta: CSV o Parquet (.parquet/.pq, requiere pyarrow)
+            candidatas: Variables candidatas (None = columnas numéricas;
+                        si ya hay variables_entrada se usan esas sin selección)
+            umbral_correlacion: Como en seleccionar_variables
+            n_folds: Folds para la validación cruzada
+            tamano_bloque: Filas por bloque
+            semilla: Semilla del hash de asignación a folds
+
+        Returns:
+            Dict con métricas del ajuste y de la validación cruzada
+        """
+        print("\n" + "="*80)
+        print(f"🌊 ENTRENAMIENTO EN STREAMING ({Path(ruta).name}, bloques de {tamano_bloque:,})")
+        print("="*80)
+        
+        # Sin variables_entrada se seleccionan entre las candidatas (dadas o inferidas)
+        seleccionar = self.variables_entrada is None
+        if candidatas is None:
+            candidatas = self.variables_entrada
+        if candidatas is None:
+            muestra = next(_leer_por_bloques(ruta, None, 1000))
+            candidatas = [c for c in muestra.select_dtypes(include=[np.number]).columns
+                          if c != self.variable_salida]
+        candidatas = list(candidatas)
+        if not seleccionar:
+            candidatas += [v for v in self.variables_entrada if v not in candidatas]
+        columnas = candidatas + [self.variable_salida]
+        
+        inicio = time.perf_counter()
+        folds = [EstadisticasSuficientes(candidatas) for _ in range(n_folds)]
+        n_bloques = 0
+        for bloque in _leer_por_bloques(ruta, columnas, tamano_bloque):
+            valores = bloque[columnas].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+            valores = valores[~np.isnan(valores).any(axis=1)]
+            asignacion = _fold_por_hash(valores, n_folds, semilla)
+            for k in range(n_folds):
+                filas = valores[asignacion == k]
+                folds[k].agregar(filas[:, :-1], filas[:, -1])
+            n_bloques += 1
+        
+        total = EstadisticasSuficientes(candidatas)
+        for fold in folds:
+            total.combinar(fold)
+        print(f"\n📊 {total.n:,} filas válidas en {n_bloques} bloques "
+              f"({time.perf_counter() - inicio:.2f}s)")
         
+        # Selección por correlación (misma regla que seleccionar_variables)
+        if seleccionar:
+            r2 = total.correlaciones() ** 2
+            orden = [i for i in np.argsort(-np.nan_to_num(r2, nan=-1.0))
+                     if not np.isnan(r2[i]) and r2[i] >= umbral_correlacion]
+            self.variables_entrada = [candidatas[i] for i in orden]
+            print(f"\n✅ Variables seleccionadas ({len(orden)}):")
+            for i in orden:
+                print(f"  • {candidatas[i]:20} → R² = {r2[i]:.4f}")
+            self.historial_entrenamiento['variables_seleccionadas'] = self.variables_entrada
+        
+        # Ajuste final
+        self.estadisticas = total.subconjunto(self.variables_entrada)
+        intercept, coefs = self.estadisticas.resolver()
+        self.modelo = _modelo_desde_coeficientes(intercept, coefs)
+        metricas = self.estadisticas.metricas(intercept, coefs)
+        self.r2_score, self.rmse, self.mae = metricas['r2'], metricas['rmse'], metricas['mae']
+        self.historial_entrenamiento.pop('regularizacion', None)
+
+        print(f"\n📈 R² {self.r2_score:.4f} | RMSE {self.rmse:.2f}s | MAE (estimado) {self.mae:.2f}s")
+        self._calcular_pesos()
+        
+        # K-fold desde los estadísticos por fold
+        resultados = []
+        for fold in folds:
+            test = fold.subconjunto(self.variables_entrada)
+            if test.n == 0:
+                continue
+            entrenamiento = self.estadisticas.subconjunto(self.variables_entrada).descontar(test)
+            if entrenamiento.n <= len(self.variables_entrada):
+                print(f"  ⚠️ Fold omitido: {entrenamiento.n} filas de entrenamiento")
+                continue
+            resultados.append(test.metricas(*entrenamiento.resolver()))
+        
+        if resultados:
+            for metrica in ('r2', 'rmse', 'mae'):
+                scores = np.array([r[metrica] for r in resultados])
+                self.historial_entrenamiento[f'cv_{metrica}'] = {
+                    'media': scores.mean(), 'std': scores.std(), 'scores': scores.tolist()
+                }
+            print(f"\n🔄 {len(resultados)}-Fold (hash): R² {self.historial_entrenamiento['cv_r2']['media']:.4f} "
+                  f"± {self.historial_entrenamiento['cv_r2']['std']:.4f} | "
+                  f"RMSE {self.historial_entrenamiento['cv_rmse']['media']:.2f}s")
+        
+        self.datos_entrenamiento = None
+        self.historial_entrenamiento.update(r2=self.r2_score, rmse=self.rmse, mae=self.mae,
+                                            n_muestras=total.n)
+        return {
+            'n_muestras': total.n,
+            'r2': self.r2_score, 'rmse': self.rmse, 'mae': self.mae,
+            'cv_r2': self.historial_entrenamiento.get('cv_r2'),
+            'cv_rmse': self.historial_entrenamiento.get('cv_rmse'),
+        }
+    
+    # ========================================================================
+    # PASO 2d: ENTRENAMIENTO REGULARIZADO
+    # ========================================================================
+    
+    def entrenar_regularizado(self, df, tipo='ridge', l1_ratio=0.5, n_alphas=100,
+                              n_folds=5, semilla=42):
+        """
+        Entrena con Ridge, Lasso o ElasticNet eligiendo alpha por validación.
+
+        Calcula el camino completo (Ridge: una SVD para todas las alphas;
+        Lasso/ElasticNet: descenso por coordenadas con arranque en caliente)
+        y elige la alpha de menor error de validación (Ridge: LOOCV exacto;
+        resto: K-fold). El resultado es un modelo lineal normal, así que
+        guardar() lo persiste en el mismo artefacto y logic lo sirve igual
+        (sin intervalo analítico, que solo vale para OLS). validacion_cruzada
+        y bootstrap reajustan después con la misma penalización y alpha.
+
+        Args:
+            df: DataFrame de entrenamiento
+            tipo: 'ridge', 'lasso' o 'elasticnet'
+            l1_ratio: Mezcla L1/L2 (solo elasticnet)
+            n_alphas: Puntos del camino
+            n_folds: Folds para Lasso/ElasticNet
+            semilla: Semilla de los folds
+
+        Returns:
+            Dict con alpha elegida, error de validación y el camino completo
+        """
+        if tipo not in ('ridge', 'lasso', 'elasticnet'):
+            raise ValueError(f"Tipo desconocido: {tipo} (usar 'ridge', 'lasso' o 'elasticnet')")
+        
+        print("\n" + "="*80)
+        print(f"🪢 ENTRENAMIENTO REGULARIZADO ({tipo.upper()}, {n_alphas} alphas)")
+        print("="*80)
+        
+        X = df[self.variables_entrada].values.astype(float)
+        y = df[self.variable_salida].values.astype(float)
+        
+        inicio = time.perf_counter()
+        camino = camino_regularizacion(X, y, tipo, l1_ratio, n_alphas=n_alphas)
+        errores = _error_cv_camino(X, y, tipo, l1_ratio, camino['alphas'], n_folds, semilla)
+        mejor = int(np.nanargmin(errores))
+        segundos = time.perf_counter() - inicio
+        
+        alpha = float(camino['alphas'][mejor])
+        self.modelo = _modelo_desde_coeficientes(camino['intercepts'][mejor], camino['coeficientes'][mejor])
+        metricas = _metricas_prediccion(y, self.modelo.predict(X))
+        self.r2_score, self.rmse, self.mae = metricas['r2'], metricas['rmse'], metricas['mae']
+        
+        validacion = 'LOOCV' if tipo == 'ridge' else f'{n_folds}-fold'
+        print(f"\n📌 Alpha elegida: {alpha:.4g} (RMSE {validacion}: {np.sqrt(errores[mejor]):.2f}s)")
+        print(f"   • R² score: {self.r2_score:.4f}")
+        print(f"   • RMSE: {self.rmse:.2f} segundos")
+        print(f"   • MAE: {self.mae:.2f} segundos")
+        print(f"   ⏱️  Camino + validación: {segundos*1000:.1f} ms")
+        
+        self._calcular_pesos()
+        self.estadisticas = EstadisticasSuficientes(self.variables_entrada).agregar(X, y)
+        self.datos_entrenamiento = df
+        
+        self.historial_entrenamiento.update(r2=self.r2_score, rmse=self.rmse, mae=self.mae)
+        self.historial_entrenamiento['regularizacion'] = {
+            'tipo': tipo,
+            'alpha': alpha,
+            'l1_ratio': camino['l1_ratio'],
+            'validacion': validacion,
+            'rmse_validacion': float(np.sqrt(errores[mejor])),
+        }
+        return dict(self.historial_entrenamiento['regularizacion'],
+                    camino=camino, errores_validacion=errores)
+    
+    # ========================================================================
+    # PASO 2e: ENTRENAMIENTO ROBUSTO (SIN OUTLIERS)
+    # ========================================================================
+    
+    def entrenar_robusto(self, df, metodo='influencia'):
+        """
+        Entrena, detecta outliers y reentrena sin ellos.
+        
+        Con metodo='influencia' se usa la distancia de Cook / palanca de la
+        primera regresión, reutilizando su (ZᵀZ) de los estadísticos
+        suficientes; con 'iqr', 'mad' o 'mahalanobis' se analizan las
+        variables de entrada y la objetivo (ver deteccion_outliers.py).
+        
+        Args:
+            df: DataFrame limpio con variables
+            metodo: Método de deteccion_outliers.METODOS
+        
+        Returns:
+            Serie bool (índice de df) con los proyectos excluidos
+        """
+        from deteccion_outliers import METODOS, detectar_outliers
+        
+        if metodo not in METODOS:
+            raise ValueError(f"Método desconocido: {metodo} (usar {', '.join(METODOS)})")
+        
+        if metodo == 'influencia':
+            self.entrenar(df)
+            resultado = detectar_outliers(df, columnas=self.variables_entrada, metodos=(metodo,),
+                                          variable_salida=self.variable_salida,
+                                          estadisticas=self.estadisticas)
+        else:
+            resultado = detectar_outliers(df, columnas=self.variables_entrada + [self.variable_salida],
+                                          metodos=(metodo,))
+        excluidos = resultado['filas']
+        
+        print("\n" + "="*80)
+        print(f"🎯 ENTRENAMIENTO ROBUSTO ({metodo.upper()}): {int(excluidos.sum())} outliers excluidos")
+        print("="*80)
+        if 'Proyecto' in df.columns and excluidos.any():
+            print(f"   • {', '.join(df.loc[excluidos, 'Proyecto'].astype(str))}")
+        
+        self.entrenar(df[~excluidos])
+        self.historial_entrenamiento['robusto'] = {
+            'metodo': metodo,
+            'excluidos': int(excluidos.sum()),
+        }
+        return excluidos
+    
     # ========================================================================
     # PASO 3: CALCULAR Y MOSTRAR PESOS
     # ========================================================================
@@ -241,11 +1223,15 @@ class ModeloRegresionLineal:
         X = df[self.variables_entrada].values
         y = df[self.variable_salida].values
         
-        # Configurar validación cruzada
-        kfold = KFold(n_splits=n_folds, shuffle=True, random_state=42)
-        scores_r2 = cross_val_score(self.modelo, X, y, cv=kfold, scoring='r2')
-        scores_rmse = -cross_val_score(self.modelo, X, y, cv=kfold, scoring='neg_mean_squared_error')
-        scores_rmse = np.sqrt(scores_rmse)
+        # Un solo ajuste por fold para todas las métricas
+        inicio = time.perf_counter()
+        folds = _evaluar_kfold(X, y, n_folds, semilla=42,
+                               regularizacion=self.historial_entrenamiento.get('regularizacion'))
+        self._registrar_tiempo('kfold', time.perf_counter() - inicio)
+        
+        scores_r2 = np.array([f['r2'] for f in folds])
+        scores_rmse = np.array([f['rmse'] for f in folds])
+        scores_mae = np.array([f['mae'] for f in folds])
         
         print(f"\n📊 Resultados de {n_folds}-Fold Cross-Validation:\n")
         print(f"  R² Scores:")
@@ -268,6 +1254,11 @@ class ModeloRegresionLineal:
             'std': scores_rmse.std(),
             'scores': scores_rmse.tolist()
         }
+        self.historial_entrenamiento['cv_mae'] = {
+            'media': scores_mae.mean(),
+            'std': scores_mae.std(),
+            'scores': scores_mae.tolist()
+        }
         
         # Interpretación
         if scores_r2.std() < 0.1:
@@ -276,6 +1267,217 @@ class ModeloRegresionLineal:
             print(f"\n  ⚠️  Modelo inestable (varianza alta entre folds)")
             print(f"     → Puede haber sobrefitting o datos muy variados")
     
+    def _registrar_tiempo(self, nombre, segundos):
+        self.historial_entrenamiento.setdefault('tiempos_cv', {})[nombre] = segundos
+    
+    def validacion_loocv(self, df, comparar_con_reajuste=False):
+        """
+        Leave-One-Out exacto sin reentrenar (forma cerrada de OLS).
+
+        Con la matriz sombrero H = Z·(ZᵀZ)⁻¹·Zᵀ, el residuo al excluir la fila i
+        es eᵢ / (1 - hᵢᵢ), así que un solo ajuste da los n residuos LOO.
+
+        Args:
+            df: DataFrame completo
+            comparar_con_reajuste: Si True, también calcula LOO reajustando n
+                veces y registra ambos tiempos en historial_entrenamiento
+
+        Returns:
+            Dict con r2, rmse, mae y residuos LOO
+        """
+        print(f"\n" + "="*80)
+        print("🔄 VALIDACIÓN LEAVE-ONE-OUT (forma cerrada)")
+        print("="*80)
+        
+        X = df[self.variables_entrada].values.astype(float)
+        y = df[self.variable_salida].values.astype(float)
+        
+        inicio = time.perf_counter()
+        Z = np.column_stack([np.ones(len(X)), X])
+        G_inv = np.linalg.pinv(Z.T @ Z)
+        beta = G_inv @ (Z.T @ y)
+        h = np.einsum('ij,jk,ik->i', Z, G_inv, Z)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            residuos_loo = np.where(h < 1 - 1e-10, (y - Z @ beta) / (1 - h), np.nan)
+        self._registrar_tiempo('loocv_exacto', time.perf_counter() - inicio)
+        
+        validos = ~np.isnan(residuos_loo)
+        if not validos.all():
+            print(f"\n  ⚠️  {(~validos).sum()} punto(s) con palanca total (hᵢᵢ = 1): LOO no definido")
+        
+        press = np.sum(residuos_loo[validos] ** 2)
+        sst = np.sum((y[validos] - y[validos].mean()) ** 2)
+        resultado = {
+            'r2': float(1 - press / sst) if sst > 0 else 0.0,
+            'rmse': float(np.sqrt(press / validos.sum())),
+            'mae': float(np.mean(np.abs(residuos_loo[validos]))),
+            'residuos': residuos_loo.tolist(),
+        }
+        
+        if comparar_con_reajuste:
+            inicio = time.perf_counter()
+            for i in range(len(X)):
+                mascara = np.arange(len(X)) != i
+                _ajustar_ols(X[mascara], y[mascara])
+            self._registrar_tiempo('loocv_reajuste', time.perf_counter() - inicio)
+        
+        print(f"\n  R² LOO (PRESS): {resultado['r2']:.4f}")
+        print(f"  RMSE LOO:       {resultado['rmse']:.2f}s")
+        print(f"  MAE LOO:        {resultado['mae']:.2f}s")
+        for nombre, segundos in self.historial_entrenamiento['tiempos_cv'].items():
+            print(f"  ⏱️  {nombre:<16} {segundos*1000:8.3f} ms")
+        
+        self.historial_entrenamiento['loocv'] = resultado
+        return resultado
+    
+    def validacion_cruzada_repetida(self, df, n_folds=5, n_repeticiones=10, n_procesos=None, semilla=42):
+        """
+        K-fold repetido con distintas particiones aleatorias.
+
+        Cada fold se ajusta una sola vez; las repeticiones se reparten en un
+        pool de procesos.
+
+        Args:
+            df: DataFrame completo
+            n_folds: Número de folds por repetición
+            n_repeticiones: Número de particiones distintas
+            n_procesos: Procesos del pool (None = automático: en serie para
+                        problemas pequeños, todos los núcleos para grandes)
+            semilla: Semilla base (repetición r usa semilla + r)
+
+        Returns:
+            Dict con media/std/scores de r2, rmse y mae sobre todos los folds
+        """
+        print(f"\n" + "="*80)
+        print(f"🔁 VALIDACIÓN CRUZADA REPETIDA ({n_repeticiones} × {n_folds}-Fold)")
+        print("="*80)
+        
+        X = df[self.variables_entrada].values.astype(float)
+        y = df[self.variable_salida].values.astype(float)
+        semillas = [semilla + r for r in range(n_repeticiones)]
+        regularizacion = self.historial_entrenamiento.get('regularizacion')
+        
+        if n_procesos is None:
+            n_procesos = 1 if len(df) * n_repeticiones < 100_000 else os.cpu_count()
+        
+        inicio = time.perf_counter()
+        if n_procesos == 1:
+            repeticiones = [_evaluar_kfold(X, y, n_folds, s, regularizacion) for s in semillas]
+        else:
+            with ProcessPoolExecutor(max_workers=n_procesos) as pool:
+                repeticiones = list(pool.map(_evaluar_kfold, repeat(X), repeat(y), repeat(n_folds), semillas,
+                                             repeat(regularizacion)))
+        self._registrar_tiempo('kfold_repetido', time.perf_counter() - inicio)
+        
+        folds = [f for rep in repeticiones for f in rep]
+        resultado = {}
+        for metrica in ('r2', 'rmse', 'mae'):
+            scores = np.array([f[metrica] for f in folds])
+            resultado[metrica] = {'media': scores.mean(), 'std': scores.std(), 'scores': scores.tolist()}
+        
+        print(f"\n  Folds evaluados: {len(folds)} (procesos: {n_procesos})")
+        print(f"  R²:   {resultado['r2']['media']:.4f} ± {resultado['r2']['std']:.4f}")
+        print(f"  RMSE: {resultado['rmse']['media']:.2f}s ± {resultado['rmse']['std']:.2f}s")
+        print(f"  MAE:  {resultado['mae']['media']:.2f}s ± {resultado['mae']['std']:.2f}s")
+        
+        self.historial_entrenamiento['cv_repetida'] = resultado
+        return resultado
+    
+    # ========================================================================
+    # PASO 4b: INTERVALOS DE CONFIANZA BOOTSTRAP
+    # ========================================================================
+    
+    def bootstrap(self, df, n_remuestreos=2000, nivel=0.95, n_procesos=None,
+                  tamano_bloque=500, semilla=42):
+        """
+        Intervalos de confianza bootstrap para los coeficientes (pesos).
+
+        Los remuestreos se resuelven por bloques como un lote apilado de
+        mínimos cuadrados; los bloques pueden repartirse en un pool de
+        procesos. Las muestras de coeficientes y de residuos se guardan con
+        el modelo (guardar) para calcular intervalos de predicción por oferta
+        sin repetir el bootstrap.
+
+        Args:
+            df: DataFrame de entrenamiento
+            n_remuestreos: Número de remuestreos B
+            nivel: Nivel de confianza de los intervalos
+            n_procesos: Procesos del pool (None = en serie salvo históricos grandes)
+            tamano_bloque: Remuestreos por bloque (acota la memoria)
+            semilla: Semilla (resultado reproducible)
+
+        Returns:
+            Dict {variable: (inferior, superior)} incluyendo 'intercept'
+        """
+        print(f"\n" + "="*80)
+        print(f"🎲 INTERVALOS BOOTSTRAP ({n_remuestreos} remuestreos, nivel {nivel:.0%})")
+        print("="*80)
+        
+        X = df[self.variables_entrada].values.astype(float)
+        y = df[self.variable_salida].values.astype(float)
+        regularizacion = self.historial_entrenamiento.get('regularizacion')
+        
+        bloques = [min(tamano_bloque, n_remuestreos - i) for i in range(0, n_remuestreos, tamano_bloque)]
+        semillas = np.random.SeedSequence(semilla).spawn(len(bloques) + 1)
+        
+        if n_procesos is None:
+            n_procesos = 1 if len(X) * n_remuestreos < 50_000_000 else os.cpu_count()
+        
+        inicio = time.perf_counter()
+        if n_procesos == 1:
+            partes = [_bootstrap_bloque(X, y, b, s, regularizacion) for b, s in zip(bloques, semillas)]
+        else:
+            with ProcessPoolExecutor(max_workers=n_procesos) as pool:
+                partes = list(pool.map(_bootstrap_bloque, repeat(X), repeat(y), bloques, semillas,
+                                       repeat(regularizacion)))
+        muestras = np.vstack(partes)
+        
+        # Ruido para intervalos de predicción: residuos del modelo completo remuestreados
+        residuos = y - self.modelo.predict(X)
+        ruido = np.random.default_rng(semillas[-1]).choice(residuos, size=n_remuestreos)
+        segundos = time.perf_counter() - inicio
+        
+        alfa = (1 - nivel) / 2
+        inferior, superior = np.quantile(muestras, [alfa, 1 - alfa], axis=0)
+        nombres = ['intercept'] + list(self.variables_entrada)
+        intervalos = {nombre: (float(lo), float(hi)) for nombre, lo, hi in zip(nombres, inferior, superior)}
+        
+        print(f"\n  {'Variable':<20} | {'Coeficiente':>12} | {'IC inferior':>12} | {'IC superior':>12}")
+        print(f"  {'-'*66}")
+        valores = [self.modelo.intercept_] + [self.coeficientes[v] for v in self.variables_entrada]
+        for nombre, valor in zip(nombres, valores):
+            lo, hi = intervalos[nombre]
+            print(f"  {nombre:<20} | {valor:>12.4f} | {lo:>12.4f} | {hi:>12.4f}")
+        print(f"\n  ⏱️  {segundos*1000:.1f} ms (procesos: {n_procesos})")
+        
+        self.resultado_bootstrap = {
+            'nivel': nivel,
+            'n_remuestreos': n_remuestreos,
+            'intervalos': intervalos,
+            'coeficientes': muestras,
+            'ruido': ruido,
+        }
+        self.historial_entrenamiento['bootstrap'] = {'nivel': nivel, 'intervalos': intervalos}
+        return intervalos
+    
+    def intervalo_prediccion(self, datos_entrada, nivel=None):
+        """
+        Intervalo de predicción bootstrap para una oferta (usa las muestras
+        cacheadas; no repite el bootstrap).
+
+        Returns:
+            (inferior, superior) en segundos
+        """
+        if self.resultado_bootstrap is None:
+            raise ValueError("Sin muestras bootstrap. Ejecuta .bootstrap() o .cargar() primero.")
+        inferior, superior = intervalo_bootstrap(
+            self._vector_base(datos_entrada),
+            self.resultado_bootstrap['coeficientes'],
+            self.resultado_bootstrap['ruido'],
+            nivel or self.resultado_bootstrap['nivel'],
+        )
+        return float(inferior[0]), float(superior[0])
+    
     # ========================================================================
     # PASO 5: ANÁLISIS DE RESIDUOS
     # ========================================================================
@@ -359,10 +1561,26 @@ class ModeloRegresionLineal:
     # ANÁLISIS DE SENSIBILIDAD
     # ========================================================================
     
+    def _vector_base(self, datos_base):
+        """Dict {variable: valor} → array en el orden de variables_entrada"""
+        if self.modelo is None:
+            raise ValueError("Modelo no entrenado. Ejecuta .entrenar() primero.")
+        for var in self.variables_entrada:
+            if var not in datos_base:
+                raise ValueError(f"Falta variable: {var}")
+        return np.array([datos_base[var] for var in self.variables_entrada], dtype=float)
+    
+    def _predecir_matriz(self, X):
+        """Una única predicción vectorizada sobre toda la matriz de diseño"""
+        return self.modelo.predict(X)
+    
     def analisis_sensibilidad(self, datos_base, variable_ajuste, rango=(-20, 20), pasos=11):
         """
         Analiza cómo cambia el tiempo predicho al variar una variable.
         
+        Todas las variaciones se evalúan en una sola predicción. El cambio de
+        tiempo se mide respecto al caso base (variación 0%).
+        
         Args:
             datos_base: Dict con configuración base
             variable_ajuste: Variable a variar
@@ -372,33 +1590,227 @@ class ModeloRegresionLineal:
         Returns:
             Lista de predicciones con variaciones
         """
-        resultado = []
-        valor_base = datos_base[variable_ajuste]
-        
+        base = self._vector_base(datos_base)
+        j = self.variables_entrada.index(variable_ajuste)
         variaciones = np.linspace(rango[0], rango[1], pasos)
         
-        for pct in variaciones:
-            datos_mod = datos_base.copy()
-            datos_mod[variable_ajuste] = valor_base * (1 + pct/100)
-            tiempo, _ = self.predecir(datos_mod)
-            
-            resultado.append({
+        # Fila 0 = caso base; resto = variaciones
+        X = np.tile(base, (pasos + 1, 1))
+        X[1:, j] = base[j] * (1 + variaciones / 100)
+        tiempos = self._predecir_matriz(X)
+        tiempo_base, tiempos = tiempos[0], tiempos[1:]
+        
+        return [
+            {
                 'variacion_pct': float(pct),
-                'valor': float(datos_mod[variable_ajuste]),
+                'valor': float(valor),
                 'tiempo_predicho': float(tiempo),
-                'cambio_tiempo': float(tiempo - resultado[0]['tiempo_predicho']) if resultado else 0.0
-            })
+                'cambio_tiempo': float(tiempo - tiempo_base)
+            }
+            for pct, valor, tiempo in zip(variaciones, X[1:, j], tiempos)
+        ]
+    
+    def analisis_tornado(self, datos_base, rango=(-20, 20), pasos=11):
+        """
+        Sensibilidad una-a-una de todas las variables de entrada (gráfico tornado).
         
-        return resultado
+        Construye la matriz de diseño completa (base + pasos por variable) y la
+        evalúa con una sola predicción.
+        
+        Returns:
+            Lista ordenada de mayor a menor impacto con, por variable:
+            tiempo mínimo, máximo, amplitud y la curva completa
+        """
+        base = self._vector_base(datos_base)
+        p = len(base)
+        variaciones = np.linspace(rango[0], rango[1], pasos)
+        
+        X = np.tile(base, (1 + p * pasos, 1))
+        for j in range(p):
+            X[1 + j * pasos:1 + (j + 1) * pasos, j] = base[j] * (1 + variaciones / 100)
+        tiempos = self._predecir_matriz(X)
+        tiempo_base = tiempos[0]
+        curvas = tiempos[1:].reshape(p, pasos)
+        
+        resultado = [
+            {
+                'variable': var,
+                'tiempo_min': float(curvas[j].min()),
+                'tiempo_max': float(curvas[j].max()),
+                'amplitud': float(curvas[j].max() - curvas[j].min()),
+                'variacion_pct': variaciones.tolist(),
+                'cambio_tiempo': (curvas[j] - tiempo_base).tolist(),
+            }
+            for j, var in enumerate(self.variables_entrada)
+        ]
+        return sorted(resultado, key=lambda r: r['amplitud'], reverse=True)
+    
+    def superficie_respuesta(self, datos_base, variable_x, variable_y, rango=(-20, 20), pasos=200):
+        """
+        Superficie de respuesta 2-D (p. ej. SPW × Peso) en una sola predicción.
+        
+        Args:
+            datos_base: Dict con configuración base
+            variable_x, variable_y: Variables a barrer
+            rango: Tupla (min%, max%) aplicada a ambas variables
+            pasos: Puntos por eje (pasos × pasos predicciones)
+        
+        Returns:
+            (valores_x, valores_y, tiempos) con tiempos de forma (pasos_y, pasos_x)
+        """
+        base = self._vector_base(datos_base)
+        jx = self.variables_entrada.index(variable_x)
+        jy = self.variables_entrada.index(variable_y)
+        factores = 1 + np.linspace(rango[0], rango[1], pasos) / 100
+        valores_x = base[jx] * factores
+        valores_y = base[jy] * factores
+        
+        malla_x, malla_y = np.meshgrid(valores_x, valores_y)
+        X = np.tile(base, (malla_x.size, 1))
+        X[:, jx] = malla_x.ravel()
+        X[:, jy] = malla_y.ravel()
+        
+        return valores_x, valores_y, self._predecir_matriz(X).reshape(malla_x.shape)
+    
+    def _rangos_globales(self, rangos):
+        """Rangos {variable: (min, max)}; por defecto, los del entrenamiento"""
+        if rangos is None:
+            if self.datos_entrenamiento is None:
+                raise ValueError("Indica los rangos: no hay datos de entrenamiento en memoria")
+            rangos = {var: (self.datos_entrenamiento[var].min(), self.datos_entrenamiento[var].max())
+                      for var in self.variables_entrada}
+        limites = np.array([rangos[var] for var in self.variables_entrada], dtype=float)
+        return limites[:, 0], limites[:, 1] - limites[:, 0]
+    
+    def indices_sobol(self, rangos=None, n_muestras=10000, semilla=42):
+        """
+        Índices de Sobol (primer orden y total) con el esquema de Saltelli.
+        
+        Las N·(p+2) evaluaciones (matrices A, B y A_B⁽ⁱ⁾) se hacen con una sola
+        predicción. Estimadores: Saltelli (2010) para Sᵢ y Jansen para STᵢ.
+        
+        Args:
+            rangos: Dict {variable: (min, max)} de muestreo uniforme
+                    (None = rango observado en el entrenamiento)
+            n_muestras: N (filas de A y B)
+            semilla: Semilla del generador
+        
+        Returns:
+            Dict {variable: {'S1': ..., 'ST': ...}}
+        """
+        minimo, amplitud = self._rangos_globales(rangos)
+        p = len(minimo)
+        rng = np.random.default_rng(semilla)
+        A = minimo + rng.random((n_muestras, p)) * amplitud
+        B = minimo + rng.random((n_muestras, p)) * amplitud
+        
+        AB = np.repeat(A[None, :, :], p, axis=0)
+        for i in range(p):
+            AB[i, :, i] = B[:, i]
+        
+        f = self._predecir_matriz(np.vstack([A, B, AB.reshape(-1, p)]))
+        f_A, f_B = f[:n_muestras], f[n_muestras:2 * n_muestras]
+        f_AB = f[2 * n_muestras:].reshape(p, n_muestras)
+        varianza = np.var(np.concatenate([f_A, f_B]))
+        
+        if varianza == 0:
+            return {var: {'S1': 0.0, 'ST': 0.0} for var in self.variables_entrada}
+        
+        s1 = np.mean(f_B * (f_AB - f_A), axis=1) / varianza
+        st = 0.5 * np.mean((f_A - f_AB) ** 2, axis=1) / varianza
+        return {var: {'S1': float(s1[i]), 'ST': float(st[i])}
+                for i, var in enumerate(self.variables_entrada)}
+    
+    def indices_morris(self, rangos=None, n_trayectorias=100, delta=0.1, semilla=42):
+        """
+        Cribado de Morris (efectos elementales, diseño radial).
+        
+        Cada trayectoria parte de un punto aleatorio y mueve una variable cada
+        vez en `delta` (fracción del rango). Las n·(p+1) evaluaciones se hacen
+        en una sola predicción.
+        
+        Returns:
+            Dict {variable: {'mu_star': ..., 'sigma': ...}} en segundos por
+            fracción `delta` del rango
+        """
+        minimo, amplitud = self._rangos_globales(rangos)
+        p = len(minimo)
+        rng = np.random.default_rng(semilla)
+        puntos = rng.random((n_trayectorias, p)) * (1 - delta)
+        
+        X = np.repeat(puntos[:, None, :], p + 1, axis=1)
+        for i in range(p):
+            X[:, i + 1, i] += delta
+        f = self._predecir_matriz((minimo + X * amplitud).reshape(-1, p)).reshape(n_trayectorias, p + 1)
+        
+        efectos = f[:, 1:] - f[:, :1]
+        return {var: {'mu_star': float(np.abs(efectos[:, i]).mean()), 'sigma': float(efectos[:, i].std())}
+                for i, var in enumerate(self.variables_entrada)}
     
     # ========================================================================
     # GUARDAR/CARGAR MODELO
     # ========================================================================
     
-    def guardar(self, ruta_modelo='modelo_regresion.pkl', ruta_config='config_modelo.json'):
-        """Guarda el modelo entrenado"""
-        with open(ruta_modelo, 'wb') as f:
-            pickle.dump(self.modelo, f)
+    def _campos_artefacto(self):
+        """
+        Campos extra del artefacto versionado: estadísticas de entrenamiento
+        (medias, (ZᵀZ)⁻¹, s, gl) para intervalos analíticos (solo OLS),
+        métricas, estadísticos suficientes y muestras bootstrap.
+        """
+        campos = {
+            'variable_salida': np.array(self.variable_salida),
+            'metricas_nombres': np.array(['r2', 'rmse', 'mae']),
+            'metricas_valores': np.array([self.r2_score, self.rmse, self.mae], dtype=float),
+        }
+        
+        if self.estadisticas is not None:
+            est = self.estadisticas
+            n, p = est.n, len(est.variables)
+            gl = n - p - 1
+            sse = float(self.rmse) ** 2 * n
+            campos.update(n=np.array(n), medias=est.G[0, 1:] / n)
+            # El intervalo t·s·√(1 + zᵀ(ZᵀZ)⁻¹z) es el de OLS: no vale para un
+            # ajuste penalizado (sesgado, con otra covarianza), así que un
+            # artefacto regularizado solo lleva los intervalos bootstrap
+            regularizado = 'regularizacion' in self.historial_entrenamiento
+            if not regularizado:
+                campos.update(
+                    gram_inv=np.linalg.pinv(est.G),
+                    gl=np.array(gl),
+                    s=np.array(np.sqrt(sse / gl) if gl > 0 else np.nan),
+                )
+            if gl > 0 and not regularizado:
+                # Cuantiles t precalculados: el servidor no necesita scipy
+                campos.update(
+                    intervalo_niveles=np.array(NIVELES_INTERVALO),
+                    intervalo_t=stats.t.ppf((1 + np.array(NIVELES_INTERVALO)) / 2, gl),
+                )
+            campos.update(est.a_campos(prefijo='suf_'))
+        
+        if 'residuos' in self.historial_entrenamiento:
+            campos['residuos'] = np.asarray(self.historial_entrenamiento['residuos'], dtype=float)
+        
+        if self.resultado_bootstrap is not None:
+            campos.update(
+                bootstrap_nivel=np.array(self.resultado_bootstrap['nivel']),
+                bootstrap_coeficientes=self.resultado_bootstrap['coeficientes'],
+                bootstrap_ruido=self.resultado_bootstrap['ruido'],
+            )
+        return campos
+    
+    def guardar(self, ruta_artefacto='modelo_lineal.npz', ruta_config='config_modelo.json'):
+        """
+        Guarda el modelo entrenado:
+            • ruta_artefacto: artefacto versionado único (sin pickle, ver motor_inferencia)
+            • ruta_config: JSON legible con coeficientes y métricas (lo usa la UI)
+
+        Returns:
+            Hash de contenido del artefacto
+        """
+        motor = MotorLineal(self.variables_entrada,
+                            [self.coeficientes[v] for v in self.variables_entrada],
+                            self.modelo.intercept_)
+        hash_artefacto = motor.guardar_binario(ruta_artefacto, **self._campos_artefacto())
         
         config = {
             'variables_entrada': self.variables_entrada,
@@ -407,31 +1819,106 @@ class ModeloRegresionLineal:
             'r2_score': float(self.r2_score),
             'rmse': float(self.rmse),
             'mae': float(self.mae),
-            'intercept': float(self.modelo.intercept_)
+            'intercept': float(self.modelo.intercept_),
+            'hash_artefacto': hash_artefacto,
         }
         
+        if self.estadisticas is not None:
+            config['n_muestras'] = int(self.estadisticas.n)
+        
+        # Σ variable / Σ SPW del histórico: logic estima con ella las variables
+        # que la interfaz no pide
+        if self.estadisticas is not None and 'SPW' in self.estadisticas.variables:
+            sumas = dict(zip(self.estadisticas.variables, self.estadisticas.G[0, 1:].tolist()))
+            if sumas['SPW']:
+                config['estimaciones_por_spw'] = {v: suma / sumas['SPW'] for v, suma in sumas.items()
+                                                  if v != 'SPW'}
+        
+        if 'regularizacion' in self.historial_entrenamiento:
+            config['regularizacion'] = self.historial_entrenamiento['regularizacion']
+        if 'robusto' in self.historial_entrenamiento:
+            config['robusto'] = self.historial_entrenamiento['robusto']
+        
+        # Residuos de entrenamiento (para el bootstrap de montecarlo.py)
+        if 'residuos' in self.historial_entrenamiento:
+            config['residuos'] = [float(r) for r in self.historial_entrenamiento['residuos']]
+        
+        # Intervalos bootstrap: resumen en el JSON, muestras en el artefacto
+        if self.resultado_bootstrap is not None:
+            config['bootstrap'] = {
+                'nivel': self.resultado_bootstrap['nivel'],
+                'n_remuestreos': self.resultado_bootstrap['n_remuestreos'],
+                'intervalos': self.resultado_bootstrap['intervalos'],
+            }
+        
         with open(ruta_config, 'w') as f:
             json.dump(config, f, indent=4)
         
-        print(f"✅ Modelo guardado: {ruta_modelo}")
+        print(f"✅ Artefacto guardado: {ruta_artefacto} (hash {hash_artefacto[:12]})")
         print(f"✅ Configuración guardada: {ruta_config}")
+        return hash_artefacto
     
-    def cargar(self, ruta_modelo='modelo_regresion.pkl', ruta_config='config_modelo.json'):
-        """Carga el modelo entrenado"""
-        with open(ruta_modelo, 'rb') as f:
-            self.modelo = pickle.load(f)
+    def cargar(self, ruta_artefacto='modelo_lineal.npz', ruta_config='config_modelo.json',
+               ruta_modelo='modelo_regresion.pkl'):
+        """
+        Carga el modelo entrenado desde el artefacto versionado.
+
+        Si el artefacto no existe se recurre al pickle antiguo (ruta_modelo);
+        para convertirlo de forma permanente usar migrar_desde_pickle().
+        Con el artefacto presente, ruta_config es opcional.
+        """
+        motor = None
+        if Path(ruta_artefacto).exists():
+            # Todos los campos: suf_* y bootstrap_* hacen falta para reentrenar
+            motor = MotorLineal.desde_binario(ruta_artefacto, campos=None)
         
-        with open(ruta_config, 'r') as f:
-            config = json.load(f)
+        if motor is not None and not Path(ruta_config).exists():
+            config = motor.a_config()
+        else:
+            with open(ruta_config, 'r') as f:
+                config = json.load(f)
         
         self.variables_entrada = config['variables_entrada']
+        self.variable_salida = config.get('variable_salida', self.variable_salida)
         self.coeficientes = config['coeficientes']
         self.r2_score = config['r2_score']
         self.rmse = config['rmse']
         self.mae = config['mae']
         
-        print(f"✅ Modelo cargado: {ruta_modelo}")
-        print(f"✅ Configuración cargada: {ruta_config}")
+        if motor is None:
+            with open(ruta_modelo, 'rb') as f:
+                self.modelo = pickle.load(f)
+            print(f"⚠️ Artefacto no encontrado, cargado pickle antiguo: {ruta_modelo}")
+            return
+        
+        campos = motor.artefacto
+        if (campos['variables'].tolist() != list(self.variables_entrada)
+                or config.get('hash_artefacto', motor.hash) != motor.hash):
+            raise ValueError(f"{ruta_artefacto} y {ruta_config} no corresponden al mismo modelo")
+        self.modelo = _modelo_desde_coeficientes(campos['intercept'], campos['coef'])
+        
+        if 'suf_G' in campos:
+            self.estadisticas = EstadisticasSuficientes.desde_campos(campos, prefijo='suf_')
+        
+        if 'residuos' in campos:
+            self.historial_entrenamiento['residuos'] = campos['residuos'].tolist()
+        
+        if 'bootstrap_coeficientes' in campos:
+            resumen = config.get('bootstrap')
+            if resumen is None:
+                # Sin JSON: el resumen se recalcula desde las muestras
+                muestras, nivel = campos['bootstrap_coeficientes'], float(campos['bootstrap_nivel'])
+                inferior, superior = np.quantile(muestras, [(1 - nivel) / 2, (1 + nivel) / 2], axis=0)
+                nombres = ['intercept'] + list(self.variables_entrada)
+                resumen = {'nivel': nivel, 'n_remuestreos': len(muestras),
+                           'intervalos': {v: (float(lo), float(hi)) for v, lo, hi in zip(nombres, inferior, superior)}}
+            self.resultado_bootstrap = dict(resumen,
+                                            coeficientes=campos['bootstrap_coeficientes'],
+                                            ruido=campos['bootstrap_ruido'])
+        
+        print(f"✅ Artefacto cargado: {ruta_artefacto} (hash {motor.hash[:12]})")
+        if Path(ruta_config).exists():
+            print(f"✅ Configuración cargada: {ruta_config}")
     
     # ========================================================================
     # REPORTE COMPLETO
@@ -459,14 +1946,57 @@ class ModeloRegresionLineal:
         print(f"✅ Reporte guardado: {ruta_archivo}")
 
 
+# ============================================================================
+# MIGRACIÓN DESDE EL PICKLE ANTIGUO
+# ============================================================================
+
+def migrar_desde_pickle(ruta_modelo='modelo_regresion.pkl', ruta_config='config_modelo.json',
+                        ruta_datos='base_datos_limpia.parquet', ruta_artefacto='modelo_lineal.npz'):
+    """
+    Convierte modelo_regresion.pkl + config_modelo.json al artefacto versionado.
+
+    Los coeficientes salen del pickle; si ruta_datos existe se recalculan
+    además los estadísticos de entrenamiento (medias, (ZᵀZ)⁻¹, s) y los
+    residuos, necesarios para intervalos y entrenamiento incremental.
+
+    Returns:
+        Hash de contenido del artefacto generado
+    """
+    print("\n🔄 Migrando pickle → artefacto versionado")
+    
+    modelo = ModeloRegresionLineal()
+    with open(ruta_modelo, 'rb') as f:
+        modelo.modelo = pickle.load(f)
+    with open(ruta_config, 'r') as f:
+        config = json.load(f)
+    
+    modelo.variables_entrada = config['variables_entrada']
+    modelo.variable_salida = config.get('variable_salida', modelo.variable_salida)
+    modelo.coeficientes = dict(zip(modelo.variables_entrada, np.ravel(modelo.modelo.coef_).tolist()))
+    modelo.r2_score, modelo.rmse, modelo.mae = config['r2_score'], config['rmse'], config['mae']
+    
+    if existe_historico(ruta_datos):
+        df = leer_historico(ruta_datos, columnas=modelo.variables_entrada + [modelo.variable_salida])
+        X = df[modelo.variables_entrada].values.astype(float)
+        y = df[modelo.variable_salida].values.astype(float)
+        modelo.estadisticas = EstadisticasSuficientes(modelo.variables_entrada).agregar(X, y)
+        modelo.historial_entrenamiento['residuos'] = (y - modelo.modelo.predict(X)).tolist()
+    else:
+        print(f"⚠️ {ruta_datos} no existe: artefacto sin estadísticas de entrenamiento")
+        if 'residuos' in config:
+            modelo.historial_entrenamiento['residuos'] = config['residuos']
+    
+    return modelo.guardar(ruta_artefacto, ruta_config)
+
+
 # ============================================================================
 # SCRIPT DE DEMOSTRACIÓN
 # ============================================================================
 
 if __name__ == "__main__":
     
-    # Cargar datos limpios
-    df = pd.read_csv('base_datos_limpia.csv')
+    # Cargar datos limpios (almacén Parquet; CSV si no existe)
+    df = leer_historico('base_datos_limpia.parquet')
     
     # Crear y entrenar modelo
     modelo = ModeloRegresionLineal()
@@ -481,6 +2011,8 @@ if __name__ == "__main__":
     
     # Paso 4: Validación cruzada
     modelo.validacion_cruzada(df, n_folds=3)
+    modelo.validacion_loocv(df)
+    modelo.bootstrap(df)
     
     # Paso 5: Análisis de residuos
     modelo.analizar_residuos(df)
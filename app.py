@@ -5,15 +5,22 @@ Modelo de Regresión Lineal + Análisis de Sensibilidad
 ===============================================================================
 """
 
+import time
+inicio_rerun = time.perf_counter()
+
 import streamlit as st
 import pandas as pd
 import os
 import json
 import numpy as np
+from io import BytesIO
 from pathlib import Path
-from logic import calcular_ciclo_completo, calcular_capacidad_y_mod
-from report_gen import generar_reporte_pptx_mejorado
-from analysis import ModeloRegresionLineal
+import cache_predicciones
+import logic
+from cache_predicciones import calcular_ciclo_cacheado, calcular_capacidad_cacheada
+from cache_app import estadisticas_cache, huella_artefactos, memorizar
+from report_gen import datos_modelo, generar_reporte_pptx_mejorado
+from almacen_historico import contar_filas, leer_filas, leer_historico, resolver_historico
 
 # ============================================================================
 # CONFIGURACIÓN
@@ -21,15 +28,22 @@ from analysis import ModeloRegresionLineal
 
 st.set_page_config(page_title="Gestamp Factory 21 v3.1", layout="wide")
 DB_FILE = "base_datos_experta.csv"
-DB_LIMPIA = "base_datos_limpia.csv"
+DB_LIMPIA = "base_datos_limpia.parquet"   # base_datos_limpia.csv es solo exportación
 LOGO_TU_EMPRESA = "https://cdn-icons-png.flaticon.com/512/2823/2823528.png"
 
+# Huella (mtime, tamaño) de los ficheros de los que dependen los resultados:
+# forma parte de la clave de todas las funciones cacheadas, así que una nueva
+# limpieza o un reentrenamiento invalida sus entradas sin reiniciar la app
+huellas = huella_artefactos(directorio=Path('.'))
+huella_db = (huellas['base_datos_limpia.parquet'], huellas['base_datos_limpia.csv'])
+huella_modelo = (huellas['config_modelo.json'], huellas['modelo_lineal.npz'], logic.version_modelo())
+
 # ============================================================================
 # CARGAR CONFIGURACIÓN DEL MODELO
 # ============================================================================
 
-@st.cache_resource
-def cargar_config_modelo():
+@memorizar(st.cache_resource, max_entries=2)
+def cargar_config_modelo(huella_config):
     """Carga la configuración del modelo de regresión"""
     try:
         with open('config_modelo.json', 'r') as f:
@@ -37,17 +51,37 @@ def cargar_config_modelo():
     except FileNotFoundError:
         return None
 
-config_modelo = cargar_config_modelo()
+config_modelo = cargar_config_modelo(huellas['config_modelo.json'])
+
+@memorizar(st.cache_resource, max_entries=2)
+def cargar_modelos_segmentados(huella_segmentados):
+    """Familia de modelos por segmento (None si no se ha entrenado)"""
+    try:
+        from modelos_segmentados import ModelosSegmentados
+        return ModelosSegmentados.cargar('modelos_segmentados.npz')
+    except FileNotFoundError:
+        return None
+
+modelos_segmentados = cargar_modelos_segmentados(huellas['modelos_segmentados.npz'])
+
+K_COMPARABLES = 5
+
+@memorizar(st.cache_resource, max_entries=2)
+def cargar_indice_comparables(huella_db):
+    """Índice k-NN del histórico (se reconstruye si cambia la base limpia)"""
+    from comparables import obtener_indice
+    return obtener_indice(DB_LIMPIA)
 
 # ============================================================================
 # OBTENER FACTOR IA
 # ============================================================================
 
-def obtener_factor_ia():
-    if os.path.exists(DB_LIMPIA):
+@memorizar(st.cache_data, max_entries=4)
+def obtener_factor_ia(huella_db, huella_config):
+    if resolver_historico(DB_LIMPIA) is not None:
         try:
-            df_temp = pd.read_csv(DB_LIMPIA)
-            if not df_temp.empty:
+            # Solo el nº de filas: del pie del Parquet, sin leer datos
+            if contar_filas(DB_LIMPIA) > 0:
                 # El factor IA es el R² del modelo (qué % explica)
                 if config_modelo:
                     return 1.0 + (config_modelo.get('r2_score', 0.7) - 0.7) * 0.1
@@ -55,7 +89,125 @@ def obtener_factor_ia():
             st.warning(f"⚠️ Error cargando factor IA: {e}")
     return 1.0
 
-factor_ia = obtener_factor_ia()
+factor_ia = obtener_factor_ia(huella_db, huellas['config_modelo.json'])
+
+# ============================================================================
+# CÁLCULOS CACHEADOS (resultados, figuras, histórico, reporte)
+# ============================================================================
+
+def _png(fig):
+    """Renderiza y cierra la figura; devuelve los bytes PNG"""
+    import matplotlib.pyplot as plt
+    buffer = BytesIO()
+    fig.savefig(buffer, format='png', bbox_inches='tight', dpi=200)
+    plt.close(fig)
+    return buffer.getvalue()
+
+@memorizar(st.cache_data, max_entries=256)
+def calcular_resultados(spw, mastico, tox, tuercas, tuckers, marcado, factor_ia,
+                        dias, turnos, horas, volumenes, p_kit, p_rack, peso, huella_modelo):
+    """Ciclo (fase 1) y plan de capacidad para las entradas del formulario"""
+    res_f1 = calcular_ciclo_cacheado(spw, mastico, tox, 0, tuercas, tuckers, marcado, factor_ia, peso)
+    capacidad = calcular_capacidad_cacheada(
+        res_f1['t_ciclo'], dias, turnos, horas, volumenes, p_kit, p_rack, peso
+    )
+    return res_f1, capacidad
+
+@memorizar(st.cache_data, max_entries=64)
+def figura_desglose(tiempo_soldadores, tiempo_manipulador, t_ciclo):
+    """Gráfico circular del desglose del tiempo de ciclo (PNG)"""
+    import matplotlib.pyplot as plt
+    fig, ax = plt.subplots(figsize=(8, 5))
+    
+    tiempos = [tiempo_soldadores, tiempo_manipulador]
+    labels = [f"Soldadores\n{tiempo_soldadores:.1f}s", 
+              f"Manipulador\n{tiempo_manipulador:.1f}s"]
+    colors = ['#FF6B6B', '#4ECDC4']
+    
+    wedges, texts, autotexts = ax.pie(tiempos, labels=labels, autopct='%1.1f%%',
+                                       colors=colors, startangle=90)
+    ax.set_title(f"Distribución del Tiempo de Ciclo\nTotal: {t_ciclo:.2f}s")
+    
+    for autotext in autotexts:
+        autotext.set_color('white')
+        autotext.set_fontweight('bold')
+    
+    return _png(fig)
+
+@memorizar(st.cache_data, max_entries=128)
+def calcular_sensibilidad(nombre_var, valor_var, spw, mastico, tox, tuercas, tuckers, marcado,
+                          factor_ia, peso, huella_modelo):
+    """Tiempos de ciclo con la variable ±20%: (figura PNG, tabla)"""
+    res_f1 = calcular_ciclo_cacheado(spw, mastico, tox, 0, tuercas, tuckers, marcado, factor_ia, peso)
+    
+    # Calcular variaciones
+    variaciones_pct = np.linspace(-20, 20, 9)
+    tiempos_predichos = []
+    
+    for pct in variaciones_pct:
+        if nombre_var == 'SPW':
+            spw_temp = spw * (1 + pct/100)
+            res_temp = calcular_ciclo_cacheado(spw_temp, mastico, tox, 0, 
+                                               tuercas, tuckers, marcado, factor_ia, peso)
+        else:
+            peso_temp = peso * (1 + pct/100)
+            res_temp = calcular_ciclo_cacheado(spw, mastico, tox, 0, 
+                                               tuercas, tuckers, marcado, factor_ia, peso_temp)
+        
+        tiempos_predichos.append(res_temp['t_ciclo'])
+    
+    # Gráfico
+    import matplotlib.pyplot as plt
+    fig, ax = plt.subplots(figsize=(8, 4))
+    
+    ax.plot(variaciones_pct, tiempos_predichos, marker='o', linewidth=2, markersize=8, color='#FF6B6B')
+    ax.axvline(x=0, color='green', linestyle='--', alpha=0.5, label='Base')
+    ax.axhline(y=res_f1['t_ciclo'], color='green', linestyle='--', alpha=0.5)
+    
+    ax.set_xlabel('Variación (%)', fontsize=12, fontweight='bold')
+    ax.set_ylabel('Tiempo de Ciclo (s)', fontsize=12, fontweight='bold')
+    ax.set_title(f'Impacto de {nombre_var} en Tiempo de Ciclo')
+    ax.grid(True, alpha=0.3)
+    
+    # Tabla de datos
+    df_sensibilidad = pd.DataFrame({
+        'Variación (%)': variaciones_pct,
+        'Valor': [valor_var * (1 + pct/100) for pct in variaciones_pct],
+        'Tiempo (s)': tiempos_predichos,
+        'Cambio (s)': [t - res_f1['t_ciclo'] for t in tiempos_predichos],
+    })
+    
+    return _png(fig), df_sensibilidad
+
+@memorizar(st.cache_data, max_entries=32)
+def generar_pptx(datos_reporte, imagen):
+    """Bytes del reporte PPTX (imagen: bytes de la foto del producto o None)"""
+    return generar_reporte_pptx_mejorado(datos_reporte, BytesIO(imagen) if imagen else None)
+
+@memorizar(st.cache_data, max_entries=4)
+def estadisticas_historico(huella_db):
+    """Muestras, media, mínimo y máximo de Tiempo_Real_Ofertado"""
+    # Las estadísticas solo necesitan la columna objetivo
+    tiempos = leer_historico(DB_LIMPIA, columnas=['Tiempo_Real_Ofertado'])['Tiempo_Real_Ofertado']
+    return {'muestras': len(tiempos), 'media': tiempos.mean(), 'minimo': tiempos.min(),
+            'maximo': tiempos.max()}
+
+@memorizar(st.cache_data, max_entries=256)
+def buscar_comparables(spw, peso, huella_db):
+    """Proyectos más parecidos a la oferta (solo se leen sus filas), o None"""
+    indice = cargar_indice_comparables(huella_db)
+    if indice is None or indice.n == 0:
+        return None
+    vecinos = indice.buscar({'SPW': spw, 'Peso': peso}, k=K_COMPARABLES)
+    df_vecinos = leer_filas(DB_LIMPIA, vecinos['indices'])
+    df_vecinos.insert(0, 'Distancia', np.round(vecinos['distancias'], 3))
+    return {'tabla': df_vecinos, 'variables': vecinos['variables'],
+            'tiempo_medio': float(np.mean(vecinos['tiempos']))}
+
+@memorizar(st.cache_data, max_entries=2)
+def cargar_historico_completo(huella_db):
+    """Tabla entera del histórico limpio"""
+    return leer_historico(DB_LIMPIA)
 
 # ============================================================================
 # INTERFAZ PRINCIPAL
@@ -207,9 +359,9 @@ if boton_generar:
     st.header("📊 RESULTADOS DEL ANÁLISIS")
     
     # Realizar cálculos
-    res_f1 = calcular_ciclo_completo(spw, mastico, tox, 0, tuercas, tuckers, marcado, factor_ia)
-    t_man, n_mod, sat, cap_max, res_anual = calcular_capacidad_y_mod(
-        res_f1['t_ciclo'], dias, turnos, horas, volumenes, p_kit, p_rack, peso
+    res_f1, (t_man, n_mod, sat, cap_max, res_anual) = calcular_resultados(
+        spw, mastico, tox, tuercas, tuckers, marcado, factor_ia,
+        dias, turnos, horas, volumenes, p_kit, p_rack, peso, huella_modelo
     )
     
     # Row 1: Métricas principales
@@ -239,23 +391,8 @@ if boton_generar:
         tiempo_manipulador = res_f1.get('t_manipulador', res_f1['t_ciclo'] * 0.3)
         
         # Gráfico circular
-        import matplotlib.pyplot as plt
-        fig, ax = plt.subplots(figsize=(8, 5))
-        
-        tiempos = [tiempo_soldadores, tiempo_manipulador]
-        labels = [f"Soldadores\n{tiempo_soldadores:.1f}s", 
-                  f"Manipulador\n{tiempo_manipulador:.1f}s"]
-        colors = ['#FF6B6B', '#4ECDC4']
-        
-        wedges, texts, autotexts = ax.pie(tiempos, labels=labels, autopct='%1.1f%%',
-                                           colors=colors, startangle=90)
-        ax.set_title(f"Distribución del Tiempo de Ciclo\nTotal: {res_f1['t_ciclo']:.2f}s")
-        
-        for autotext in autotexts:
-            autotext.set_color('white')
-            autotext.set_fontweight('bold')
-        
-        st.pyplot(fig)
+        st.image(figura_desglose(tiempo_soldadores, tiempo_manipulador, res_f1['t_ciclo']),
+                 use_container_width=True)
     
     with col_d2:
         st.subheader("📦 Plan de Capacidad (Años)")
@@ -287,6 +424,15 @@ if boton_generar:
         st.write(f"**Modelo utilizado:** {res_f1.get('modelo', 'Desconocido')}")
         if res_f1.get('r2') and res_f1.get('r2') > 0:
             st.write(f"**R² Score:** {res_f1.get('r2'):.2%}")
+        if modelos_segmentados is not None:
+            # Solo si el segmento tiene modelo propio (si no, coincide con el global)
+            t_segmento, segmento = logic.calcular_ciclo_segmento(
+                modelos_segmentados, proyecto, oem, spw, mastico, tuckers, factor_ia, peso)
+            if segmento != 'GLOBAL':
+                st.write(f"**Modelo del segmento {segmento}:** {t_segmento:.1f}s")
+        if res_f1.get('t_ciclo_inferior') is not None:
+            st.write(f"**Intervalo {res_f1['nivel_intervalo']:.0%}:** "
+                     f"[{res_f1['t_ciclo_inferior']:.1f}s, {res_f1['t_ciclo_superior']:.1f}s]")
         st.write(f"**Factor IA:** {factor_ia:.3f}")
     
     with col_info2:
@@ -304,11 +450,16 @@ if boton_generar:
             "spw": spw,
             "peso": peso,
             "cap_max": cap_max,
-            "res_anual": res_anual
+            "res_anual": res_anual,
+            "t_ciclo_inferior": res_f1.get('t_ciclo_inferior'),
+            "t_ciclo_superior": res_f1.get('t_ciclo_superior'),
+            "nivel_intervalo": res_f1.get('nivel_intervalo'),
+            "mae": 11,
+            **datos_modelo(config_modelo),
         }
         
         try:
-            pptx_bytes = generar_reporte_pptx_mejorado(datos_reporte, img_p)
+            pptx_bytes = generar_pptx(datos_reporte, img_p.getvalue() if img_p else None)
             st.download_button(
                 label="📥 DESCARGAR REPORTE PPTX",
                 data=pptx_bytes,
@@ -331,8 +482,6 @@ if boton_sensibilidad:
     cada variable de entrada (±20%).
     """)
     
-    res_f1 = calcular_ciclo_completo(spw, mastico, tox, 0, tuercas, tuckers, marcado, factor_ia)
-    
     # Análisis de cada variable
     col_s1, col_s2 = st.columns(2)
     
@@ -345,46 +494,11 @@ if boton_sensibilidad:
         with [col_s1, col_s2][idx]:
             st.subheader(f"Sensibilidad: {nombre_var}")
             
-            # Calcular variaciones
-            variaciones_pct = np.linspace(-20, 20, 9)
-            tiempos_predichos = []
-            
-            for pct in variaciones_pct:
-                if nombre_var == 'SPW':
-                    spw_temp = spw * (1 + pct/100)
-                    res_temp = calcular_ciclo_completo(spw_temp, mastico, tox, 0, 
-                                                       tuercas, tuckers, marcado, factor_ia)
-                else:
-                    peso_temp = peso * (1 + pct/100)
-                    # Recalcular con peso diferente (aproximación)
-                    res_temp = calcular_ciclo_completo(spw, mastico, tox, 0, 
-                                                       tuercas, tuckers, marcado, factor_ia)
-                
-                tiempos_predichos.append(res_temp['t_ciclo'])
-            
-            # Gráfico
-            import matplotlib.pyplot as plt
-            fig, ax = plt.subplots(figsize=(8, 4))
-            
-            ax.plot(variaciones_pct, tiempos_predichos, marker='o', linewidth=2, markersize=8, color='#FF6B6B')
-            ax.axvline(x=0, color='green', linestyle='--', alpha=0.5, label='Base')
-            ax.axhline(y=res_f1['t_ciclo'], color='green', linestyle='--', alpha=0.5)
-            
-            ax.set_xlabel('Variación (%)', fontsize=12, fontweight='bold')
-            ax.set_ylabel('Tiempo de Ciclo (s)', fontsize=12, fontweight='bold')
-            ax.set_title(f'Impacto de {nombre_var} en Tiempo de Ciclo')
-            ax.grid(True, alpha=0.3)
-            
-            st.pyplot(fig)
-            
-            # Tabla de datos
-            df_sensibilidad = pd.DataFrame({
-                'Variación (%)': variaciones_pct,
-                'Valor': [valor_var * (1 + pct/100) for pct in variaciones_pct],
-                'Tiempo (s)': tiempos_predichos,
-                'Cambio (s)': [t - res_f1['t_ciclo'] for t in tiempos_predichos],
-            })
-            
+            figura, df_sensibilidad = calcular_sensibilidad(
+                nombre_var, valor_var, spw, mastico, tox, tuercas, tuckers, marcado,
+                factor_ia, peso, huella_modelo
+            )
+            st.image(figura, use_container_width=True)
             st.dataframe(df_sensibilidad, use_container_width=True, hide_index=True)
 
 # ============================================================================
@@ -395,24 +509,36 @@ if boton_comparativa:
     st.divider()
     st.header("📋 COMPARATIVA CON DATOS HISTÓRICOS")
     
-    if os.path.exists(DB_LIMPIA):
-        df_historico = pd.read_csv(DB_LIMPIA)
+    if resolver_historico(DB_LIMPIA) is not None:
+        estadisticas = estadisticas_historico(huella_db)
+        
+        # Proyectos más parecidos a la oferta actual (solo se leen sus filas)
+        comparables = buscar_comparables(spw, peso, huella_db)
+        if comparables is not None:
+            df_vecinos = comparables['tabla']
+            
+            st.subheader(f"🔎 {len(df_vecinos)} Proyectos Más Comparables")
+            st.caption(f"Distancia estandarizada sobre: {', '.join(comparables['variables'])}")
+            st.dataframe(df_vecinos, use_container_width=True, hide_index=True)
+            st.metric("Tiempo Medio Comparables", f"{comparables['tiempo_medio']:.2f}s")
         
-        st.subheader("Base de Datos Histórica")
-        st.dataframe(df_historico, use_container_width=True, hide_index=True)
+        with st.expander("Base de Datos Histórica completa"):
+            # La tabla entera solo se lee si se pide
+            if st.checkbox("Cargar todas las filas y columnas"):
+                st.dataframe(cargar_historico_completo(huella_db), use_container_width=True, hide_index=True)
         
         # Estadísticas
         st.subheader("Estadísticas Descriptivas")
         col_e1, col_e2, col_e3, col_e4 = st.columns(4)
         
         with col_e1:
-            st.metric("Muestras", len(df_historico))
+            st.metric("Muestras", estadisticas['muestras'])
         with col_e2:
-            st.metric("Tiempo Medio", f"{df_historico['Tiempo_Real_Ofertado'].mean():.2f}s")
+            st.metric("Tiempo Medio", f"{estadisticas['media']:.2f}s")
         with col_e3:
-            st.metric("Tiempo Mín", f"{df_historico['Tiempo_Real_Ofertado'].min():.2f}s")
+            st.metric("Tiempo Mín", f"{estadisticas['minimo']:.2f}s")
         with col_e4:
-            st.metric("Tiempo Máx", f"{df_historico['Tiempo_Real_Ofertado'].max():.2f}s")
+            st.metric("Tiempo Máx", f"{estadisticas['maximo']:.2f}s")
     else:
         st.warning("⚠️ Base de datos histórica limpia no encontrada.")
 
@@ -427,3 +553,26 @@ st.markdown("""
 Basado en **Regresión Lineal Múltiple** | Precisión mejorada vs. v3.0  
 📧 Contacto: automation@gestamp.com
 """)
+
+# ============================================================================
+# PANEL DE CACHÉ
+# ============================================================================
+
+with st.sidebar.expander("⚡ Caché"):
+    st.caption(f"Último rerun: {(time.perf_counter() - inicio_rerun)*1000:.1f} ms")
+    
+    resumen = estadisticas_cache.resumen()
+    if resumen:
+        st.dataframe(pd.DataFrame(resumen).round({'Tasa': 2, 'ms/llamada': 2, 'ms/cálculo': 1}),
+                     use_container_width=True, hide_index=True)
+    
+    e = cache_predicciones.cache_por_defecto.estadisticas
+    st.caption(f"Predicciones (LRU): {len(cache_predicciones.cache_por_defecto)} entradas · "
+               f"{e['aciertos']} aciertos / {e['fallos']} fallos")
+    
+    if st.button("🗑️ Vaciar caché"):
+        st.cache_data.clear()
+        st.cache_resource.clear()
+        cache_predicciones.cache_por_defecto.limpiar()
+        estadisticas_cache.reiniciar()
+        st.rerun()
@@ -0,0 +1,429 @@
+"""
+===============================================================================
+🗃️ BASE DE DATOS DE OFERTAS (SQLite)
+===============================================================================
+
+El histórico era un CSV que data_cleaning.py sobrescribía entero: sin clave
+por Proyecto, sin forma de añadir una oferta cerrada y sin acceso seguro
+desde varias sesiones de Streamlit. Este módulo lo guarda en un fichero
+SQLite (sin servidor):
+
+    proyectos_brutos   Filas tal como llegan (texto), clave Proyecto
+    proyectos          Filas limpias (REAL), clave Proyecto, con revision
+    bajas              Valores limpios reemplazados o borrados (para el
+                       entrenamiento incremental)
+    meta               Contador de revisión
+
+    • Modo WAL: los lectores no bloquean al escritor ni al revés; cada
+      sesión/hilo abre su propia BaseDatosOfertas
+    • Índices en OEM, plataforma, (tipo, energia), revision y en las
+      variables del modelo (SPW, Peso, dimensiones)
+    • upsertar(df): alta o actualización por Proyecto en una transacción;
+      las celdas se limpian con parser_numerico y las filas incompletas
+      quedan solo en proyectos_brutos
+    • Cada llamada de escritura es una revisión. exportar_incremental(r)
+      devuelve lo que cambió desde la revisión r:
+          nuevos     filas limpias con revision > r
+          eliminados valores retirados después de r que ya existían en r
+      que es justo lo que necesita ModeloRegresionLineal.entrenar_incremental
+
+Uso:
+    bd = BaseDatosOfertas('ofertas.db')
+    bd.importar_csv('base_datos_experta.csv')
+    revision = entrenar_desde_base(modelo, bd)
+    bd.upsertar(df_ofertas_cerradas)
+    revision = entrenar_desde_base(modelo, bd, desde_revision=revision)
+
+===============================================================================
+"""
+
+import contextlib
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from data_cleaning import COLUMNAS_NUMERICAS
+from modelos_segmentados import extraer_segmentos
+from parser_numerico import parsear_numeros
+
+RUTA_BD_DEFECTO = Path(__file__).parent / 'ofertas.db'
+VERSION_ESQUEMA = 1
+
+COLUMNAS_SEGMENTO = ['OEM', 'plataforma', 'tipo', 'energia']
+COLUMNAS_INDEXADAS = [['OEM'], ['plataforma'], ['tipo', 'energia'], ['revision'],
+                      ['SPW'], ['Peso'], ['LONGITUD ASSY'], ['ANCHO ASSY'], ['ALTO ASSY']]
+
+
+def _q(columna):
+    """Identificador SQL entre comillas (hay columnas con espacios)"""
+    return '"' + columna.replace('"', '""') + '"'
+
+
+def _lista(columnas, prefijo=''):
+    return ', '.join(prefijo + _q(c) for c in columnas)
+
+
+def _texto(serie):
+    """Serie como texto, conservando los nulos"""
+    texto = serie.astype(object).where(serie.notna(), None)
+    if pd.api.types.is_string_dtype(serie.dtype) and serie.dtype != object:
+        return texto
+    return texto.map(lambda v: v if v is None else str(v))
+
+
+def _filas(df):
+    """Tuplas de un DataFrame para executemany, con None en lugar de NaN"""
+    columnas = [df[c].astype(object).where(df[c].notna(), None).tolist() if df[c].isna().any()
+                else df[c].tolist() for c in df.columns]
+    return zip(*columnas)
+
+
+# ============================================================================
+# BASE DE DATOS
+# ============================================================================
+
+class BaseDatosOfertas:
+    """
+    Histórico de ofertas en SQLite.
+
+    Args:
+        ruta: Fichero .db (se crea si no existe)
+        columnas_numericas: Columnas numéricas del histórico (la última es
+                            la variable objetivo)
+        timeout: Segundos de espera si otra sesión está escribiendo
+    """
+
+    def __init__(self, ruta=RUTA_BD_DEFECTO, columnas_numericas=None, timeout=30.0):
+        self.ruta = Path(ruta)
+        self.columnas_numericas = list(columnas_numericas or COLUMNAS_NUMERICAS)
+        # isolation_level=None: las transacciones se abren a mano (BEGIN IMMEDIATE)
+        self.conexion = sqlite3.connect(self.ruta, timeout=timeout, isolation_level=None)
+        self.conexion.execute('PRAGMA journal_mode=WAL')
+        self.conexion.execute('PRAGMA synchronous=NORMAL')
+        self.conexion.execute('PRAGMA temp_store=MEMORY')
+        self._crear_esquema()
+
+    def cerrar(self):
+        self.conexion.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo_error, error, traza):
+        self.cerrar()
+        return False
+
+    @contextmanager
+    def _transaccion(self, escritura=True):
+        """
+        Transacción explícita. Las de escritura empiezan con BEGIN IMMEDIATE
+        (evita interbloqueos en WAL); las de lectura ven una instantánea fija.
+        """
+        self.conexion.execute('BEGIN IMMEDIATE' if escritura else 'BEGIN')
+        try:
+            yield self.conexion
+        except BaseException:
+            self.conexion.execute('ROLLBACK')
+            raise
+        self.conexion.execute('COMMIT')
+
+    def _crear_esquema(self):
+        numericas_texto = ', '.join(f'{_q(c)} TEXT' for c in self.columnas_numericas)
+        numericas_real = ', '.join(f'{_q(c)} REAL NOT NULL' for c in self.columnas_numericas)
+        segmento = ', '.join(f'{_q(c)} TEXT' for c in COLUMNAS_SEGMENTO)
+        with self._transaccion() as c:
+            c.execute('CREATE TABLE IF NOT EXISTS meta (clave TEXT PRIMARY KEY, valor)')
+            c.execute(f'''CREATE TABLE IF NOT EXISTS proyectos_brutos (
+                              Proyecto TEXT PRIMARY KEY, {segmento}, {numericas_texto},
+                              revision INTEGER NOT NULL, actualizado REAL NOT NULL)''')
+            c.execute(f'''CREATE TABLE IF NOT EXISTS proyectos (
+                              Proyecto TEXT PRIMARY KEY, {segmento}, {numericas_real},
+                              revision INTEGER NOT NULL)''')
+            c.execute(f'''CREATE TABLE IF NOT EXISTS bajas (
+                              revision INTEGER NOT NULL, revision_alta INTEGER NOT NULL,
+                              Proyecto TEXT NOT NULL, {numericas_real})''')
+            c.execute('CREATE INDEX IF NOT EXISTS idx_bajas_revision ON bajas (revision)')
+            self._crear_indices(c)
+            c.execute("INSERT OR IGNORE INTO meta VALUES ('version_esquema', ?)", (VERSION_ESQUEMA,))
+            c.execute("INSERT OR IGNORE INTO meta VALUES ('revision', 0)")
+
+    def _indices(self):
+        """{nombre: columnas} de los índices secundarios de proyectos"""
+        disponibles = COLUMNAS_SEGMENTO + ['revision'] + self.columnas_numericas
+        return {'idx_proyectos_' + '_'.join(col.replace(' ', '_') for col in columnas): columnas
+                for columnas in COLUMNAS_INDEXADAS if all(col in disponibles for col in columnas)}
+
+    def _crear_indices(self, c):
+        for nombre, columnas in self._indices().items():
+            c.execute(f'CREATE INDEX IF NOT EXISTS {nombre} ON proyectos ({_lista(columnas)})')
+
+    @contextmanager
+    def _carga_masiva(self):
+        """
+        Quita los índices secundarios durante una carga grande y los
+        reconstruye al final (ordenar una vez es mucho más barato que
+        mantener nueve índices fila a fila).
+        """
+        with self._transaccion() as c:
+            for nombre in self._indices():
+                c.execute(f'DROP INDEX IF EXISTS {nombre}')
+        try:
+            yield
+        finally:
+            with self._transaccion() as c:
+                self._crear_indices(c)
+
+    @property
+    def revision(self):
+        """Última revisión escrita (0 = base vacía)"""
+        return self.conexion.execute("SELECT valor FROM meta WHERE clave = 'revision'").fetchone()[0]
+
+    def _nueva_revision(self, c):
+        c.execute("UPDATE meta SET valor = valor + 1 WHERE clave = 'revision'")
+        return c.execute("SELECT valor FROM meta WHERE clave = 'revision'").fetchone()[0]
+
+    # ========================================================================
+    # ESCRITURA
+    # ========================================================================
+
+    def _preparar(self, df):
+        """
+        Filas brutas (texto) y limpias (float) de un DataFrame de entrada.
+
+        Returns:
+            (brutos, limpios, validas): DataFrames alineados y máscara de
+            filas sin celdas vacías ni coaccionadas
+        """
+        df = df.drop_duplicates('Proyecto', keep='last').reset_index(drop=True)
+        segmentos = extraer_segmentos(df, columna_oem=None)
+        partes = df['Proyecto'].astype(str).str.upper().str.split('_')
+
+        brutos = pd.DataFrame({'Proyecto': df['Proyecto'].astype(str)})
+        brutos['OEM'] = _texto(df['OEM']).str.strip().str.upper() if 'OEM' in df.columns else None
+        brutos['plataforma'] = (_texto(df['Plataforma']).str.strip().str.upper() if 'Plataforma' in df.columns
+                                else partes.str[-2].where(partes.str.len() >= 3))
+        brutos['tipo'] = segmentos['tipo']
+        brutos['energia'] = segmentos['energia']
+
+        limpios = brutos.copy()
+        validas = np.ones(len(df), dtype=bool)
+        for col in self.columnas_numericas:
+            columna = df[col] if col in df.columns else pd.Series(None, index=df.index, dtype=object)
+            brutos[col] = _texto(columna)
+            limpios[col], _ = parsear_numeros(columna)
+            validas &= ~np.isnan(limpios[col].to_numpy())
+        return brutos, limpios, validas
+
+    def upsertar(self, df):
+        """
+        Alta o actualización de proyectos (clave Proyecto) en una transacción.
+
+        Las celdas numéricas pueden venir como texto con ',' o '.' decimal.
+        Las filas con alguna variable vacía o no numérica se guardan en
+        proyectos_brutos pero salen (o no entran) en proyectos.
+
+        Args:
+            df: DataFrame con Proyecto, las columnas numéricas y opcionalmente
+                OEM y Plataforma
+
+        Returns:
+            Dict con 'revision', 'limpios' (filas escritas en proyectos) y
+            'descartados' (filas solo en brutos)
+        """
+        if 'Proyecto' not in df.columns:
+            raise ValueError("El DataFrame debe tener la columna 'Proyecto'")
+        brutos, limpios, validas = self._preparar(df)
+        columnas_brutas = list(brutos.columns)
+        columnas_limpias = list(limpios.columns)
+        numericas = self.columnas_numericas
+
+        with self._transaccion() as c:
+            revision = self._nueva_revision(c)
+            c.execute('CREATE TEMP TABLE IF NOT EXISTS _entrada (Proyecto TEXT PRIMARY KEY, valida INTEGER)')
+            c.execute('DELETE FROM _entrada')
+            c.executemany('INSERT INTO _entrada VALUES (?, ?)',
+                          zip(limpios['Proyecto'].tolist(), validas.astype(int).tolist()))
+
+            # Valores limpios que se van a reemplazar o retirar
+            c.execute(f'''INSERT INTO bajas
+                          SELECT ?, p.revision, p.Proyecto, {_lista(numericas, 'p.')}
+                          FROM proyectos p JOIN _entrada e ON e.Proyecto = p.Proyecto''', (revision,))
+            c.execute('DELETE FROM proyectos WHERE Proyecto IN (SELECT Proyecto FROM _entrada WHERE valida = 0)')
+
+            ahora = time.time()
+            c.executemany(
+                f'''INSERT INTO proyectos_brutos ({_lista(columnas_brutas)}, revision, actualizado)
+                    VALUES ({', '.join('?' * len(columnas_brutas))}, ?, ?)
+                    ON CONFLICT(Proyecto) DO UPDATE SET
+                    {', '.join(f'{_q(col)} = excluded.{_q(col)}' for col in columnas_brutas[1:])},
+                    revision = excluded.revision, actualizado = excluded.actualizado''',
+                (fila + (revision, ahora) for fila in _filas(brutos)))
+            c.executemany(
+                f'''INSERT INTO proyectos ({_lista(columnas_limpias)}, revision)
+                    VALUES ({', '.join('?' * len(columnas_limpias))}, ?)
+                    ON CONFLICT(Proyecto) DO UPDATE SET
+                    {', '.join(f'{_q(col)} = excluded.{_q(col)}' for col in columnas_limpias[1:])},
+                    revision = excluded.revision''',
+                (fila + (revision,) for fila in _filas(limpios[validas])))
+
+        return {'revision': revision, 'limpios': int(validas.sum()), 'descartados': int((~validas).sum())}
+
+    def eliminar(self, proyectos):
+        """
+        Borra proyectos (brutos y limpios).
+
+        Returns:
+            Revisión de la baja
+        """
+        proyectos = [(str(p),) for p in proyectos]
+        numericas = _lista(self.columnas_numericas)
+        with self._transaccion() as c:
+            revision = self._nueva_revision(c)
+            c.executemany(f'''INSERT INTO bajas SELECT ?, revision, Proyecto, {numericas}
+                              FROM proyectos WHERE Proyecto = ?''',
+                          ((revision, p) for (p,) in proyectos))
+            c.executemany('DELETE FROM proyectos WHERE Proyecto = ?', proyectos)
+            c.executemany('DELETE FROM proyectos_brutos WHERE Proyecto = ?', proyectos)
+        return revision
+
+    def importar_csv(self, ruta_csv, tamano_bloque=100_000):
+        """
+        Carga (o actualiza) un CSV histórico por bloques; cada bloque es una
+        revisión. Todas las columnas se leen como texto y se limpian aquí.
+        Si la base está vacía, los índices secundarios se crean al final.
+
+        Returns:
+            Dict con 'revision', 'limpios' y 'descartados' acumulados
+        """
+        total = {'revision': self.revision, 'limpios': 0, 'descartados': 0}
+        carga = self._carga_masiva() if self.contar() == 0 else contextlib.nullcontext()
+        with carga:
+            for bloque in pd.read_csv(ruta_csv, dtype=str, chunksize=tamano_bloque):
+                r = self.upsertar(bloque)
+                total['revision'] = r['revision']
+                total['limpios'] += r['limpios']
+                total['descartados'] += r['descartados']
+        return total
+
+    def compactar(self, hasta_revision):
+        """
+        Borra las bajas de revisiones ≤ hasta_revision (ya no hacen falta
+        cuando todos los modelos se han actualizado hasta esa revisión).
+        """
+        with self._transaccion() as c:
+            c.execute('DELETE FROM bajas WHERE revision <= ?', (hasta_revision,))
+
+    # ========================================================================
+    # LECTURA / EXPORTACIÓN
+    # ========================================================================
+
+    def _leer(self, sql, parametros=()):
+        return pd.read_sql_query(sql, self.conexion, params=parametros)
+
+    def contar(self):
+        """Nº de proyectos limpios"""
+        return self.conexion.execute('SELECT COUNT(*) FROM proyectos').fetchone()[0]
+
+    def exportar(self, columnas=None, donde=None, parametros=()):
+        """
+        Proyectos limpios como DataFrame (mismas columnas que el CSV limpio).
+
+        Args:
+            columnas: Columnas a leer (None = Proyecto + numéricas)
+            donde: Condición SQL opcional, p. ej. 'OEM = ? AND SPW > ?'
+            parametros: Valores de los ? de donde
+        """
+        columnas = columnas or ['Proyecto'] + self.columnas_numericas
+        sql = f'SELECT {_lista(columnas)} FROM proyectos'
+        if donde:
+            sql += f' WHERE {donde}'
+        return self._leer(sql + ' ORDER BY rowid', parametros)
+
+    def exportar_brutos(self):
+        """Filas brutas (texto tal como llegaron)"""
+        return self._leer('SELECT * FROM proyectos_brutos ORDER BY rowid')
+
+    def exportar_incremental(self, desde_revision):
+        """
+        Cambios en los proyectos limpios desde una revisión.
+
+        Args:
+            desde_revision: Revisión con la que se entrenó por última vez
+
+        Returns:
+            Dict con 'nuevos' (filas actuales escritas después), 'eliminados'
+            (valores que existían en desde_revision y ya no están) y
+            'revision' (la actual, para la próxima llamada)
+        """
+        columnas = ['Proyecto'] + self.columnas_numericas
+        with self._transaccion(escritura=False):
+            revision = self.revision
+            nuevos = self._leer(f'SELECT {_lista(columnas)} FROM proyectos WHERE revision > ? '
+                                'ORDER BY rowid', (desde_revision,))
+            eliminados = self._leer(f'SELECT {_lista(columnas)} FROM bajas '
+                                    'WHERE revision > ? AND revision_alta <= ? ORDER BY rowid',
+                                    (desde_revision, desde_revision))
+        return {'nuevos': nuevos, 'eliminados': eliminados, 'revision': revision}
+
+    def publicar_historico(self, ruta_parquet='base_datos_limpia.parquet', ruta_csv='base_datos_limpia.csv'):
+        """Escribe el almacén Parquet (y el CSV de exportación) que leen las apps"""
+        from almacen_historico import guardar_historico
+
+        df = self.exportar()
+        guardar_historico(df, ruta_parquet, columnas_numericas=self.columnas_numericas)
+        if ruta_csv:
+            df.to_csv(ruta_csv, index=False, decimal='.')
+        return len(df)
+
+
+# ============================================================================
+# ENTRENAMIENTO DESDE LA BASE
+# ============================================================================
+
+def entrenar_desde_base(modelo, bd, desde_revision=None, umbral_correlacion=0.5):
+    """
+    Entrena un ModeloRegresionLineal con la base: completo la primera vez,
+    incremental (solo lo cambiado) en las siguientes.
+
+    Args:
+        modelo: ModeloRegresionLineal
+        bd: BaseDatosOfertas
+        desde_revision: Revisión devuelta por la llamada anterior (None =
+                        entrenamiento completo)
+        umbral_correlacion: Para seleccionar variables si el modelo no
+                            tiene variables_entrada
+
+    Returns:
+        Revisión hasta la que está entrenado el modelo
+    """
+    if desde_revision is None or modelo.estadisticas is None:
+        # Misma instantánea para la revisión y los datos: una escritura entre
+        # ambas lecturas quedaría fuera del modelo y también del siguiente
+        # incremental (que parte de esta revisión)
+        with bd._transaccion(escritura=False):
+            revision = bd.revision
+            df = bd.exportar()
+        if modelo.variables_entrada is None:
+            modelo.seleccionar_variables(df, umbral_correlacion=umbral_correlacion)
+        modelo.entrenar(df)
+        return revision
+
+    cambios = bd.exportar_incremental(desde_revision)
+    if len(cambios['nuevos']) or len(cambios['eliminados']):
+        modelo.entrenar_incremental(cambios['nuevos'], cambios['eliminados'])
+    return cambios['revision']
+
+
+if __name__ == "__main__":
+    import sys
+
+    ruta_csv = sys.argv[1] if len(sys.argv) > 1 else 'base_datos_experta.csv'
+    with BaseDatosOfertas() as bd:
+        r = bd.importar_csv(ruta_csv)
+        print(f"✅ {ruta_csv} → {bd.ruta.name}: {r['limpios']} filas limpias, "
+              f"{r['descartados']} incompletas (revisión {r['revision']})")
+        print(f"   Proyectos en la base: {bd.contar()}")
@@ -0,0 +1,317 @@
+"""
+===============================================================================
+⏱️ BENCHMARKS DE RENDIMIENTO
+===============================================================================
+
+Mide el rendimiento de los motores vectorizados frente a sus objetivos.
+
+Uso:
+    python benchmarks.py
+
+===============================================================================
+"""
+
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from logic import calcular_ciclo_completo_lote, calcular_capacidad_escenarios
+from montecarlo import simular_oferta
+from motor_inferencia import MotorLineal, RUTA_BINARIO_DEFECTO
+
+DIRECTORIO = Path(__file__).parent
+
+
+def _cronometrar(funcion, repeticiones=5):
+    """Devuelve el mejor tiempo (segundos) de varias ejecuciones"""
+    mejor = float('inf')
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor
+
+
+# ============================================================================
+# CICLO POR LOTES
+# ============================================================================
+
+def benchmark_ciclo_lote(n_ofertas=50_000, semilla=0):
+    """Puntúa un libro de ofertas completo con una sola llamada"""
+    rng = np.random.default_rng(semilla)
+    spw = rng.integers(58, 158, n_ofertas)
+    tuercas = rng.integers(0, 10, n_ofertas)
+
+    segundos = _cronometrar(lambda: calcular_ciclo_completo_lote(spw, tuercas=tuercas))
+    return {'ofertas': n_ofertas, 'segundos': segundos, 'ofertas_por_segundo': n_ofertas / segundos}
+
+
+# ============================================================================
+# CAPACIDAD POR ESCENARIOS
+# ============================================================================
+
+def benchmark_capacidad_escenarios(n_escenarios=200_000, n_anios=5, semilla=0):
+    """Objetivo: ≥ 1M escenario-años por segundo en un núcleo"""
+    rng = np.random.default_rng(semilla)
+    t_ciclo = rng.uniform(60, 300, n_escenarios)
+    dias = rng.integers(200, 250, n_escenarios)
+    turnos = rng.integers(1, 4, n_escenarios)
+    horas = rng.uniform(6.0, 8.0, n_escenarios)
+    volumenes = rng.integers(1_000, 500_000, (n_escenarios, n_anios))
+    p_kit = rng.integers(1, 10, n_escenarios)
+    p_rack = rng.integers(1, 20, n_escenarios)
+    peso = rng.uniform(1.0, 200.0, n_escenarios)
+
+    segundos = _cronometrar(lambda: calcular_capacidad_escenarios(
+        t_ciclo, dias, turnos, horas, volumenes, p_kit, p_rack, peso
+    ))
+    celdas = n_escenarios * n_anios
+    return {'escenario_anios': celdas, 'segundos': segundos, 'por_segundo': celdas / segundos}
+
+
+# ============================================================================
+# MONTE CARLO
+# ============================================================================
+
+def benchmark_montecarlo(n_simulaciones=1_000_000):
+    """Objetivo: 1M extracciones por oferta en menos de 1 segundo"""
+    segundos = _cronometrar(lambda: simular_oferta(
+        170.0, 220, 2, 7.5, [300_000, 350_000, 400_000], 1, 1, 20.0,
+        n_simulaciones=n_simulaciones, rmse=14.8
+    ), repeticiones=3)
+    return {'simulaciones': n_simulaciones, 'segundos': segundos}
+
+
+# ============================================================================
+# CARGA EN FRÍO DEL MODELO
+# ============================================================================
+
+_SCRIPT_CARGA = {
+    'interprete': "pass",
+    'pickle': "import pickle\nwith open('modelo_regresion.pkl', 'rb') as f: pickle.load(f)",
+    'artefacto': "from motor_inferencia import MotorLineal\nMotorLineal.desde_binario('modelo_lineal.npz')",
+}
+
+
+def benchmark_carga_en_frio(repeticiones=5):
+    """
+    Tiempo de arranque de un proceso nuevo que solo carga el modelo
+    (pickle + sklearn frente al artefacto versionado con NumPy).
+
+    Returns:
+        Dict {formato: segundos} con el mejor tiempo; 'interprete' es el
+        arranque de Python vacío (referencia). Formatos sin fichero se omiten.
+    """
+    resultados = {}
+    for formato, script in _SCRIPT_CARGA.items():
+        fichero = {'pickle': 'modelo_regresion.pkl', 'artefacto': 'modelo_lineal.npz'}.get(formato)
+        if fichero and not (DIRECTORIO / fichero).exists():
+            continue
+        resultados[formato] = _cronometrar(
+            lambda: subprocess.run([sys.executable, '-W', 'ignore', '-c', script],
+                                   cwd=DIRECTORIO, check=True),
+            repeticiones=repeticiones,
+        )
+    return resultados
+
+
+def benchmark_carga_en_caliente(repeticiones=50):
+    """Lectura + verificación de los campos de servicio del artefacto en un proceso ya iniciado"""
+    return _cronometrar(lambda: MotorLineal.desde_binario(RUTA_BINARIO_DEFECTO), repeticiones)
+
+
+# ============================================================================
+# PROYECTOS COMPARABLES (k-NN)
+# ============================================================================
+
+def benchmark_comparables(n_filas=1_000_000, k=10, n_consultas=200, semilla=0):
+    """Objetivo: consulta k-NN < 1 ms sobre 1M filas (árbol ya construido)"""
+    import pandas as pd
+    from comparables import IndiceComparables, VARIABLES_COMPARABLES, VARIABLE_OBJETIVO
+
+    rng = np.random.default_rng(semilla)
+    df = pd.DataFrame({v: rng.uniform(0, 1000, n_filas) for v in VARIABLES_COMPARABLES})
+    df[VARIABLE_OBJETIVO] = rng.uniform(50, 300, n_filas)
+    indice = IndiceComparables.construir(df)
+
+    consultas = rng.uniform(0, 1000, (n_consultas, len(VARIABLES_COMPARABLES)))
+    inicio = time.perf_counter()
+    indice.buscar(dict(zip(VARIABLES_COMPARABLES, consultas[0])), k=k)
+    construccion = time.perf_counter() - inicio
+
+    tiempos = []
+    for fila in consultas:
+        consulta = dict(zip(VARIABLES_COMPARABLES, fila))
+        tiempos.append(_cronometrar(lambda: indice.buscar(consulta, k=k), repeticiones=1))
+    return {'filas': n_filas, 'construccion': construccion, 'consulta_mediana': float(np.median(tiempos))}
+
+
+# ============================================================================
+# ALMACÉN DEL HISTÓRICO (CSV frente a Parquet)
+# ============================================================================
+
+def benchmark_carga_historico(n_filas=1_000_000, semilla=0):
+    """
+    Objetivo: cargar el histórico desde Parquet ≥ 10× más rápido que el CSV.
+
+    Mide la carga completa de ambos formatos y la del Parquet proyectando
+    solo las columnas que usa la comparativa (Tiempo_Real_Ofertado) y el
+    índice de comparables.
+    """
+    import tempfile
+    import pandas as pd
+    from almacen_historico import guardar_historico, leer_historico
+    from comparables import VARIABLES_COMPARABLES, VARIABLE_OBJETIVO
+    from data_cleaning import COLUMNAS_NUMERICAS
+
+    rng = np.random.default_rng(semilla)
+    df = pd.DataFrame({c: rng.uniform(0, 1000, n_filas).round(2) for c in COLUMNAS_NUMERICAS})
+    df.insert(0, 'Proyecto', [f'P{i:07d}' for i in range(n_filas)])
+
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta_csv = Path(directorio) / 'historico.csv'
+        ruta_parquet = Path(directorio) / 'historico.parquet'
+        df.to_csv(ruta_csv, index=False)
+        guardar_historico(df, ruta_parquet, columnas_numericas=COLUMNAS_NUMERICAS)
+
+        columnas_indice = VARIABLES_COMPARABLES + [VARIABLE_OBJETIVO]
+        return {
+            'filas': n_filas,
+            'csv': _cronometrar(lambda: pd.read_csv(ruta_csv), repeticiones=2),
+            'csv_columnas': _cronometrar(lambda: pd.read_csv(ruta_csv, usecols=columnas_indice),
+                                         repeticiones=2),
+            'parquet': _cronometrar(lambda: leer_historico(ruta_parquet), repeticiones=2),
+            'parquet_columnas': _cronometrar(lambda: leer_historico(ruta_parquet, columnas=columnas_indice),
+                                             repeticiones=2),
+            'parquet_objetivo': _cronometrar(lambda: leer_historico(ruta_parquet, columnas=[VARIABLE_OBJETIVO]),
+                                             repeticiones=2),
+        }
+
+
+# ============================================================================
+# BASE DE DATOS DE OFERTAS (SQLite)
+# ============================================================================
+
+def benchmark_base_datos(n_filas=200_000, n_upsert=1_000, semilla=0):
+    """
+    Carga inicial, upsert de ofertas cerradas y exportación incremental
+    sobre una base SQLite de n_filas proyectos.
+    """
+    import tempfile
+    import pandas as pd
+    from base_datos_ofertas import BaseDatosOfertas
+    from data_cleaning import COLUMNAS_NUMERICAS
+
+    rng = np.random.default_rng(semilla)
+    df = pd.DataFrame({c: rng.uniform(0, 1000, n_filas).round(2).astype(str) for c in COLUMNAS_NUMERICAS})
+    df.insert(0, 'Proyecto', [f'SUB_{i}_G{i % 90}_BEV' for i in range(n_filas)])
+
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta_csv = Path(directorio) / 'historico.csv'
+        df.to_csv(ruta_csv, index=False)
+        with BaseDatosOfertas(Path(directorio) / 'ofertas.db') as bd:
+            inicio = time.perf_counter()
+            revision = bd.importar_csv(ruta_csv)['revision']
+            carga = time.perf_counter() - inicio
+
+            cambios = df.iloc[rng.choice(n_filas, n_upsert, replace=False)].assign(SPW='5')
+            inicio = time.perf_counter()
+            bd.upsertar(cambios)
+            upsert = time.perf_counter() - inicio
+
+            incremental = _cronometrar(lambda: bd.exportar_incremental(revision), repeticiones=3)
+    return {'filas': n_filas, 'carga': carga, 'upsert': upsert, 'n_upsert': n_upsert,
+            'incremental': incremental}
+
+
+
+# ============================================================================
+# DETECCIÓN DE OUTLIERS
+# ============================================================================
+
+def benchmark_outliers(n_filas=1_000_000, n_columnas=30, semilla=0):
+    """
+    Motor de outliers sobre una matriz n_filas × n_columnas frente al bucle
+    por columna de pandas que usaba limpiar_base_datos (solo IQR y conteo).
+    """
+    import pandas as pd
+    from deteccion_outliers import influencia, outliers_iqr, outliers_mad, outliers_mahalanobis
+
+    rng = np.random.default_rng(semilla)
+    df = pd.DataFrame(rng.standard_normal((n_filas, n_columnas)))
+    y = df.to_numpy() @ rng.normal(size=n_columnas) + rng.standard_normal(n_filas)
+
+    def bucle_pandas():
+        for col in df.columns:
+            Q1 = df[col].quantile(0.25)
+            Q3 = df[col].quantile(0.75)
+            IQR = Q3 - Q1
+            len(df[(df[col] < Q1 - 1.5*IQR) | (df[col] > Q3 + 1.5*IQR)])
+
+    return {
+        'filas': n_filas,
+        'columnas': n_columnas,
+        'pandas_iqr': _cronometrar(bucle_pandas, repeticiones=2),
+        'iqr': _cronometrar(lambda: outliers_iqr(df), repeticiones=2),
+        'mad': _cronometrar(lambda: outliers_mad(df), repeticiones=2),
+        'mahalanobis': _cronometrar(lambda: outliers_mahalanobis(df), repeticiones=2),
+        'influencia': _cronometrar(lambda: influencia(df, y), repeticiones=2),
+    }
+
+if __name__ == "__main__":
+    print("=" * 80)
+    print("⏱️  BENCHMARKS")
+    print("=" * 80)
+
+    r = benchmark_ciclo_lote()
+    print(f"\n  Ciclo por lotes:        {r['ofertas']:>10,} ofertas      "
+          f"{r['segundos']*1000:8.2f} ms  ({r['ofertas_por_segundo']:,.0f}/s)")
+
+    r = benchmark_capacidad_escenarios()
+    estado = "✅" if r['por_segundo'] >= 1_000_000 else "⚠️"
+    print(f"  Capacidad escenarios:   {r['escenario_anios']:>10,} escenario-años "
+          f"{r['segundos']*1000:8.2f} ms  ({r['por_segundo']:,.0f}/s) {estado}")
+
+    r = benchmark_montecarlo()
+    estado = "✅" if r['segundos'] < 1.0 else "⚠️"
+    print(f"  Monte Carlo (3 años):   {r['simulaciones']:>10,} extracciones  "
+          f"{r['segundos']*1000:8.2f} ms {estado}")
+
+    r = benchmark_carga_en_frio()
+    base = r.pop('interprete')
+    for formato, segundos in r.items():
+        print(f"  Carga en frío ({formato + ')':<10} {segundos*1000:8.1f} ms  "
+              f"(+{(segundos - base)*1000:.1f} ms sobre el intérprete)")
+    if RUTA_BINARIO_DEFECTO.exists():
+        print(f"  Carga en caliente (artefacto):   {benchmark_carga_en_caliente()*1000:8.3f} ms")
+
+    r = benchmark_comparables()
+    estado = "✅" if r['consulta_mediana'] < 1e-3 else "⚠️"
+    print(f"  Comparables k-NN:       {r['filas']:>10,} filas        "
+          f"{r['consulta_mediana']*1000:8.3f} ms/consulta "
+          f"(árbol: {r['construccion']*1000:.0f} ms) {estado}")
+
+    r = benchmark_carga_historico()
+    print(f"  Carga histórico:        {r['filas']:>10,} filas")
+    for clave, etiqueta in [('csv', 'CSV completo'), ('csv_columnas', 'CSV, columnas del índice'),
+                            ('parquet', 'Parquet completo'),
+                            ('parquet_columnas', 'Parquet, columnas del índice'),
+                            ('parquet_objetivo', 'Parquet, solo objetivo')]:
+        aceleracion = r['csv'] / r[clave]
+        estado = "" if clave.startswith('csv') else (" ✅" if aceleracion >= 10 else " ⚠️")
+        print(f"      {etiqueta:<30} {r[clave]*1000:8.1f} ms  ({aceleracion:5.1f}×){estado}")
+
+    r = benchmark_base_datos()
+    print(f"  Base SQLite:            {r['filas']:>10,} filas        "
+          f"carga {r['carga']:.1f} s, upsert {r['n_upsert']:,} {r['upsert']*1000:.0f} ms, "
+          f"export. incremental {r['incremental']*1000:.0f} ms")
+
+    r = benchmark_outliers()
+    print(f"  Outliers:               {r['filas']:>10,} × {r['columnas']} celdas")
+    for clave, etiqueta in [('pandas_iqr', 'IQR, bucle pandas por columna'), ('iqr', 'IQR (máscara + puntuaciones)'),
+                            ('mad', 'MAD'), ('mahalanobis', 'Mahalanobis (robusto)'),
+                            ('influencia', 'Palanca + Cook')]:
+        print(f"      {etiqueta:<30} {r[clave]*1000:8.1f} ms")
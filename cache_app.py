@@ -0,0 +1,154 @@
+"""
+===============================================================================
+⚡ CACHÉ DE LA APP WEB (claves por huella de ficheros + estadísticas)
+===============================================================================
+
+Streamlit re-ejecuta app.py entero con cada cambio de un widget. Las
+funciones costosas de la app (lecturas del histórico, factor IA, resultados,
+figuras, PPTX) se memorizan con st.cache_data / st.cache_resource usando
+como clave:
+
+    • Los valores de entrada (los propios argumentos)
+    • La huella (mtime_ns, tamaño) de los ficheros de los que dependen:
+      base_datos_limpia.parquet (o su .csv), config_modelo.json,
+      modelo_lineal.npz...
+      Un reentrenamiento o una nueva limpieza cambia la huella y las
+      entradas antiguas dejan de usarse; comprobarla es un os.stat (µs)
+
+memorizar() añade contadores de llamadas, cálculos (fallos) y tiempos por
+función para el panel de caché de la app. Este módulo no importa
+streamlit: el decorador de caché se pasa como argumento.
+
+===============================================================================
+"""
+
+import functools
+import os
+import threading
+import time
+from pathlib import Path
+
+DIRECTORIO = Path(__file__).parent
+
+# Ficheros de los que dependen los resultados de la app
+ARTEFACTOS = ('base_datos_limpia.parquet', 'base_datos_limpia.csv', 'config_modelo.json',
+              'modelo_lineal.npz', 'modelos_segmentados.npz')
+
+
+def huella_fichero(ruta):
+    """(mtime_ns, tamaño) del fichero, o None si no existe"""
+    try:
+        estado = os.stat(ruta)
+    except OSError:
+        return None
+    return (estado.st_mtime_ns, estado.st_size)
+
+
+def huella_artefactos(nombres=ARTEFACTOS, directorio=DIRECTORIO):
+    """Dict {fichero: huella} de los artefactos de la app"""
+    return {nombre: huella_fichero(Path(directorio) / nombre) for nombre in nombres}
+
+
+# ============================================================================
+# ESTADÍSTICAS
+# ============================================================================
+
+class EstadisticasCache:
+    """
+    Contadores thread-safe por función memorizada.
+
+    llamadas - calculos = aciertos (Streamlit no expone sus aciertos, así
+    que se cuentan las veces que el cuerpo de la función llega a ejecutarse).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._funciones = {}
+
+    def _entrada(self, nombre):
+        return self._funciones.setdefault(nombre, {'llamadas': 0, 'calculos': 0,
+                                                   'segundos_llamadas': 0.0, 'segundos_calculos': 0.0})
+
+    def registrar_llamada(self, nombre, segundos):
+        with self._lock:
+            entrada = self._entrada(nombre)
+            entrada['llamadas'] += 1
+            entrada['segundos_llamadas'] += segundos
+
+    def registrar_calculo(self, nombre, segundos):
+        with self._lock:
+            entrada = self._entrada(nombre)
+            entrada['calculos'] += 1
+            entrada['segundos_calculos'] += segundos
+
+    def resumen(self):
+        """
+        Lista de dicts (una fila por función) con llamadas, aciertos,
+        tasa de aciertos y ms medios por llamada y por cálculo.
+        """
+        with self._lock:
+            filas = []
+            for nombre, e in sorted(self._funciones.items()):
+                aciertos = max(e['llamadas'] - e['calculos'], 0)
+                filas.append({
+                    'Función': nombre,
+                    'Llamadas': e['llamadas'],
+                    'Aciertos': aciertos,
+                    'Tasa': aciertos / e['llamadas'] if e['llamadas'] else 0.0,
+                    'ms/llamada': 1000 * e['segundos_llamadas'] / e['llamadas'] if e['llamadas'] else 0.0,
+                    'ms/cálculo': 1000 * e['segundos_calculos'] / e['calculos'] if e['calculos'] else 0.0,
+                })
+            return filas
+
+    def reiniciar(self):
+        with self._lock:
+            self._funciones.clear()
+
+
+estadisticas_cache = EstadisticasCache()
+
+
+def memorizar(decorador_cache, nombre=None, estadisticas=None, **opciones):
+    """
+    Memoriza una función con decorador_cache (st.cache_data,
+    st.cache_resource, ...) contando llamadas y cálculos.
+
+    Uso:
+        @memorizar(st.cache_data, max_entries=64)
+        def figura(t_ciclo, huellas): ...
+
+    Args:
+        decorador_cache: Decorador de caché; se llama como decorador_cache(**opciones)
+        nombre: Nombre en las estadísticas (por defecto, el de la función)
+        estadisticas: EstadisticasCache (por defecto, estadisticas_cache)
+        **opciones: Opciones del decorador (max_entries, ttl, show_spinner...)
+
+    Returns:
+        Decorador; la función decorada conserva .clear() de la caché
+    """
+    def decorador(funcion):
+        etiqueta = nombre or funcion.__name__
+        registro = estadisticas or estadisticas_cache
+
+        # functools.wraps conserva __qualname__ y __wrapped__: Streamlit
+        # identifica la caché por el código de la función original
+        @functools.wraps(funcion)
+        def calcular(*args, **kwargs):
+            inicio = time.perf_counter()
+            resultado = funcion(*args, **kwargs)
+            registro.registrar_calculo(etiqueta, time.perf_counter() - inicio)
+            return resultado
+
+        cacheada = decorador_cache(**opciones)(calcular)
+
+        @functools.wraps(funcion)
+        def llamar(*args, **kwargs):
+            inicio = time.perf_counter()
+            resultado = cacheada(*args, **kwargs)
+            registro.registrar_llamada(etiqueta, time.perf_counter() - inicio)
+            return resultado
+
+        llamar.clear = getattr(cacheada, 'clear', lambda: None)
+        return llamar
+
+    return decorador
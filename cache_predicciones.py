@@ -0,0 +1,177 @@
+"""
+===============================================================================
+🧠 CACHÉ DE PREDICCIONES (LRU + TTL, invalidada por versión del modelo)
+===============================================================================
+
+Cada rerun de Streamlit y cada clic de sensibilidad recalculan el mismo caso
+base. Esta caché memoriza los resultados de calcular_ciclo_completo y
+calcular_capacidad_y_mod:
+
+    • Clave = entradas normalizadas + hash de la versión del modelo
+      (un reentrenamiento invalida automáticamente las entradas antiguas)
+    • LRU acotada por número de entradas, con TTL opcional
+    • Contadores de aciertos / fallos / desalojos / expirados
+    • En memoria por defecto; opcionalmente respaldada en SQLite para que
+      sobreviva a reinicios del ejecutable
+
+===============================================================================
+"""
+
+import copy
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import logic
+
+
+class CachePredicciones:
+    """
+    Caché LRU thread-safe con TTL y respaldo opcional en SQLite.
+
+    Args:
+        max_entradas: Número máximo de entradas en memoria
+        ttl: Segundos de validez de cada entrada (None = sin caducidad)
+        ruta_sqlite: Ruta a un fichero SQLite para persistir (None = solo memoria)
+    """
+
+    def __init__(self, max_entradas=1024, ttl=None, ruta_sqlite=None):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self.ruta_sqlite = ruta_sqlite
+
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+        self.estadisticas = {'aciertos': 0, 'fallos': 0, 'desalojos': 0, 'expirados': 0}
+
+        self._conexion = None
+        if ruta_sqlite is not None:
+            self._conexion = sqlite3.connect(str(ruta_sqlite), check_same_thread=False)
+            self._conexion.execute(
+                "CREATE TABLE IF NOT EXISTS cache (clave TEXT PRIMARY KEY, valor TEXT, expira REAL)"
+            )
+            self._conexion.commit()
+
+    # ========================================================================
+    # OPERACIONES BÁSICAS
+    # ========================================================================
+
+    def obtener(self, clave):
+        """Devuelve (encontrado, valor)"""
+        ahora = time.time()
+        with self._lock:
+            if clave in self._datos:
+                valor, expira = self._datos[clave]
+                if expira is None or expira > ahora:
+                    self._datos.move_to_end(clave)
+                    self.estadisticas['aciertos'] += 1
+                    return True, valor
+                del self._datos[clave]
+                self.estadisticas['expirados'] += 1
+
+            if self._conexion is not None:
+                fila = self._conexion.execute(
+                    "SELECT valor, expira FROM cache WHERE clave = ?", (clave,)
+                ).fetchone()
+                if fila is not None:
+                    valor, expira = json.loads(fila[0]), fila[1]
+                    if expira is None or expira > ahora:
+                        self._insertar(clave, valor, expira)
+                        self.estadisticas['aciertos'] += 1
+                        return True, valor
+                    self._conexion.execute("DELETE FROM cache WHERE clave = ?", (clave,))
+                    self._conexion.commit()
+                    self.estadisticas['expirados'] += 1
+
+            self.estadisticas['fallos'] += 1
+            return False, None
+
+    def guardar(self, clave, valor):
+        expira = time.time() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._insertar(clave, valor, expira)
+            if self._conexion is not None:
+                self._conexion.execute(
+                    "INSERT OR REPLACE INTO cache (clave, valor, expira) VALUES (?, ?, ?)",
+                    (clave, json.dumps(valor), expira)
+                )
+                self._conexion.commit()
+
+    def _insertar(self, clave, valor, expira):
+        self._datos[clave] = (valor, expira)
+        self._datos.move_to_end(clave)
+        while len(self._datos) > self.max_entradas:
+            self._datos.popitem(last=False)
+            self.estadisticas['desalojos'] += 1
+
+    def obtener_o_calcular(self, clave, funcion):
+        """Devuelve el valor cacheado o lo calcula con funcion() y lo guarda"""
+        encontrado, valor = self.obtener(clave)
+        if not encontrado:
+            valor = funcion()
+            self.guardar(clave, valor)
+        # Copia para que el llamador no pueda alterar la entrada cacheada
+        return copy.deepcopy(valor)
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+            if self._conexion is not None:
+                self._conexion.execute("DELETE FROM cache")
+                self._conexion.commit()
+
+    def __len__(self):
+        return len(self._datos)
+
+
+# ============================================================================
+# CLAVES NORMALIZADAS
+# ============================================================================
+
+def _normalizar(valor):
+    """Normaliza una entrada para que 100, 100.0, True/1 y np.float64(100) den la misma clave"""
+    if valor is None:
+        return None
+    if isinstance(valor, (list, tuple)):
+        return [_normalizar(v) for v in valor]
+    return round(float(valor), 9)
+
+
+def construir_clave(nombre, *args):
+    """Clave = función + entradas normalizadas + versión del modelo vigente"""
+    return json.dumps([nombre, logic.version_modelo(), _normalizar(list(args))])
+
+
+# ============================================================================
+# CACHÉ POR DEFECTO Y FUNCIONES CACHEADAS
+# ============================================================================
+
+cache_por_defecto = CachePredicciones()
+
+
+def configurar_cache(max_entradas=1024, ttl=None, ruta_sqlite=None):
+    """Sustituye la caché por defecto (p. ej. para activar el respaldo SQLite)"""
+    global cache_por_defecto
+    cache_por_defecto = CachePredicciones(max_entradas, ttl, ruta_sqlite)
+    return cache_por_defecto
+
+
+def calcular_ciclo_cacheado(spw, mastico_mm, tox, rh_mm, tuercas, tuckers, marcado, factor_ia, peso=None):
+    """Igual que logic.calcular_ciclo_completo, memorizado (peso forma parte de la clave)"""
+    args = (spw, mastico_mm, tox, rh_mm, tuercas, tuckers, marcado, factor_ia, peso)
+    return cache_por_defecto.obtener_o_calcular(
+        construir_clave('ciclo', *args),
+        lambda: logic.calcular_ciclo_completo(*args)
+    )
+
+
+def calcular_capacidad_cacheada(t_ciclo, dias, turnos, horas, volumenes, p_kit, p_rack, peso):
+    """Igual que logic.calcular_capacidad_y_mod, memorizado"""
+    args = (t_ciclo, dias, turnos, horas, list(volumenes), p_kit, p_rack, peso)
+    resultado = cache_por_defecto.obtener_o_calcular(
+        construir_clave('capacidad', *args),
+        lambda: list(logic.calcular_capacidad_y_mod(*args))
+    )
+    return tuple(resultado)
@@ -0,0 +1,322 @@
+"""
+===============================================================================
+🔎 ÍNDICE DE PROYECTOS COMPARABLES (k vecinos más cercanos)
+===============================================================================
+
+"COMPARAR CON HISTÓRICO" mostraba la tabla completa. Lo que busca quien
+oferta son los k proyectos pasados más parecidos a la oferta actual
+(SPW, Peso, dimensiones) y su Tiempo_Real_Ofertado.
+
+    • Las variables se estandarizan ((x - media) / desv) para que SPW y
+      milímetros pesen lo mismo; un valor ausente cuenta como la media.
+    • El índice se guarda junto a la base limpia:
+          base_datos_limpia.comparables.npy   matriz (n, d+1) float64:
+                                              variables estandarizadas +
+                                              Tiempo_Real_Ofertado
+          base_datos_limpia.comparables.json  variables, medias, escalas y
+                                              huella (tamaño, mtime) del
+                                              almacén del que se construyó
+      El .npy se abre con memory-map: cargarlo no lee el fichero entero.
+    • Búsqueda:
+          n ≤ UMBRAL_FUERZA_BRUTA  →  fuerza bruta con BLAS
+                                      (‖z‖² - 2·Z·q + ‖q‖²)
+          n grande                 →  KD-tree (scipy.spatial.cKDTree),
+                                      construido una vez por combinación de
+                                      variables consultadas
+      Con 1M filas una consulta k=10 tarda < 1 ms una vez construido el árbol.
+
+La consulta puede traer solo parte de las variables (la app solo pide SPW y
+Peso): la distancia se mide en las que vienen.
+
+===============================================================================
+"""
+
+import json
+import os
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+VARIABLES_COMPARABLES = ['SPW', 'Peso', 'LONGITUD ASSY', 'ANCHO ASSY', 'ALTO ASSY']
+VARIABLE_OBJETIVO = 'Tiempo_Real_Ofertado'
+UMBRAL_FUERZA_BRUTA = 20_000
+VERSION_INDICE = 1
+
+
+def rutas_indice(ruta_datos):
+    """(ruta .npy, ruta .json) del índice asociado a la base limpia (.parquet o .csv)"""
+    ruta_datos = Path(ruta_datos)
+    return ruta_datos.with_suffix('.comparables.npy'), ruta_datos.with_suffix('.comparables.json')
+
+
+def _huella(ruta_datos):
+    estado = os.stat(ruta_datos)
+    return {'tamano': estado.st_size, 'mtime_ns': estado.st_mtime_ns}
+
+
+def _escribir_atomico(ruta, escribir):
+    descriptor, temporal = tempfile.mkstemp(dir=Path(ruta).parent, prefix=f'.{Path(ruta).name}.')
+    try:
+        with os.fdopen(descriptor, 'wb') as f:
+            escribir(f)
+        os.replace(temporal, ruta)
+    except BaseException:
+        os.unlink(temporal)
+        raise
+
+
+# ============================================================================
+# ÍNDICE
+# ============================================================================
+
+class IndiceComparables:
+    """
+    Índice k-NN sobre las variables estandarizadas del histórico.
+
+    Atributos:
+        variables: Variables indexadas (orden de las columnas)
+        medias, escalas: Parámetros de estandarización
+        matriz: Array (n, d+1); columnas 0..d-1 estandarizadas, la última
+                es Tiempo_Real_Ofertado. Puede ser un memmap de solo lectura
+    """
+
+    def __init__(self, matriz, variables, medias, escalas):
+        self.matriz = matriz
+        self.variables = list(variables)
+        self.medias = np.asarray(medias, dtype=float)
+        self.escalas = np.asarray(escalas, dtype=float)
+        # Estructuras derivadas por combinación de columnas consultadas
+        self._arboles = {}
+        self._densas = {}
+
+    @property
+    def n(self):
+        return self.matriz.shape[0]
+
+    @property
+    def tiempos(self):
+        return self.matriz[:, -1]
+
+    # ========================================================================
+    # CONSTRUCCIÓN Y PERSISTENCIA
+    # ========================================================================
+
+    @classmethod
+    def construir(cls, df, variables=None):
+        """
+        Construye el índice a partir del DataFrame limpio.
+
+        Args:
+            df: DataFrame con las variables y Tiempo_Real_Ofertado
+            variables: Variables a indexar (por defecto las de
+                       VARIABLES_COMPARABLES presentes en df)
+        """
+        if variables is None:
+            variables = [v for v in VARIABLES_COMPARABLES if v in df.columns]
+        if not variables:
+            raise ValueError("El DataFrame no contiene ninguna variable comparable")
+
+        X = df[variables].to_numpy(dtype=float)
+        medias = np.nanmean(X, axis=0) if len(X) else np.zeros(len(variables))
+        escalas = np.nanstd(X, axis=0) if len(X) else np.ones(len(variables))
+        medias = np.nan_to_num(medias)
+        escalas = np.where(np.isfinite(escalas) & (escalas > 0), escalas, 1.0)
+
+        matriz = np.empty((len(X), len(variables) + 1))
+        matriz[:, :-1] = np.nan_to_num((X - medias) / escalas)
+        matriz[:, -1] = df[VARIABLE_OBJETIVO].to_numpy(dtype=float)
+        return cls(matriz, variables, medias, escalas)
+
+    def guardar(self, ruta_datos):
+        """
+        Guarda el índice junto a la base limpia (escritura atómica de ambos
+        ficheros).
+
+        La huella de ruta_datos se toma al guardar; si el fichero cambia
+        después, obtener_indice reconstruye.
+        """
+        ruta_npy, ruta_json = rutas_indice(ruta_datos)
+        _escribir_atomico(ruta_npy, lambda f: np.save(f, np.ascontiguousarray(self.matriz)))
+        meta = {
+            'version': VERSION_INDICE,
+            'variables': self.variables,
+            'medias': self.medias.tolist(),
+            'escalas': self.escalas.tolist(),
+            'n': self.n,
+            'origen': _huella(ruta_datos),
+        }
+        _escribir_atomico(ruta_json, lambda f: f.write(json.dumps(meta, indent=2).encode()))
+
+    @classmethod
+    def cargar(cls, ruta_datos, mmap=True):
+        """
+        Abre el índice guardado junto a ruta_datos.
+
+        Returns:
+            (indice, meta) con meta el contenido del .json
+        """
+        ruta_npy, ruta_json = rutas_indice(ruta_datos)
+        with open(ruta_json, 'r') as f:
+            meta = json.load(f)
+        if meta.get('version', 0) > VERSION_INDICE:
+            raise ValueError(f"Versión de índice {meta['version']} no soportada")
+        matriz = np.load(ruta_npy, mmap_mode='r' if mmap else None, allow_pickle=False)
+        return cls(matriz, meta['variables'], meta['medias'], meta['escalas']), meta
+
+    # ========================================================================
+    # BÚSQUEDA
+    # ========================================================================
+
+    def _densa(self, columnas):
+        """Submatriz contigua y normas al cuadrado (fuerza bruta)"""
+        if columnas not in self._densas:
+            Z = np.ascontiguousarray(self.matriz[:, list(columnas)], dtype=float)
+            self._densas[columnas] = (Z, np.einsum('ij,ij->i', Z, Z))
+        return self._densas[columnas]
+
+    def _arbol(self, columnas):
+        """KD-tree para esas columnas (None si scipy no está disponible)"""
+        if columnas not in self._arboles:
+            try:
+                from scipy.spatial import cKDTree
+            except ImportError:
+                self._arboles[columnas] = None
+            else:
+                self._arboles[columnas] = cKDTree(np.asarray(self.matriz[:, list(columnas)]),
+                                                  balanced_tree=False)
+        return self._arboles[columnas]
+
+    def _fuerza_bruta(self, Q, columnas, k):
+        Z, normas = self._densa(columnas)
+        d2 = normas[None, :] - 2.0 * (Q @ Z.T) + np.einsum('ij,ij->i', Q, Q)[:, None]
+        np.maximum(d2, 0.0, out=d2)
+        if k < self.n:
+            candidatos = np.argpartition(d2, k - 1, axis=1)[:, :k]
+        else:
+            candidatos = np.broadcast_to(np.arange(self.n), d2.shape)
+        d2_candidatos = np.take_along_axis(d2, candidatos, axis=1)
+        orden = np.lexsort((candidatos, d2_candidatos), axis=1)
+        indices = np.take_along_axis(candidatos, orden, axis=1)
+        return np.sqrt(np.take_along_axis(d2_candidatos, orden, axis=1)), indices
+
+    def _buscar_columnas(self, Q, columnas, k):
+        """(distancias, indices) (m, k) de las filas de Q (sin NaN) en esas columnas"""
+        arbol = self._arbol(columnas) if self.n > UMBRAL_FUERZA_BRUTA else None
+        if arbol is None:
+            return self._fuerza_bruta(Q, columnas, k)
+        distancias, indices = arbol.query(Q, k=k)
+        return (np.asarray(distancias, dtype=float).reshape(len(Q), k),
+                np.asarray(indices, dtype=np.int64).reshape(len(Q), k))
+
+    def buscar(self, consulta, k=5):
+        """
+        Los k proyectos históricos más cercanos.
+
+        Args:
+            consulta: Dict {variable: valor}; los valores pueden ser escalares
+                      o arrays de la misma longitud (consulta por lotes).
+                      Variables no indexadas o con valor None/NaN se ignoran;
+                      por lotes, un NaN solo excluye esa variable en su fila
+            k: Número de vecinos (se limita a n)
+
+        Returns:
+            Dict con:
+                'indices': posiciones de fila en la base limpia
+                'distancias': distancia euclídea estandarizada
+                'tiempos': Tiempo_Real_Ofertado de cada vecino
+                'variables': variables usadas en la distancia (por lotes,
+                             las que trae alguna fila)
+            Con consulta escalar los arrays son (k,); por lotes, (m, k).
+
+        Raises:
+            ValueError: Sin variables indexadas, índice vacío o una fila del
+                        lote sin ningún valor
+        """
+        usadas = [v for v in self.variables
+                  if v in consulta and consulta[v] is not None
+                  and not np.all(np.isnan(np.asarray(consulta[v], dtype=float)))]
+        if not usadas:
+            raise ValueError(f"La consulta no contiene ninguna de las variables {self.variables}")
+        if self.n == 0:
+            raise ValueError("El índice está vacío")
+
+        columnas = tuple(self.variables.index(v) for v in usadas)
+        valores = [np.asarray(consulta[v], dtype=float) for v in usadas]
+        escalar = all(v.ndim == 0 for v in valores)
+        Q = np.column_stack([np.atleast_1d(v) for v in valores])
+        Q = (Q - self.medias[list(columnas)]) / self.escalas[list(columnas)]
+        k = int(min(k, self.n))
+
+        # Por lotes, cada fila se mide en las variables que trae: las filas
+        # se agrupan por patrón de valores presentes y cada grupo se busca
+        # con sus columnas
+        presentes = ~np.isnan(Q)
+        vacias = np.flatnonzero(~presentes.any(axis=1))
+        if len(vacias):
+            raise ValueError(f"Filas de la consulta sin ningún valor en {usadas}: {vacias[:10].tolist()}")
+        if presentes.all():
+            distancias, indices = self._buscar_columnas(Q, columnas, k)
+        else:
+            distancias = np.empty((len(Q), k))
+            indices = np.empty((len(Q), k), dtype=np.int64)
+            patrones, grupo = np.unique(presentes, axis=0, return_inverse=True)
+            for g, patron in enumerate(patrones):
+                filas = np.flatnonzero(grupo.ravel() == g)
+                distancias[filas], indices[filas] = self._buscar_columnas(
+                    Q[np.ix_(filas, patron)], tuple(np.asarray(columnas)[patron].tolist()), k)
+
+        tiempos = np.asarray(self.tiempos[indices.ravel()]).reshape(indices.shape)
+        if escalar:
+            distancias, indices, tiempos = distancias[0], indices[0], tiempos[0]
+        return {'indices': indices, 'distancias': distancias, 'tiempos': tiempos, 'variables': usadas}
+
+
+# ============================================================================
+# CARGA CON RECONSTRUCCIÓN AUTOMÁTICA
+# ============================================================================
+
+def obtener_indice(ruta_datos='base_datos_limpia.parquet', mmap=True):
+    """
+    Devuelve el índice de la base limpia, reconstruyéndolo (y guardándolo)
+    si no existe o si la base ha cambiado desde que se construyó.
+
+    Args:
+        ruta_datos: Almacén Parquet (o su CSV hermano si no existe)
+
+    Returns:
+        IndiceComparables, o None si no hay base limpia
+    """
+    from almacen_historico import columnas_historico, leer_historico, resolver_historico
+
+    ruta_datos = resolver_historico(ruta_datos)
+    if ruta_datos is None:
+        return None
+
+    try:
+        indice, meta = IndiceComparables.cargar(ruta_datos, mmap=mmap)
+        if meta.get('origen') == _huella(ruta_datos):
+            return indice
+    except (FileNotFoundError, ValueError, KeyError, json.JSONDecodeError):
+        pass
+
+    columnas = set(VARIABLES_COMPARABLES + [VARIABLE_OBJETIVO])
+    df = leer_historico(ruta_datos, columnas=[c for c in columnas_historico(ruta_datos) if c in columnas])
+    indice = IndiceComparables.construir(df)
+    try:
+        indice.guardar(ruta_datos)
+    except OSError:
+        # Directorio de solo lectura (p. ej. ejecutable empaquetado): índice en memoria
+        pass
+    return indice
+
+
+if __name__ == "__main__":
+    indice = obtener_indice()
+    if indice is None:
+        print("❌ No se encontró base_datos_limpia.parquet ni base_datos_limpia.csv")
+    else:
+        print(f"✅ Índice de comparables: {indice.n} proyectos, variables {indice.variables}")
+        r = indice.buscar({'SPW': 100, 'Peso': 20.0}, k=3)
+        for i, d, t in zip(r['indices'], r['distancias'], r['tiempos']):
+            print(f"   fila {i}: distancia {d:.3f}  →  {t:.1f}s")
@@ -1,26 +1,43 @@
+import hashlib
+import io
 import pandas as pd
 import numpy as np
 from pathlib import Path
 
+from deteccion_outliers import outliers_iqr
+from parser_numerico import convertir_columnas_numericas
+
 # ============================================================================
 # SCRIPT DE LIMPIEZA Y ANÁLISIS EXPLORATORIO
 # ============================================================================
 
-def limpiar_base_datos(ruta_csv):
+COLUMNAS_NUMERICAS = ['SPW', 'Mastico_mm', 'Tucker', 'Peso', 'LONGITUD ASSY',
+                      'ANCHO ASSY', 'ALTO ASSY', 'Tiempo_Real_Ofertado']
+
+def limpiar_base_datos(ruta_csv, columnas_numericas=None, decimal=','):
     """
     Limpia la base de datos histórica:
-    1. Normaliza decimales (comas → puntos)
+    1. Normaliza decimales ('.' o ',' por celda, con o sin miles)
     2. Convierte tipos de datos
     3. Identifica missing values
     4. Calcula estadísticas descriptivas
+    
+    Args:
+        ruta_csv: CSV histórico
+        columnas_numericas: Columnas a convertir (por defecto COLUMNAS_NUMERICAS;
+                            la última es la variable objetivo)
+        decimal: Separador decimal del CSV
     """
     
     print("=" * 80)
     print("📊 ANÁLISIS EXPLORATORIO - BASE DE DATOS HISTÓRICA")
     print("=" * 80)
     
-    # Leer CSV con flexibilidad decimal
-    df = pd.read_csv(ruta_csv, decimal=',')
+    columnas_numericas = list(columnas_numericas or COLUMNAS_NUMERICAS)
+    
+    # Las columnas numéricas se leen como texto: "12.7" y "10,00" conviven
+    # en la misma columna y las resuelve parsear_numeros celda a celda
+    df = pd.read_csv(ruta_csv, decimal=decimal, dtype={col: str for col in columnas_numericas})
     print(f"\n✅ CSV cargada: {len(df)} registros\n")
     
     # Mostrar estructura
@@ -31,16 +48,13 @@ def limpiar_base_datos(ruta_csv):
     # Reemplazar valores problemáticos
     print("🔧 LIMPIEZA EN PROGRESO:")
     
-    # Asegurar conversión numérica
-    columnas_numericas = ['SPW', 'Mastico_mm', 'Tucker', 'Peso', 'LONGITUD ASSY', 
-                          'ANCHO ASSY', 'ALTO ASSY', 'Tiempo_Real_Ofertado']
-    
+    # Asegurar conversión numérica (decimal '.' o ',' y miles por celda)
+    coaccionadas = convertir_columnas_numericas(df, columnas_numericas)
     for col in columnas_numericas:
-        try:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
-            print(f"  ✓ {col:25} → Convertido a numérico")
-        except Exception as e:
-            print(f"  ✗ {col:25} → Error: {e}")
+        n_malas = int((coaccionadas['columna'] == col).sum())
+        estado = f"{n_malas} celdas no numéricas o ambiguas → NaN" if n_malas else "Convertido a numérico"
+        print(f"  {'✗' if n_malas else '✓'} {col:25} → {estado}")
+    _imprimir_coaccionadas(coaccionadas)
     
     # Mostrar valores faltantes
     print(f"\n❌ VALORES FALTANTES (NaN):")
@@ -56,26 +70,463 @@ def limpiar_base_datos(ruta_csv):
     
     # Correlación con variable objetivo
     print("\n🔗 CORRELACIÓN CON TIEMPO_REAL_OFERTADO:")
-    correlaciones = df[columnas_numericas].corr()['Tiempo_Real_Ofertado'].sort_values(ascending=False)
+    correlaciones = df[columnas_numericas].corr()[columnas_numericas[-1]].sort_values(ascending=False)
     print(correlaciones.round(3))
     
     # Identificar outliers (método: IQR)
     print("\n⚠️  ANÁLISIS DE OUTLIERS (método IQR):")
-    for col in columnas_numericas[:-1]:  # Excluir target
-        Q1 = df[col].quantile(0.25)
-        Q3 = df[col].quantile(0.75)
-        IQR = Q3 - Q1
-        outliers = df[(df[col] < Q1 - 1.5*IQR) | (df[col] > Q3 + 1.5*IQR)]
-        if len(outliers) > 0:
-            print(f"  {col}: {len(outliers)} outliers detectados")
-            print(f"    Rango normal: [{Q1 - 1.5*IQR:.1f}, {Q3 + 1.5*IQR:.1f}]")
+    iqr = outliers_iqr(df, columnas=columnas_numericas[:-1])  # Excluir target
+    for col, n_outliers, inferior, superior in zip(iqr['columnas'], iqr['mascara'].sum(axis=0),
+                                                   iqr['inferior'], iqr['superior']):
+        if n_outliers > 0:
+            print(f"  {col}: {n_outliers} outliers detectados")
+            print(f"    Rango normal: [{inferior:.1f}, {superior:.1f}]")
     
     # Dataset limpio
     df_clean = df.dropna()
     print(f"\n✅ DATASET LIMPIO: {len(df_clean)} registros (removidos {len(df) - len(df_clean)})")
     
+    # Celdas coaccionadas (fila del CSV original, columna, texto, motivo)
+    df_clean.attrs['celdas_coaccionadas'] = coaccionadas.to_dict('records')
+    
     return df_clean
 
+
+def _imprimir_coaccionadas(coaccionadas, maximo=20):
+    """Lista las celdas con texto no numérico o ambiguo convertidas a NaN"""
+    if len(coaccionadas) == 0:
+        return
+    print(f"\n⚠️  CELDAS NO NUMÉRICAS O AMBIGUAS ({len(coaccionadas)}):")
+    for celda in coaccionadas.head(maximo).itertuples(index=False):
+        print(f"  fila {celda.fila}, {celda.columna}: {celda.valor!r} ({celda.motivo})")
+    if len(coaccionadas) > maximo:
+        print(f"  ... y {len(coaccionadas) - maximo} más")
+
+# ============================================================================
+# LIMPIEZA POR BLOQUES (una pasada, memoria acotada)
+# ============================================================================
+
+def limpiar_base_datos_por_bloques(ruta_csv, ruta_salida, columnas_numericas=None, decimal=',',
+                                   tamano_bloque=100_000, k_cuantiles=200, verbose=True,
+                                   ruta_parquet=None):
+    """
+    Misma limpieza que limpiar_base_datos, pero en una sola pasada por
+    bloques: la memoria no depende del tamaño del fichero.
+
+    Cada bloque se convierte a numérico, actualiza las estadísticas
+    (conteos, media/varianza de Welford, co-momentos para la correlación y
+    sketches KLL para los cuartiles del IQR) y sus filas completas se
+    escriben en ruta_salida (a un temporal que se renombra al terminar).
+
+    Con pocas filas los cuartiles y los outliers son exactos; con muchas son
+    aproximados (error de rango ~1/k_cuantiles). El CSV limpio tiene las
+    mismas filas y valores que el de limpiar_base_datos; solo puede cambiar
+    el formato ('242' frente a '242.0') en columnas que tienen NaN en
+    unos bloques y no en otros.
+
+    Args:
+        ruta_csv: CSV histórico
+        ruta_salida: CSV limpio de destino
+        columnas_numericas: Como en limpiar_base_datos
+        decimal: Separador decimal del CSV
+        tamano_bloque: Filas por bloque
+        k_cuantiles: Precisión de los sketches de cuantiles
+        verbose: Imprimir el resumen al terminar
+        ruta_parquet: Si se indica, los bloques limpios se escriben también
+                      en el almacén Parquet (un grupo de filas por bloque)
+
+    Returns:
+        Dict con 'estadisticas' (EstadisticasFlujo), 'registros', 'limpios' y
+        'coaccionadas' (celdas no numéricas o ambiguas: fila, columna, valor, motivo)
+    """
+    from estadisticas_flujo import EstadisticasFlujo
+    from almacen_historico import EscritorHistorico, esquema_historico
+    
+    columnas_numericas = list(columnas_numericas or COLUMNAS_NUMERICAS)
+    estadisticas = EstadisticasFlujo(columnas_numericas, k_cuantiles=k_cuantiles)
+    ruta_salida = Path(ruta_salida)
+    temporal = ruta_salida.with_name(f'.{ruta_salida.name}.tmp')
+    estructura = None
+    escritor = None
+    limpios = 0
+    coaccionadas = []
+    
+    try:
+        with open(temporal, 'w', newline='') as salida:
+            for bloque in pd.read_csv(ruta_csv, decimal=decimal, chunksize=tamano_bloque,
+                                      dtype={col: str for col in columnas_numericas}):
+                if estructura is None:
+                    estructura = bloque.dtypes
+                    if ruta_parquet is not None:
+                        escritor = EscritorHistorico(ruta_parquet, esquema_historico(
+                            list(bloque.columns), columnas_numericas))
+                # El índice de cada bloque continúa el anterior: fila = fila del CSV
+                coaccionadas.append(convertir_columnas_numericas(bloque, columnas_numericas))
+                estadisticas.actualizar(bloque[columnas_numericas])
+                
+                bloque_limpio = bloque.dropna()
+                bloque_limpio.to_csv(salida, index=False, header=salida.tell() == 0, decimal='.')
+                if escritor is not None:
+                    escritor.escribir(bloque_limpio)
+                limpios += len(bloque_limpio)
+        temporal.replace(ruta_salida)
+        if escritor is not None:
+            escritor.cerrar()
+    except BaseException:
+        temporal.unlink(missing_ok=True)
+        if escritor is not None:
+            escritor.cerrar(confirmar=False)
+        raise
+    
+    coaccionadas = pd.concat(coaccionadas, ignore_index=True) if coaccionadas else None
+    if verbose:
+        _imprimir_resumen_flujo(estadisticas, estructura, limpios)
+        if coaccionadas is not None:
+            _imprimir_coaccionadas(coaccionadas)
+    
+    return {'estadisticas': estadisticas, 'registros': estadisticas.n_filas, 'limpios': limpios,
+            'coaccionadas': coaccionadas}
+
+
+# ============================================================================
+# LIMPIEZA INCREMENTAL (solo filas nuevas o cambiadas)
+# ============================================================================
+
+FRACCION_RECONSTRUCCION = 0.05   # Retiradas / filas a partir de la que se recalculan los cuantiles
+
+
+def _hasher_prefijo(ruta_csv, offset):
+    """
+    SHA-256 de los primeros offset bytes del CSV (todo lo ya procesado).
+
+    Se hashea el prefijo entero, no solo su final: una edición en el sitio
+    de la misma longitud en cualquier fila anterior cambia la firma y fuerza
+    el modo 'completo'. Es lectura secuencial sin parseo (~0,1 s por 50 MB).
+    """
+    hasher = hashlib.sha256()
+    with open(ruta_csv, 'rb') as f:
+        restante = offset
+        while restante > 0:
+            bloque = f.read(min(restante, 1 << 20))
+            if not bloque:
+                break
+            hasher.update(bloque)
+            restante -= len(bloque)
+    return hasher
+
+
+def _tipar_enteros(df, columnas):
+    """Columnas sin NaN y con valores enteros → int64 (como las infiere read_csv)"""
+    for col in columnas:
+        valores = df[col].to_numpy(dtype=float)
+        if len(valores) and np.isfinite(valores).all() and (valores == np.round(valores)).all():
+            df[col] = valores.astype(np.int64)
+    return df
+
+
+class EstadoLimpieza:
+    """
+    Lo que la limpieza incremental recuerda entre ejecuciones (un .npz):
+
+        proyectos, hashes   Un registro por Proyecto y el hash de su fila bruta
+        valores             Valores numéricos ya convertidos (n, d)
+        otras, otras_nulas  Resto de columnas de texto y sus nulos
+        offset, firma       Marca de agua: bytes del CSV ya procesados y
+                            SHA-256 de todos ellos
+        filas_csv           Filas de datos del CSV hasta la marca de agua
+        tamano_salida       Tamaño del CSV limpio escrito por la última ejecución
+        retiradas           Filas retiradas de las estadísticas desde el
+                            último recálculo
+        estadisticas        EstadisticasFlujo de todas las filas actuales
+    """
+
+    VERSION = 1
+
+    def __init__(self, columnas, columnas_numericas, k_cuantiles=200):
+        from estadisticas_flujo import EstadisticasFlujo
+
+        self.columnas = list(columnas)
+        self.columnas_numericas = list(columnas_numericas)
+        self.otras_columnas = [c for c in self.columnas if c != 'Proyecto' and c not in self.columnas_numericas]
+        self.proyectos = np.empty(0, dtype=str)
+        self.hashes = np.empty(0, dtype=np.uint64)
+        self.valores = np.empty((0, len(self.columnas_numericas)))
+        self.otras = np.empty((0, len(self.otras_columnas)), dtype=str)
+        self.otras_nulas = np.empty((0, len(self.otras_columnas)), dtype=bool)
+        self.offset = 0
+        self.firma = ''
+        self.filas_csv = 0
+        self.tamano_salida = -1
+        self.retiradas = 0
+        self.k_cuantiles = k_cuantiles
+        self.estadisticas = EstadisticasFlujo(self.columnas_numericas, k_cuantiles=k_cuantiles)
+
+    def completas(self):
+        """Máscara de proyectos sin ningún valor ausente (los que van al CSV limpio)"""
+        return ~np.isnan(self.valores).any(axis=1) & ~self.otras_nulas.any(axis=1)
+
+    def a_dataframe(self, mascara=None):
+        """Filas del estado como DataFrame con las columnas del CSV original"""
+        mascara = slice(None) if mascara is None else mascara
+        datos = {'Proyecto': self.proyectos[mascara]}
+        for j, col in enumerate(self.otras_columnas):
+            datos[col] = np.where(self.otras_nulas[mascara, j], None, self.otras[mascara, j])
+        for j, col in enumerate(self.columnas_numericas):
+            datos[col] = self.valores[mascara, j]
+        return pd.DataFrame(datos)[self.columnas]
+
+    def reconstruir_estadisticas(self):
+        """Recalcula las estadísticas (cuantiles y extremos exactos otra vez) sin releer el CSV"""
+        from estadisticas_flujo import EstadisticasFlujo
+
+        self.estadisticas = EstadisticasFlujo(self.columnas_numericas, k_cuantiles=self.k_cuantiles)
+        self.estadisticas.actualizar(self.valores)
+        self.retiradas = 0
+
+    def guardar(self, ruta):
+        ruta = Path(ruta)
+        campos = {
+            'version': np.array(self.VERSION),
+            'columnas': np.array(self.columnas, dtype=str),
+            'columnas_numericas': np.array(self.columnas_numericas, dtype=str),
+            'proyectos': self.proyectos.astype(str),
+            'hashes': self.hashes,
+            'valores': self.valores,
+            'otras': self.otras.astype(str),
+            'otras_nulas': self.otras_nulas,
+            'offset': np.array(self.offset),
+            'firma': np.array(self.firma),
+            'filas_csv': np.array(self.filas_csv),
+            'tamano_salida': np.array(self.tamano_salida),
+            'retiradas': np.array(self.retiradas),
+            'k_cuantiles': np.array(self.k_cuantiles),
+        }
+        campos.update(self.estadisticas.a_campos('est_'))
+        temporal = ruta.with_name(f'.{ruta.name}.tmp')
+        with open(temporal, 'wb') as f:
+            np.savez(f, **campos)
+        temporal.replace(ruta)
+
+    @classmethod
+    def cargar(cls, ruta):
+        from estadisticas_flujo import EstadisticasFlujo
+
+        with np.load(ruta, allow_pickle=False) as datos:
+            if int(datos['version']) > cls.VERSION:
+                raise ValueError(f"Versión de estado {int(datos['version'])} no soportada")
+            estado = cls(datos['columnas'].tolist(), datos['columnas_numericas'].tolist(),
+                         int(datos['k_cuantiles']))
+            estado.proyectos = datos['proyectos']
+            estado.hashes = datos['hashes']
+            estado.valores = datos['valores']
+            estado.otras = datos['otras']
+            estado.otras_nulas = datos['otras_nulas']
+            estado.offset = int(datos['offset'])
+            estado.firma = str(datos['firma'])
+            estado.filas_csv = int(datos['filas_csv'])
+            estado.tamano_salida = int(datos['tamano_salida'])
+            estado.retiradas = int(datos['retiradas'])
+            estado.estadisticas = EstadisticasFlujo.desde_campos(datos, 'est_')
+        return estado
+
+
+def limpiar_base_datos_incremental(ruta_csv, ruta_salida='base_datos_limpia.csv', columnas_numericas=None,
+                                   decimal=',', ruta_parquet=None, ruta_estado=None, k_cuantiles=200,
+                                   verbose=True):
+    """
+    Limpieza incremental: solo se convierten las filas nuevas o cambiadas
+    desde la ejecución anterior.
+
+    Cada Proyecto es un registro (si aparece varias veces gana la última
+    fila; conserva la posición de su primera aparición). Entre ejecuciones
+    se guarda un EstadoLimpieza junto al CSV limpio:
+
+        • Si el CSV solo ha crecido (el SHA-256 de los bytes ya procesados
+          coincide) se parsean únicamente los bytes nuevos: el coste es
+          proporcional al delta más una lectura secuencial del prefijo. Las filas añadidas con un Proyecto existente lo actualizan.
+        • Si no, se relee el CSV entero pero solo se convierten las filas
+          cuyo hash ha cambiado; los Proyectos que ya no están se eliminan.
+
+    Las estadísticas (media, varianza, correlaciones) se actualizan en el
+    sitio: las filas nuevas se añaden y las versiones anteriores de las
+    cambiadas se retiran. Cuantiles (límites IQR) y extremos no admiten
+    borrado; cuando las filas retiradas superan FRACCION_RECONSTRUCCION se
+    recalculan desde el estado, sin releer el CSV.
+
+    El CSV limpio se amplía con las filas nuevas si no hubo cambios ni
+    bajas; si no, se reescribe desde el estado. El Parquet, si se pide,
+    siempre se reescribe desde el estado (sin volver a convertir nada).
+
+    Args:
+        ruta_csv: CSV histórico
+        ruta_salida: CSV limpio de destino
+        columnas_numericas: Como en limpiar_base_datos
+        decimal: Separador decimal del CSV
+        ruta_parquet: Almacén Parquet a reescribir (None = no se escribe)
+        ruta_estado: Fichero de estado (por defecto <ruta_salida>.estado.npz)
+        k_cuantiles: Precisión de los sketches de cuantiles
+        verbose: Imprimir el resumen al terminar
+
+    Returns:
+        Dict con 'modo' ('inicial', 'anexado' o 'completo'), 'nuevos',
+        'cambiados', 'eliminados', 'sin_cambios', 'limpios',
+        'estadisticas' (EstadisticasFlujo) y 'coaccionadas'
+    """
+    columnas_numericas = list(columnas_numericas or COLUMNAS_NUMERICAS)
+    ruta_csv, ruta_salida = Path(ruta_csv), Path(ruta_salida)
+    ruta_estado = Path(ruta_estado) if ruta_estado else ruta_salida.with_suffix('.estado.npz')
+    columnas = list(pd.read_csv(ruta_csv, nrows=0).columns)
+    tamano = ruta_csv.stat().st_size
+    
+    # --- Estado anterior y modo de lectura ---
+    estado = None
+    if ruta_estado.exists():
+        try:
+            estado = EstadoLimpieza.cargar(ruta_estado)
+        except (ValueError, KeyError, OSError):
+            estado = None
+    if estado is None or estado.columnas != columnas or estado.columnas_numericas != columnas_numericas:
+        modo, estado = 'inicial', EstadoLimpieza(columnas, columnas_numericas, k_cuantiles)
+    else:
+        hasher = _hasher_prefijo(ruta_csv, estado.offset) if tamano >= estado.offset else None
+        modo = 'anexado' if hasher is not None and hasher.hexdigest() == estado.firma else 'completo'
+    
+    lectura = {'decimal': decimal, 'dtype': str}
+    if modo == 'anexado':
+        with open(ruta_csv, 'rb') as f:
+            cabecera = f.readline()
+            f.seek(estado.offset)
+            cola = f.read(tamano - estado.offset)
+        # La firma nueva continúa la del prefijo: no se vuelve a leer
+        hasher.update(cola)
+        df = pd.read_csv(io.BytesIO(cabecera + cola), **lectura)
+        df.index = df.index + estado.filas_csv
+    else:
+        df = pd.read_csv(ruta_csv, **lectura)
+    filas_csv = (estado.filas_csv if modo == 'anexado' else 0) + len(df)
+    df = df[df['Proyecto'].notna()].drop_duplicates('Proyecto', keep='last')
+    
+    # --- Clasificar contra el estado ---
+    proyectos = df['Proyecto'].to_numpy(dtype=str)
+    hashes = pd.util.hash_pandas_object(df[columnas], index=False).to_numpy()
+    posiciones = pd.Index(estado.proyectos).get_indexer(proyectos)
+    existe = posiciones >= 0
+    cambiado = existe & (hashes != estado.hashes[np.where(existe, posiciones, 0)] if len(estado.hashes)
+                         else np.zeros(len(df), dtype=bool))
+    nuevo = ~existe
+    eliminado = (~np.isin(estado.proyectos, proyectos) if modo == 'completo'
+                 else np.zeros(len(estado.proyectos), dtype=bool))
+    
+    # --- Convertir solo el delta ---
+    delta = df[nuevo | cambiado].copy()
+    coaccionadas = convertir_columnas_numericas(delta, columnas_numericas)
+    X = delta[columnas_numericas].to_numpy(dtype=float)
+    otras = delta[estado.otras_columnas].astype(object)
+    otras_nulas = otras.isna().to_numpy().reshape(len(delta), len(estado.otras_columnas))
+    otras = otras.where(~otras.isna(), '').astype(str).to_numpy().reshape(len(delta), len(estado.otras_columnas))
+    en_delta_cambiado = cambiado[nuevo | cambiado]
+    
+    # --- Estadísticas en el sitio ---
+    pos_cambiados = posiciones[cambiado]
+    retirar = np.vstack([estado.valores[pos_cambiados], estado.valores[eliminado]])
+    estado.estadisticas.retirar(retirar)
+    estado.estadisticas.actualizar(X)
+    estado.retiradas += len(retirar)
+    
+    # --- Estado: actualizar, eliminar, añadir ---
+    estado.otras = estado.otras.astype(object)   # un texto nuevo puede ser más largo
+    estado.valores[pos_cambiados] = X[en_delta_cambiado]
+    estado.hashes[pos_cambiados] = hashes[cambiado]
+    estado.otras[pos_cambiados] = otras[en_delta_cambiado]
+    estado.otras_nulas[pos_cambiados] = otras_nulas[en_delta_cambiado]
+    conservar = ~eliminado
+    estado.proyectos = np.concatenate([estado.proyectos[conservar], proyectos[nuevo]])
+    estado.hashes = np.concatenate([estado.hashes[conservar], hashes[nuevo]])
+    estado.valores = np.vstack([estado.valores[conservar], X[~en_delta_cambiado]])
+    estado.otras = np.vstack([estado.otras[conservar], otras[~en_delta_cambiado]]).astype(str)
+    estado.otras_nulas = np.vstack([estado.otras_nulas[conservar], otras_nulas[~en_delta_cambiado]])
+    if estado.retiradas > FRACCION_RECONSTRUCCION * max(len(estado.proyectos), 1):
+        estado.reconstruir_estadisticas()
+    
+    # --- Salidas ---
+    completas = estado.completas()
+    solo_altas = not cambiado.any() and not eliminado.any()
+    if modo != 'inicial' and solo_altas and ruta_salida.exists() \
+            and ruta_salida.stat().st_size == estado.tamano_salida:
+        n_previas = len(estado.proyectos) - int(nuevo.sum())
+        altas = estado.a_dataframe(np.flatnonzero(completas[n_previas:]) + n_previas)
+        if len(altas):
+            with open(ruta_salida, 'a', newline='') as salida:
+                _tipar_enteros(altas, columnas_numericas).to_csv(salida, index=False, header=False, decimal='.')
+    else:
+        temporal = ruta_salida.with_name(f'.{ruta_salida.name}.tmp')
+        _tipar_enteros(estado.a_dataframe(completas), columnas_numericas).to_csv(temporal, index=False, decimal='.')
+        temporal.replace(ruta_salida)
+    if ruta_parquet is not None:
+        from almacen_historico import guardar_historico
+        guardar_historico(estado.a_dataframe(completas), ruta_parquet, columnas_numericas=columnas_numericas)
+    
+    estado.offset = tamano
+    estado.firma = (hasher if modo == 'anexado' else _hasher_prefijo(ruta_csv, tamano)).hexdigest()
+    estado.filas_csv = filas_csv
+    estado.tamano_salida = ruta_salida.stat().st_size
+    estado.guardar(ruta_estado)
+    
+    resultado = {
+        'modo': modo,
+        'nuevos': int(nuevo.sum()),
+        'cambiados': int(cambiado.sum()),
+        'eliminados': int(eliminado.sum()),
+        'sin_cambios': int((existe & ~cambiado).sum()),
+        'limpios': int(completas.sum()),
+        'estadisticas': estado.estadisticas,
+        'coaccionadas': coaccionadas,
+    }
+    if verbose:
+        _imprimir_resumen_flujo(estado.estadisticas, None, resultado['limpios'], modo='incremental')
+        print(f"   Modo {modo}: {resultado['nuevos']} nuevos, {resultado['cambiados']} cambiados, "
+              f"{resultado['eliminados']} eliminados, {resultado['sin_cambios']} sin cambios")
+        _imprimir_coaccionadas(coaccionadas)
+    return resultado
+
+
+def _imprimir_resumen_flujo(estadisticas, estructura, limpios, modo='por bloques'):
+    """Mismo informe que limpiar_base_datos, a partir de las estadísticas acumuladas"""
+    columnas = estadisticas.columnas
+    
+    print("=" * 80)
+    print(f"📊 ANÁLISIS EXPLORATORIO - BASE DE DATOS HISTÓRICA ({modo})")
+    print("=" * 80)
+    print(f"\n✅ CSV procesada: {estadisticas.n_filas} registros\n")
+    
+    if estructura is not None:
+        print("📋 ESTRUCTURA INICIAL (primer bloque):")
+        print(estructura)
+        print("\n")
+    
+    print(f"❌ VALORES FALTANTES (NaN):")
+    missing = estadisticas.faltantes
+    if missing.sum() > 0:
+        print(missing[missing > 0])
+    else:
+        print("  Ninguno encontrado ✓")
+    
+    print("\n📈 ESTADÍSTICAS DESCRIPTIVAS:")
+    print(estadisticas.describir().round(2))
+    
+    print("\n🔗 CORRELACIÓN CON TIEMPO_REAL_OFERTADO:")
+    print(estadisticas.correlaciones()[columnas[-1]].sort_values(ascending=False).round(3))
+    
+    print("\n⚠️  ANÁLISIS DE OUTLIERS (método IQR):")
+    for col in columnas[:-1]:  # Excluir target
+        inferior, superior = estadisticas.limites_iqr(col)
+        n_outliers = estadisticas.contar_fuera(col, inferior, superior)
+        if n_outliers > 0:
+            print(f"  {col}: {n_outliers} outliers detectados")
+            print(f"    Rango normal: [{inferior:.1f}, {superior:.1f}]")
+    
+    print(f"\n✅ DATASET LIMPIO: {limpios} registros (removidos {estadisticas.n_filas - limpios})")
+
 # ============================================================================
 # PASO 2: ANÁLISIS DE VARIABLES
 # ============================================================================
@@ -152,15 +603,23 @@ def analizar_varianza(df):
 # ============================================================================
 
 if __name__ == "__main__":
+    import sys
     ruta_csv = "base_datos_experta.csv"
     
+    # Ingesta diaria: solo las filas nuevas o cambiadas
+    if '--incremental' in sys.argv[1:]:
+        limpiar_base_datos_incremental(ruta_csv, "base_datos_limpia.csv", ruta_parquet="base_datos_limpia.parquet")
+        sys.exit(0)
+    
     # Ejecutar análisis
     df_clean = limpiar_base_datos(ruta_csv)
     variables_entrada, variable_salida = analizar_variables(df_clean)
     analizar_varianza(df_clean)
     
-    # Guardar CSV limpia
+    # Guardar almacén Parquet (lectura) y CSV limpia (exportación)
+    from almacen_historico import guardar_historico
+    guardar_historico(df_clean, "base_datos_limpia.parquet", columnas_numericas=COLUMNAS_NUMERICAS)
     df_clean.to_csv("base_datos_limpia.csv", index=False, decimal='.')
     print("\n" + "=" * 80)
-    print("✅ CSV limpia guardada como: base_datos_limpia.csv")
+    print("✅ Histórico guardado como: base_datos_limpia.parquet (+ base_datos_limpia.csv)")
     print("=" * 80)
@@ -0,0 +1,380 @@
+"""
+===============================================================================
+🌊 ESTADÍSTICAS EN UNA PASADA (por bloques, memoria acotada)
+===============================================================================
+
+Acumuladores que se actualizan bloque a bloque sin guardar las filas:
+
+    • EstadisticasFlujo: por columna, conteo, media y varianza (Welford, con
+      la fórmula de combinación de Chan para bloques), mínimo y máximo; por
+      pares de columnas, el co-momento sobre las filas en que ambas tienen
+      valor → matriz de correlación igual a df.corr() (pairwise). Un bloque
+      ya incorporado se puede retirar (limpieza incremental).
+    • SketchKLL: cuantiles aproximados (KLL). La memoria es O(k·log(n/k))
+      y el error de rango es ~1/k del total. Mientras no ha hecho falta
+      compactar (n pequeño) los cuantiles son exactos e iguales a los de
+      pandas (interpolación lineal).
+
+Ambos se pueden guardar en un .npz (a_campos / desde_campos) para seguir
+acumulando más adelante.
+
+===============================================================================
+"""
+
+import numpy as np
+import pandas as pd
+
+
+# ============================================================================
+# CUANTILES APROXIMADOS (KLL)
+# ============================================================================
+
+class SketchKLL:
+    """
+    Sketch KLL de cuantiles.
+
+    El nivel h guarda elementos que representan 2^h observaciones cada uno.
+    Cuando un nivel supera su capacidad se ordena y se promueve uno de cada
+    dos elementos (desfase aleatorio) al nivel siguiente.
+
+    Atributos:
+        k: Precisión (capacidad del nivel superior)
+        n: Observaciones incorporadas (sin NaN)
+        minimo, maximo: Extremos exactos
+    """
+
+    def __init__(self, k=200, semilla=0):
+        self.k = int(k)
+        self.semilla = semilla
+        self.niveles = [np.empty(0)]
+        self.n = 0
+        self.minimo = np.inf
+        self.maximo = -np.inf
+        self._rng = np.random.default_rng(semilla)
+
+    def _capacidad(self, h):
+        altura = len(self.niveles)
+        return max(2, int(np.ceil(self.k * (2 / 3) ** (altura - 1 - h))))
+
+    def _compactar(self):
+        h = 0
+        while h < len(self.niveles):
+            nivel = self.niveles[h]
+            if len(nivel) <= self._capacidad(h):
+                h += 1
+                continue
+            if h + 1 == len(self.niveles):
+                self.niveles.append(np.empty(0))
+            nivel = np.sort(nivel)
+            # Con longitud impar el mayor se queda en este nivel
+            pares = len(nivel) - len(nivel) % 2
+            promovidos = nivel[int(self._rng.integers(2)):pares:2]
+            self.niveles[h] = nivel[pares:]
+            self.niveles[h + 1] = np.concatenate([self.niveles[h + 1], promovidos])
+            # Añadir un nivel reduce la capacidad de los inferiores: revisar desde abajo
+            h = 0
+
+    def actualizar(self, valores):
+        """Incorpora un bloque de valores (los NaN se ignoran)"""
+        valores = np.asarray(valores, dtype=float).ravel()
+        valores = valores[~np.isnan(valores)]
+        if len(valores):
+            self.n += len(valores)
+            self.minimo = min(self.minimo, float(valores.min()))
+            self.maximo = max(self.maximo, float(valores.max()))
+            self.niveles[0] = np.concatenate([self.niveles[0], valores])
+            self._compactar()
+        return self
+
+    @property
+    def exacto(self):
+        """True mientras no se ha compactado nada (cuantiles exactos)"""
+        return len(self.niveles) == 1
+
+    def _ponderados(self):
+        valores = np.concatenate(self.niveles)
+        pesos = np.concatenate([np.full(len(nivel), 2.0 ** h) for h, nivel in enumerate(self.niveles)])
+        orden = np.argsort(valores, kind='stable')
+        return valores[orden], pesos[orden]
+
+    def cuantil(self, q):
+        """Cuantil(es) q ∈ [0, 1] (NaN si el sketch está vacío)"""
+        q = np.asarray(q, dtype=float)
+        if self.n == 0:
+            return np.full(q.shape, np.nan) if q.ndim else float('nan')
+        if self.exacto:
+            resultado = np.quantile(self.niveles[0], q)
+        else:
+            valores, pesos = self._ponderados()
+            # Cada elemento ocupa el centro de las observaciones que representa
+            posiciones = (np.cumsum(pesos) - pesos / 2) / pesos.sum()
+            resultado = np.interp(q, np.concatenate([[0.0], posiciones, [1.0]]),
+                                  np.concatenate([[self.minimo], valores, [self.maximo]]))
+        return resultado if q.ndim else float(resultado)
+
+    def contar_fuera(self, inferior, superior):
+        """Observaciones (estimadas) < inferior o > superior"""
+        if self.n == 0:
+            return 0
+        if self.exacto:
+            nivel = self.niveles[0]
+            return int(np.count_nonzero((nivel < inferior) | (nivel > superior)))
+        fuera = sum(2 ** h * np.count_nonzero((nivel < inferior) | (nivel > superior))
+                    for h, nivel in enumerate(self.niveles))
+        return int(fuera)
+
+    def a_campos(self, prefijo=''):
+        """Dict de arrays para guardar en un .npz"""
+        return {
+            f'{prefijo}k': np.array(self.k),
+            f'{prefijo}n': np.array(self.n),
+            f'{prefijo}extremos': np.array([self.minimo, self.maximo]),
+            f'{prefijo}tamanos': np.array([len(nivel) for nivel in self.niveles]),
+            f'{prefijo}valores': np.concatenate(self.niveles),
+        }
+
+    @classmethod
+    def desde_campos(cls, campos, prefijo='', semilla=0):
+        sketch = cls(int(campos[f'{prefijo}k']), semilla=semilla)
+        sketch.n = int(campos[f'{prefijo}n'])
+        sketch.minimo, sketch.maximo = (float(v) for v in campos[f'{prefijo}extremos'])
+        cortes = np.cumsum(campos[f'{prefijo}tamanos'])[:-1]
+        sketch.niveles = [np.array(nivel, dtype=float)
+                          for nivel in np.split(np.asarray(campos[f'{prefijo}valores'], dtype=float), cortes)]
+        # Flujo aleatorio distinto tras cada recarga, reproducible para el mismo estado
+        sketch._rng = np.random.default_rng([semilla, sketch.n])
+        return sketch
+
+
+# ============================================================================
+# MOMENTOS Y CO-MOMENTOS (Welford / Chan)
+# ============================================================================
+
+class EstadisticasFlujo:
+    """
+    Conteos, medias, varianzas, correlaciones y cuantiles de varias columnas
+    numéricas acumulados bloque a bloque.
+
+    Los pares se acumulan sobre las filas donde ambas columnas tienen valor
+    (igual que df.corr()). Para que las sumas no pierdan precisión, cada
+    bloque se centra en su propia media antes de combinarse con el total.
+
+    Atributos:
+        columnas: Nombres de las columnas
+        n_filas: Filas vistas (con o sin NaN)
+        n, media, m2: Por columna (m2 = Σ(x - media)²)
+        minimo, maximo: Por columna
+        n_par, media_par, m2_par, comomento: Matrices (d, d); [i, j] se
+            refiere a la columna i restringida a las filas con i y j presentes
+        sketches: SketchKLL por columna
+    """
+
+    def __init__(self, columnas, k_cuantiles=200, semilla=0):
+        self.columnas = list(columnas)
+        d = len(self.columnas)
+        self.n_filas = 0
+        self.n = np.zeros(d)
+        self.media = np.zeros(d)
+        self.m2 = np.zeros(d)
+        self.minimo = np.full(d, np.inf)
+        self.maximo = np.full(d, -np.inf)
+        self.n_par = np.zeros((d, d))
+        self.media_par = np.zeros((d, d))
+        self.m2_par = np.zeros((d, d))
+        self.comomento = np.zeros((d, d))
+        self.sketches = [SketchKLL(k_cuantiles, semilla=[semilla, i]) for i in range(d)]
+
+    def _bloque(self, X):
+        """Array (m, d) validado a partir de un array o DataFrame"""
+        if isinstance(X, pd.DataFrame):
+            X = X[self.columnas]
+        X = np.asarray(X, dtype=float)
+        if X.ndim != 2 or X.shape[1] != len(self.columnas):
+            raise ValueError(f"Se esperaban {len(self.columnas)} columnas, recibido {X.shape}")
+        return X
+
+    @staticmethod
+    def _momentos(X, presentes):
+        """Conteos, medias y momentos centrados de un bloque (por columna y por pares)"""
+        pf = presentes.astype(float)
+
+        # --- Por columna ---
+        nb = pf.sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mb = np.where(nb > 0, np.where(presentes, X, 0.0).sum(axis=0) / nb, 0.0)
+        Xc = np.where(presentes, X - mb, 0.0)
+        m2b = np.einsum('ij,ij->j', Xc, Xc)
+
+        # --- Por pares (BLAS sobre el bloque centrado) ---
+        nb_par = pf.T @ pf
+        suma = Xc.T @ pf                       # [i, j] = Σ xc_i sobre filas con i y j
+        cuadrados = (Xc * Xc).T @ pf
+        productos = Xc.T @ Xc
+        with np.errstate(invalid='ignore', divide='ignore'):
+            medias_b = np.where(nb_par > 0, suma / nb_par, 0.0)
+            m2_b = np.where(nb_par > 0, cuadrados - suma * medias_b, 0.0)
+            como_b = np.where(nb_par > 0, productos - suma * medias_b.T, 0.0)
+        return nb, mb, m2b, nb_par, medias_b + mb[:, None], m2_b, como_b
+
+    def actualizar(self, X):
+        """
+        Incorpora un bloque.
+
+        Args:
+            X: Array (m, d) o DataFrame con las columnas (NaN = ausente)
+        """
+        X = self._bloque(X)
+        self.n_filas += len(X)
+        if not len(X):
+            return self
+
+        presentes = ~np.isnan(X)
+        nb, mb, m2b, nb_par, medias_b, m2_b, como_b = self._momentos(X, presentes)
+
+        total = self.n + nb
+        with np.errstate(invalid='ignore', divide='ignore'):
+            delta = mb - self.media
+            self.media = np.where(total > 0, self.media + delta * nb / total, 0.0)
+            self.m2 = np.where(total > 0, self.m2 + m2b + delta ** 2 * self.n * nb / total, 0.0)
+        self.n = total
+        self.minimo = np.fmin(self.minimo, np.where(presentes, X, np.inf).min(axis=0))
+        self.maximo = np.fmax(self.maximo, np.where(presentes, X, -np.inf).max(axis=0))
+
+        total_par = self.n_par + nb_par
+        with np.errstate(invalid='ignore', divide='ignore'):
+            factor = np.where(total_par > 0, self.n_par * nb_par / total_par, 0.0)
+            delta = medias_b - self.media_par
+            self.comomento = self.comomento + como_b + delta * delta.T * factor
+            self.m2_par = self.m2_par + m2_b + delta ** 2 * factor
+            self.media_par = np.where(total_par > 0, self.media_par + delta * nb_par / total_par, 0.0)
+        self.n_par = total_par
+
+        for j, sketch in enumerate(self.sketches):
+            sketch.actualizar(X[:, j])
+        return self
+
+    def retirar(self, X):
+        """
+        Quita un bloque incorporado antes (p. ej. la versión anterior de un
+        proyecto que ha cambiado).
+
+        Conteos, medias, varianzas y correlaciones quedan exactos (Chan en
+        sentido inverso). Mínimo, máximo y cuantiles no admiten borrado:
+        siguen contando los valores retirados, con un error acotado por la
+        fracción de filas retiradas.
+
+        Args:
+            X: Array (m, d) o DataFrame con las columnas (NaN = ausente)
+        """
+        X = self._bloque(X)
+        if len(X) > self.n_filas:
+            raise ValueError("No se pueden retirar más filas de las acumuladas")
+        self.n_filas -= len(X)
+        if not len(X):
+            return self
+
+        nb, mb, m2b, nb_par, medias_b, m2_b, como_b = self._momentos(X, ~np.isnan(X))
+
+        resto = self.n - nb
+        with np.errstate(invalid='ignore', divide='ignore'):
+            media = np.where(resto > 0, (self.n * self.media - nb * mb) / resto, 0.0)
+            delta = mb - media
+            self.m2 = np.where(resto > 0, np.maximum(self.m2 - m2b - delta ** 2 * resto * nb / self.n, 0.0), 0.0)
+        self.media = media
+        self.n = resto
+
+        resto_par = self.n_par - nb_par
+        with np.errstate(invalid='ignore', divide='ignore'):
+            media_par = np.where(resto_par > 0, (self.n_par * self.media_par - nb_par * medias_b) / resto_par, 0.0)
+            factor = np.where(resto_par > 0, resto_par * nb_par / self.n_par, 0.0)
+            delta = medias_b - media_par
+            self.comomento = np.where(resto_par > 0, self.comomento - como_b - delta * delta.T * factor, 0.0)
+            self.m2_par = np.where(resto_par > 0, np.maximum(self.m2_par - m2_b - delta ** 2 * factor, 0.0), 0.0)
+        self.media_par = media_par
+        self.n_par = resto_par
+        return self
+
+    # ========================================================================
+    # RESULTADOS
+    # ========================================================================
+
+    @property
+    def varianza(self):
+        """Varianza muestral (ddof=1) por columna"""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(self.n > 1, self.m2 / (self.n - 1), np.nan)
+
+    @property
+    def faltantes(self):
+        """NaN por columna"""
+        return pd.Series(self.n_filas - self.n, index=self.columnas).astype(int)
+
+    def correlaciones(self):
+        """Matriz de correlación de Pearson (pairwise) como DataFrame"""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            r = self.comomento / np.sqrt(self.m2_par * self.m2_par.T)
+        r = np.where((self.n_par > 1) & (self.m2_par > 0) & (self.m2_par.T > 0), r, np.nan)
+        return pd.DataFrame(np.clip(r, -1.0, 1.0), index=self.columnas, columns=self.columnas)
+
+    def cuantil(self, columna, q):
+        return self.sketches[self.columnas.index(columna)].cuantil(q)
+
+    def limites_iqr(self, columna, factor=1.5):
+        """(inferior, superior) = (Q1 - factor·IQR, Q3 + factor·IQR)"""
+        q1, q3 = self.cuantil(columna, [0.25, 0.75])
+        iqr = q3 - q1
+        return q1 - factor * iqr, q3 + factor * iqr
+
+    def contar_fuera(self, columna, inferior, superior):
+        return self.sketches[self.columnas.index(columna)].contar_fuera(inferior, superior)
+
+    def describir(self):
+        """Equivalente a df.describe() (cuartiles aproximados si n es grande)"""
+        cuartiles = np.array([s.cuantil([0.25, 0.5, 0.75]) for s in self.sketches]).T
+        with np.errstate(invalid='ignore'):
+            filas = {
+                'count': self.n,
+                'mean': np.where(self.n > 0, self.media, np.nan),
+                'std': np.sqrt(self.varianza),
+                'min': np.where(self.n > 0, self.minimo, np.nan),
+                '25%': cuartiles[0],
+                '50%': cuartiles[1],
+                '75%': cuartiles[2],
+                'max': np.where(self.n > 0, self.maximo, np.nan),
+            }
+        return pd.DataFrame(filas, index=self.columnas).T
+
+    # ========================================================================
+    # PERSISTENCIA
+    # ========================================================================
+
+    _MATRICES = ('n', 'media', 'm2', 'minimo', 'maximo', 'n_par', 'media_par', 'm2_par', 'comomento')
+
+    def a_campos(self, prefijo=''):
+        """Dict de arrays para guardar en un .npz"""
+        campos = {
+            f'{prefijo}columnas': np.array(self.columnas, dtype=str),
+            f'{prefijo}n_filas': np.array(self.n_filas),
+        }
+        campos.update({f'{prefijo}{nombre}': getattr(self, nombre) for nombre in self._MATRICES})
+        for i, sketch in enumerate(self.sketches):
+            campos.update(sketch.a_campos(f'{prefijo}kll{i}_'))
+        return campos
+
+    @classmethod
+    def desde_campos(cls, campos, prefijo=''):
+        est = cls(campos[f'{prefijo}columnas'].tolist())
+        est.n_filas = int(campos[f'{prefijo}n_filas'])
+        for nombre in cls._MATRICES:
+            setattr(est, nombre, np.array(campos[f'{prefijo}{nombre}'], dtype=float))
+        est.sketches = [SketchKLL.desde_campos(campos, f'{prefijo}kll{i}_', semilla=i)
+                        for i in range(len(est.columnas))]
+        return est
+
+    def guardar(self, ruta):
+        np.savez(ruta, **self.a_campos())
+
+    @classmethod
+    def cargar(cls, ruta):
+        with np.load(ruta, allow_pickle=False) as datos:
+            return cls.desde_campos(datos)
@@ -1,39 +1,94 @@
 import math
-import pickle
-import json
 import numpy as np
 from pathlib import Path
+from registro_modelos import RegistroModelos
 
 # ============================================================================
 # CARGAR MODELO DE REGRESIÓN ENTRENADO
 # ============================================================================
 
-_modelo = None
-_config = None
+# Registro con recarga en caliente: un reentrenamiento (nuevo config_modelo.json
+# / modelo_lineal.npz) se publica sin reiniciar la app.
+registro_modelos = RegistroModelos(
+    Path(__file__).parent / 'config_modelo.json',
+    Path(__file__).parent / 'modelo_lineal.npz',
+)
 
 def _cargar_modelo():
-    """Carga el modelo de regresión entrenado (una sola vez)"""
-    global _modelo, _config
-    
-    if _modelo is None:
-        try:
-            ruta_modelo = Path(__file__).parent / 'modelo_regresion.pkl'
-            ruta_config = Path(__file__).parent / 'config_modelo.json'
-            
-            if ruta_modelo.exists() and ruta_config.exists():
-                with open(ruta_modelo, 'rb') as f:
-                    _modelo = pickle.load(f)
-                
-                with open(ruta_config, 'r') as f:
-                    _config = json.load(f)
-        except Exception as e:
-            print(f"⚠️ Error cargando modelo: {e}")
-            _modelo = None
-            _config = None
-    
-    return _modelo, _config
+    """
+    Devuelve la pareja (modelo, config) vigente en el registro.
+
+    El modelo se evalúa con el motor nativo (NumPy), sin importar sklearn.
+    Ambos elementos pertenecen siempre a la misma versión.
+    """
+    return registro_modelos.obtener()
+
+def version_modelo():
+    """Hash de contenido de la versión del modelo vigente ('' si no hay modelo)"""
+    return registro_modelos.obtener().hash
+
+def _predecir(modelo, X):
+    """
+    Evalúa el modelo lineal columna a columna.
+
+    A diferencia de modelo.predict (producto matricial BLAS), el resultado de
+    cada fila no depende de cuántas filas se evalúan juntas, de modo que la
+    versión escalar y la versión por lotes coinciden bit a bit.
+    """
+    X = np.asarray(X, dtype=float)
+    t = np.full(X.shape[0], float(modelo.intercept_))
+    for j, coef in enumerate(np.ravel(modelo.coef_)):
+        t = t + X[:, j] * coef
+    return t
 
-def calcular_ciclo_completo(spw, mastico_mm, tox, rh_mm, tuercas, tuckers, marcado, factor_ia):
+# Nivel de los intervalos de predicción que acompañan a cada t_ciclo
+NIVEL_INTERVALO = 0.95
+
+def _semiancho_intervalo(modelo, X):
+    """
+    Semiancho t·s·√(1 + zᵀ(ZᵀZ)⁻¹z) por fila con las estadísticas del
+    artefacto, o None si el modelo no las trae.
+    """
+    if not getattr(modelo, 'tiene_intervalos', False):
+        return None
+    return modelo.semiancho_intervalo(X, NIVEL_INTERVALO)
+
+# Variables del histórico que la interfaz no pide: se estiman a partir de SPW
+# con la relación media del histórico (Σ variable / Σ SPW). Al entrenar se
+# recalculan y se guardan en config_modelo.json ('estimaciones_por_spw');
+# estos valores (histórico incluido en el repositorio) solo se usan si la
+# config no los trae
+ESTIMACIONES_POR_SPW = {
+    'Peso': 0.246,
+    'ANCHO ASSY': 6.35,
+    'ALTO ASSY': 2.31,
+    'LONGITUD ASSY': 14.22,
+}
+
+def _entradas_modelo(config, spw, mastico_mm, tuckers, peso=None):
+    """
+    Columnas de entrada del modelo con los nombres reales de
+    config['variables_entrada'] (escalares o arrays).
+
+    SPW, Mastico_mm, Tucker y Peso vienen de la interfaz (Peso None = se
+    estima); el resto se estima con config['estimaciones_por_spw'] o, si
+    falta, ESTIMACIONES_POR_SPW. Una variable desconocida lanza KeyError.
+    """
+    directas = {'SPW': spw, 'Mastico_mm': mastico_mm, 'Tucker': tuckers}
+    if peso is not None:
+        directas['Peso'] = peso
+    estimaciones = config.get('estimaciones_por_spw') or ESTIMACIONES_POR_SPW
+    entradas = {}
+    for var in config['variables_entrada']:
+        if var in directas:
+            entradas[var] = directas[var]
+        elif var in estimaciones:
+            entradas[var] = spw * estimaciones[var]
+        else:
+            raise KeyError(f"Variable del modelo sin valor ni estimación: {var}")
+    return entradas
+
+def calcular_ciclo_completo(spw, mastico_mm, tox, rh_mm, tuercas, tuckers, marcado, factor_ia, peso=None):
     """
     Calcula el tiempo de ciclo usando el modelo de regresión entrenado.
     
@@ -48,12 +103,15 @@ def calcular_ciclo_completo(spw, mastico_mm, tox, rh_mm, tuercas, tuckers, marca
         tuckers: Número de tuckers
         marcado: Boolean si lleva marcado láser
         factor_ia: Factor de IA (actualmente no usado, para futuras mejoras)
+        peso: Peso de la pieza en kg (None = estimado desde SPW)
     
     Returns:
-        Dict con tiempo de ciclo y desglose
+        Dict con tiempo de ciclo y desglose. t_ciclo_inferior / t_ciclo_superior
+        es el intervalo de predicción al NIVEL_INTERVALO (None si no hay
+        estadísticas del modelo, p. ej. en el fallback)
     """
     
-    # Cargar modelo de regresión
+    # Cargar modelo de regresión (pareja coherente para toda la llamada)
     modelo, config = _cargar_modelo()
     
     # ====================================================================
@@ -64,35 +122,31 @@ def calcular_ciclo_completo(spw, mastico_mm, tox, rh_mm, tuercas, tuckers, marca
             # Preparar datos según el modelo entrenado
             variables_entrada = config['variables_entrada']
             
-            # Crear diccionario con valores
-            datos_entrada = {
-                'SPW': spw,
-                'Peso': 0,  # No disponible en interfaz, usar estimación
-                'ANCHO_ASSY': 0,  # No disponible, usar estimación
-            }
-            
-            # Nota: El modelo fue entrenado con Peso y ANCHO_ASSY
-            # Aquí estimamos basándonos en correlaciones
-            # Peso ≈ SPW * 0.2 (aproximación del histórico)
-            # ANCHO_ASSY ≈ SPW * 4.5 (aproximación del histórico)
-            
-            datos_entrada['Peso'] = spw * 0.2
-            datos_entrada['ANCHO_ASSY'] = spw * 4.5
+            # Valor (o estimación desde SPW) de cada variable del modelo
+            datos_entrada = _entradas_modelo(config, spw, mastico_mm, tuckers, peso)
             
             # Hacer predicción
             X_entrada = np.array([[datos_entrada[var] for var in variables_entrada]])
-            t_ciclo = modelo.predict(X_entrada)[0]
+            t_ciclo = _predecir(modelo, X_entrada)[0]
+            semiancho = _semiancho_intervalo(modelo, X_entrada)
             
             # Ajustar por factor_ia si aplica
             t_ciclo = t_ciclo * factor_ia
             
-            return {
+            resultado = {
                 "t_ciclo": max(t_ciclo, 10.0),  # Mínimo 10 segundos
                 "t_soldadores": t_ciclo * 0.7,  # Estimación
                 "t_manipulador": t_ciclo * 0.3,  # Estimación
                 "modelo": "REGRESIÓN_LINEAL",
-                "r2": config['r2_score']
+                "r2": config['r2_score'],
+                "t_ciclo_inferior": None,
+                "t_ciclo_superior": None,
+                "nivel_intervalo": NIVEL_INTERVALO,
             }
+            if semiancho is not None:
+                resultado["t_ciclo_inferior"] = max(t_ciclo - semiancho[0] * factor_ia, 10.0)
+                resultado["t_ciclo_superior"] = max(t_ciclo + semiancho[0] * factor_ia, 10.0)
+            return resultado
         
         except Exception as e:
             print(f"⚠️ Error en predicción: {e}")
@@ -119,7 +173,127 @@ def calcular_ciclo_completo(spw, mastico_mm, tox, rh_mm, tuercas, tuckers, marca
         "t_soldadores": t_soldadores,
         "t_manipulador": t_manipulador,
         "modelo": "HARDCODED_FALLBACK",
-        "r2": 0.0
+        "r2": 0.0,
+        "t_ciclo_inferior": None,
+        "t_ciclo_superior": None,
+        "nivel_intervalo": NIVEL_INTERVALO,
+    }
+
+def calcular_ciclo_segmento(familia, proyecto, oem, spw, mastico_mm, tuckers, factor_ia, peso=None):
+    """
+    Tiempo de ciclo con el modelo del segmento de la oferta (modelos_segmentados).
+
+    Args:
+        familia: ModelosSegmentados cargado
+        proyecto: Nombre del proyecto (p. ej. 'SUB_1_G78_BEV')
+        oem: OEM elegido en la interfaz
+        spw, mastico_mm, tuckers, factor_ia, peso: Como en calcular_ciclo_completo
+
+    Returns:
+        (t_ciclo, nombre del segmento); el segmento es 'GLOBAL' si ninguno
+        tiene datos suficientes
+    """
+    _, config = _cargar_modelo()
+    config = dict(config or {}, variables_entrada=familia.variables_entrada)
+    datos_entrada = _entradas_modelo(config, spw, mastico_mm, tuckers, peso)
+    t_ciclo, segmento = familia.predecir(datos_entrada, proyecto, oem)
+    return max(t_ciclo * factor_ia, 10.0), segmento
+
+# ============================================================================
+# CÁLCULO POR LOTES (VECTORIZADO)
+# ============================================================================
+
+COLUMNAS_LOTE = ('spw', 'mastico_mm', 'tox', 'rh_mm', 'tuercas', 'tuckers', 'marcado', 'factor_ia', 'peso')
+
+def calcular_ciclo_completo_lote(spw, mastico_mm=0, tox=0, rh_mm=0, tuercas=0, tuckers=0,
+                                 marcado=False, factor_ia=1.0, peso=None):
+    """
+    Versión vectorizada de calcular_ciclo_completo para muchas ofertas a la vez.
+
+    Una sola predicción sobre la matriz completa en lugar de una
+    por oferta. Cada fila devuelve exactamente lo mismo que la función escalar.
+
+    Args:
+        spw: Array de puntos de soldadura, o un DataFrame con las columnas
+             de COLUMNAS_LOTE (las que falten toman su valor por defecto)
+        mastico_mm, tox, rh_mm, tuercas, tuckers, marcado, factor_ia, peso:
+             Escalares o arrays (se hace broadcasting contra spw); peso
+             None = estimado desde SPW
+
+    Returns:
+        Dict de arrays columnares: t_ciclo, t_soldadores, t_manipulador, modelo,
+        t_ciclo_inferior, t_ciclo_superior (NaN sin estadísticas del modelo)
+        y los escalares r2 y nivel_intervalo
+    """
+    if hasattr(spw, 'columns'):
+        df = spw
+        columnas = {col: df[col].to_numpy() for col in COLUMNAS_LOTE if col in df.columns}
+        return calcular_ciclo_completo_lote(**columnas)
+
+    spw, mastico_mm, tox, rh_mm, tuercas, tuckers, marcado, factor_ia, peso = np.broadcast_arrays(
+        *(np.atleast_1d(np.asarray(v, dtype=float))
+          for v in (spw, mastico_mm, tox, rh_mm, tuercas, tuckers, marcado, factor_ia,
+                    np.nan if peso is None else peso))
+    )
+    marcado = marcado != 0
+
+    modelo, config = _cargar_modelo()
+
+    # ====================================================================
+    # OPCIÓN 1: Modelo de regresión (una única predicción matricial)
+    # ====================================================================
+    if modelo is not None and config is not None:
+        try:
+            variables_entrada = config['variables_entrada']
+
+            # Mismas estimaciones que en la versión escalar (peso NaN = estimado)
+            datos_entrada = _entradas_modelo(config, spw, mastico_mm, tuckers)
+            if 'Peso' in datos_entrada:
+                datos_entrada['Peso'] = np.where(np.isnan(peso), datos_entrada['Peso'], peso)
+
+            X_entrada = np.column_stack([datos_entrada[var] for var in variables_entrada])
+            t_ciclo = _predecir(modelo, X_entrada) * factor_ia
+            semiancho = _semiancho_intervalo(modelo, X_entrada)
+            if semiancho is None:
+                semiancho = np.full(t_ciclo.shape, np.nan)
+            semiancho = semiancho * factor_ia
+
+            return {
+                "t_ciclo": np.maximum(t_ciclo, 10.0),
+                "t_soldadores": t_ciclo * 0.7,
+                "t_manipulador": t_ciclo * 0.3,
+                "modelo": np.full(t_ciclo.shape, "REGRESIÓN_LINEAL"),
+                "t_ciclo_inferior": np.maximum(t_ciclo - semiancho, 10.0),  # NaN se propaga
+                "t_ciclo_superior": np.maximum(t_ciclo + semiancho, 10.0),
+                "r2": config['r2_score'],
+                "nivel_intervalo": NIVEL_INTERVALO,
+            }
+
+        except Exception as e:
+            print(f"⚠️ Error en predicción: {e}")
+            pass
+
+    # ====================================================================
+    # OPCIÓN 2: Modelo antiguo vectorizado
+    # ====================================================================
+    t_proc = (spw * 6.5) + (mastico_mm / 10.0) + (tox * 5.0) + (rh_mm / 10.0)
+    penalizacion = np.where(mastico_mm > 0, 41.0, 0.0) + np.where(tox > 0, 25.0, 0.0)
+    t_soldadores = (t_proc / 2.4) + penalizacion
+
+    t_manipulador = 16.0 + (tuercas * 8.0) + (tuckers * 7.0) + np.where(marcado, 14.0, 0.0)
+
+    t_base = np.maximum(t_soldadores, t_manipulador)
+    t_final_ia = t_base * factor_ia
+
+    return {
+        "t_ciclo": t_final_ia,
+        "t_soldadores": t_soldadores,
+        "t_manipulador": t_manipulador,
+        "modelo": np.full(t_final_ia.shape, "HARDCODED_FALLBACK"),
+        "t_ciclo_inferior": np.full(t_final_ia.shape, np.nan),
+        "t_ciclo_superior": np.full(t_final_ia.shape, np.nan),
+        "r2": 0.0,
+        "nivel_intervalo": NIVEL_INTERVALO,
     }
 
 def calcular_capacidad_y_mod(t_ciclo, dias, turnos, horas, volumenes, p_kit, p_rack, peso):
@@ -144,4 +318,76 @@ def calcular_capacidad_y_mod(t_ciclo, dias, turnos, horas, volumenes, p_kit, p_r
             "Operarios_Turno": n_lineas * n_mod_celda
         })
         
-    return t_manual, n_mod_celda, sat, cap_max_linea, res_anual
\ No newline at end of file
+    return t_manual, n_mod_celda, sat, cap_max_linea, res_anual
+
+# ============================================================================
+# MOTOR DE CAPACIDAD POR ESCENARIOS (VECTORIZADO)
+# ============================================================================
+
+def calcular_capacidad_escenarios(t_ciclo, dias, turnos, horas, volumenes, p_kit, p_rack, peso):
+    """
+    Versión vectorizada de calcular_capacidad_y_mod para N escenarios × Y años.
+
+    Cada escenario es una combinación (t_ciclo, dias, turnos, horas, p_kit,
+    p_rack, peso); todos los años se evalúan en una sola pasada NumPy. Cada
+    celda coincide con lo que devolvería calcular_capacidad_y_mod.
+
+    Args:
+        t_ciclo, dias, turnos, horas, p_kit, p_rack, peso: Escalares o arrays (N,)
+        volumenes: Array (Y,) común a todos los escenarios o matriz (N, Y)
+
+    Returns:
+        Dict con arrays (N,): t_manual, n_mod_celda, sat, cap_max_linea
+        y matrices (N, Y): volumenes, instalaciones, operarios_turno
+    """
+    t_ciclo, dias, turnos, horas, p_kit, p_rack, peso = np.broadcast_arrays(
+        *(np.atleast_1d(np.asarray(v, dtype=float))
+          for v in (t_ciclo, dias, turnos, horas, p_kit, p_rack, peso))
+    )
+    volumenes = np.atleast_2d(np.asarray(volumenes, dtype=float))
+    volumenes = np.broadcast_to(volumenes, (t_ciclo.shape[0], volumenes.shape[1]))
+    ciclo_valido = t_ciclo > 0
+
+    # Lógica MOD
+    t_kit = p_kit * 5.0
+    t_rack = np.where(peso >= 10, p_rack * 25.0, p_rack * 6.0 + peso * 0.5)
+    t_manual = t_kit + t_rack
+    sat = np.divide(t_manual, t_ciclo, out=np.zeros_like(t_manual), where=ciclo_valido)
+    n_mod_celda = np.where(sat > 1.0, 2, 1)
+
+    # Capacidad
+    segundos_disponibles = dias * turnos * horas * 3600
+    cap_max_linea = np.divide(segundos_disponibles * 0.80, t_ciclo,
+                              out=np.zeros_like(t_ciclo), where=ciclo_valido)
+
+    # Líneas por año (N, Y)
+    cap_valida = (cap_max_linea > 0)[:, None]
+    lineas = np.divide(volumenes, cap_max_linea[:, None],
+                       out=np.zeros(volumenes.shape), where=cap_valida)
+    instalaciones = np.ceil(lineas).astype(np.int64)
+
+    return {
+        "t_manual": t_manual,
+        "n_mod_celda": n_mod_celda,
+        "sat": sat,
+        "cap_max_linea": cap_max_linea,
+        "volumenes": volumenes,
+        "instalaciones": instalaciones,
+        "operarios_turno": instalaciones * n_mod_celda[:, None],
+    }
+
+def capacidad_formato_largo(resultado):
+    """
+    Convierte la salida de calcular_capacidad_escenarios a un DataFrame largo
+    (una fila por escenario y año), con las mismas columnas que res_anual.
+    """
+    import pandas as pd
+
+    n_escenarios, n_anios = resultado["instalaciones"].shape
+    return pd.DataFrame({
+        "Escenario": np.repeat(np.arange(n_escenarios), n_anios),
+        "Año": np.tile(np.arange(1, n_anios + 1), n_escenarios),
+        "Volumen": resultado["volumenes"].ravel(),
+        "Instalaciones": resultado["instalaciones"].ravel(),
+        "Operarios_Turno": resultado["operarios_turno"].ravel(),
+    })
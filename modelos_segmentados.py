@@ -0,0 +1,340 @@
+"""
+===============================================================================
+🧩 MODELOS SEGMENTADOS (SUB / ASSY, BEV / ICE, OEM) CON ENRUTADO RÁPIDO
+===============================================================================
+
+El histórico mezcla subconjuntos (SUB_n_…) y conjuntos principales (ASSY_…)
+de plataformas BEV e ICE, y el OEM elegido en la interfaz no se usaba. Este
+módulo entrena una familia de modelos lineales:
+
+    nivel 0: (oem, tipo, energía)   p. ej. VW · SUB · BEV
+    nivel 1: (tipo, energía)        p. ej. SUB · BEV
+    nivel 2: (tipo,)                p. ej. SUB
+    nivel 3: global                 (fallback)
+
+Un segmento solo se entrena si tiene al menos min_muestras filas (por
+defecto MUESTRAS_POR_PARAMETRO por coeficiente, intercept incluido); si
+no, sus ofertas caen al nivel siguiente. Cada
+oferta se enruta al segmento más específico que tenga modelo mediante un
+índice precalculado (dict de todas las combinaciones conocidas → modelo),
+así que enrutar es una búsqueda O(1) sin recorrer la jerarquía.
+
+La predicción por lotes agrupa las filas por modelo: un producto matricial
+por grupo en lugar de uno por fila.
+
+Persistencia: modelos_segmentados.npz (mismo formato versionado y con hash
+que modelo_lineal.npz, ver motor_inferencia).
+
+===============================================================================
+"""
+
+import itertools
+from pathlib import Path
+
+import numpy as np
+
+from motor_inferencia import guardar_artefacto, cargar_artefacto
+
+RUTA_SEGMENTOS_DEFECTO = Path(__file__).parent / 'modelos_segmentados.npz'
+
+DIMENSIONES = ('oem', 'tipo', 'energia')
+NIVELES = (('oem', 'tipo', 'energia'), ('tipo', 'energia'), ('tipo',), ())
+COMODIN = '*'
+
+TIPOS = ('SUB', 'ASSY')
+ENERGIAS = ('BEV', 'ICE', 'PHEV', 'HEV')
+
+# Filas por coeficiente para entrenar un segmento: con p + 2 filas el
+# ajuste casi interpola y su RMSE no dice nada
+MUESTRAS_POR_PARAMETRO = 10
+
+
+# ============================================================================
+# SEGMENTOS A PARTIR DE PROYECTO / OEM
+# ============================================================================
+
+def parsear_segmento(proyecto, oem=None):
+    """
+    Segmento de un proyecto: 'SUB_1_G78_BEV' → {'oem': oem, 'tipo': 'SUB', 'energia': 'BEV'}
+
+    Las partes que no se reconocen quedan en None.
+    """
+    partes = str(proyecto or '').upper().split('_')
+    return {
+        'oem': str(oem).strip().upper() if oem else None,
+        'tipo': partes[0] if partes[0] in TIPOS else None,
+        'energia': partes[-1] if partes[-1] in ENERGIAS else None,
+    }
+
+
+def extraer_segmentos(df, columna_proyecto='Proyecto', columna_oem='OEM', oem=None):
+    """
+    Versión vectorizada de parsear_segmento para un DataFrame.
+
+    Args:
+        df: DataFrame con columna_proyecto (y opcionalmente columna_oem)
+        oem: OEM común a todas las filas si df no tiene columna_oem
+
+    Returns:
+        DataFrame con columnas oem, tipo, energia (None si no se reconoce)
+    """
+    import pandas as pd
+
+    proyectos = df[columna_proyecto].astype(str).str.upper()
+    if columna_oem in df.columns:
+        oems = df[columna_oem].astype(str).str.strip().str.upper()
+    else:
+        oems = pd.Series(str(oem).strip().upper() if oem else None, index=df.index, dtype=object)
+
+    tipo = proyectos.str.extract(f"^({'|'.join(TIPOS)})(?:_|$)", expand=False)
+    energia = proyectos.str.extract(f"_({'|'.join(ENERGIAS)})$", expand=False)
+    segmentos = pd.DataFrame({'oem': oems, 'tipo': tipo, 'energia': energia}, index=df.index)
+    return segmentos.astype(object).where(segmentos.notna(), None)
+
+
+def _clave(segmento, nivel):
+    """Clave (oem, tipo, energia) del nivel, con COMODIN en las dimensiones no usadas"""
+    return tuple(segmento[d] if d in nivel else COMODIN for d in DIMENSIONES)
+
+
+def _nombre_clave(clave):
+    partes = [v for v in clave if v != COMODIN]
+    return ' · '.join(partes) if partes else 'GLOBAL'
+
+
+# ============================================================================
+# FAMILIA DE MODELOS
+# ============================================================================
+
+class ModelosSegmentados:
+    """
+    Un modelo lineal por segmento más un global, con enrutado precalculado.
+
+    Atributos:
+        variables_entrada: Orden de las columnas de X
+        claves: Lista de claves (oem, tipo, energia) entrenadas
+        intercepts, coeficientes: Arrays (k,) y (k, p)
+        n_muestras, rmse: Arrays (k,) con tamaño y error de cada segmento
+    """
+
+    def __init__(self, variables_entrada, variable_salida='Tiempo_Real_Ofertado'):
+        self.variables_entrada = list(variables_entrada)
+        self.variable_salida = variable_salida
+        self.claves = []
+        self.intercepts = np.zeros(0)
+        self.coeficientes = np.zeros((0, len(self.variables_entrada)))
+        self.n_muestras = np.zeros(0, dtype=np.int64)
+        self.rmse = np.zeros(0)
+        self._indice = {}
+        self._tabla = None
+        self._valores = {}
+
+    # ========================================================================
+    # ENTRENAMIENTO
+    # ========================================================================
+
+    def entrenar(self, df, min_muestras=None, oem=None):
+        """
+        Entrena el modelo global y uno por cada segmento con datos suficientes.
+
+        Args:
+            df: DataFrame limpio con Proyecto, variables y variable de salida
+            min_muestras: Mínimo de filas por segmento (por defecto
+                          MUESTRAS_POR_PARAMETRO · (p + 1))
+            oem: OEM de todo el histórico si df no tiene columna OEM
+        """
+        from analysis import _ajustar_ols
+
+        print("\n" + "=" * 80)
+        print("🧩 ENTRENAMIENTO DE MODELOS SEGMENTADOS")
+        print("=" * 80)
+
+        if min_muestras is None:
+            min_muestras = MUESTRAS_POR_PARAMETRO * (len(self.variables_entrada) + 1)
+
+        X = df[self.variables_entrada].to_numpy(dtype=float)
+        y = df[self.variable_salida].to_numpy(dtype=float)
+        segmentos = extraer_segmentos(df, oem=oem)
+
+        claves, intercepts, coefs, n_muestras, rmse = [], [], [], [], []
+        for nivel in NIVELES:
+            columnas = list(nivel)
+            if columnas:
+                validos = segmentos[columnas].notna().all(axis=1).to_numpy()
+                grupos = segmentos[validos].groupby(columnas).indices
+                grupos = {(k if isinstance(k, tuple) else (k,)): np.flatnonzero(validos)[idx]
+                          for k, idx in grupos.items()}
+            else:
+                grupos = {(): np.arange(len(df))}
+
+            for valores, filas in grupos.items():
+                clave = _clave(dict(zip(columnas, valores)), nivel)
+                if len(filas) < min_muestras and columnas:
+                    print(f"  ⏭️  {_nombre_clave(clave):<25} {len(filas):>4} filas (insuficiente)")
+                    continue
+                intercept, coef = _ajustar_ols(X[filas], y[filas])
+                residuos = y[filas] - intercept - X[filas] @ coef
+                claves.append(clave)
+                intercepts.append(intercept)
+                coefs.append(coef)
+                n_muestras.append(len(filas))
+                rmse.append(float(np.sqrt(np.mean(residuos ** 2))))
+                print(f"  ✅ {_nombre_clave(clave):<25} {len(filas):>4} filas | RMSE {rmse[-1]:.2f}s")
+
+        self.claves = claves
+        self.intercepts = np.array(intercepts, dtype=float)
+        self.coeficientes = np.array(coefs, dtype=float).reshape(-1, len(self.variables_entrada))
+        self.n_muestras = np.array(n_muestras, dtype=np.int64)
+        self.rmse = np.array(rmse, dtype=float)
+        self._construir_indice()
+        return self
+
+    # ========================================================================
+    # ENRUTADO
+    # ========================================================================
+
+    def _construir_indice(self):
+        """
+        Precalcula, para cada combinación de valores conocidos (incluido
+        None = desconocido), el índice del modelo más específico que aplica.
+        """
+        posicion = {clave: i for i, clave in enumerate(self.claves)}
+        if (COMODIN,) * len(DIMENSIONES) not in posicion:
+            raise ValueError("Falta el modelo global")
+
+        self._valores = {
+            d: sorted({c[j] for c in self.claves if c[j] != COMODIN})
+            for j, d in enumerate(DIMENSIONES)
+        }
+        self._indice = {}
+        # Misma información como tabla densa: posición 0 = desconocido,
+        # k + 1 = k-ésimo valor conocido (para enrutar lotes con códigos)
+        self._tabla = np.empty([len(self._valores[d]) + 1 for d in DIMENSIONES], dtype=np.intp)
+        opciones = [list(enumerate([None] + self._valores[d])) for d in DIMENSIONES]
+        for combinacion in itertools.product(*opciones):
+            codigos, valores = zip(*combinacion)
+            segmento = dict(zip(DIMENSIONES, valores))
+            for nivel in NIVELES:
+                if any(segmento[d] is None for d in nivel):
+                    continue
+                clave = _clave(segmento, nivel)
+                if clave in posicion:
+                    self._indice[valores] = self._tabla[codigos] = posicion[clave]
+                    break
+
+    def _normalizar(self, segmento):
+        """Valores no vistos en el entrenamiento → None (se tratan como desconocidos)"""
+        return tuple(segmento[d] if segmento[d] in self._valores[d] else None for d in DIMENSIONES)
+
+    def enrutar(self, proyecto, oem=None):
+        """
+        Returns:
+            (índice del modelo, nombre del segmento)
+        """
+        i = self._indice[self._normalizar(parsear_segmento(proyecto, oem))]
+        return i, _nombre_clave(self.claves[i])
+
+    def enrutar_lote(self, df, oem=None):
+        """Array (n,) con el índice del modelo de cada fila"""
+        import pandas as pd
+
+        segmentos = extraer_segmentos(df, oem=oem)
+        # Código de cada valor (0 = desconocido) → una indexación en la tabla
+        codigos = tuple(
+            pd.Categorical(segmentos[d], categories=self._valores[d]).codes.astype(np.intp) + 1
+            for d in DIMENSIONES
+        )
+        return self._tabla[codigos]
+
+    # ========================================================================
+    # PREDICCIÓN
+    # ========================================================================
+
+    def predecir(self, datos_entrada, proyecto, oem=None):
+        """
+        Predicción de una oferta con el modelo de su segmento.
+
+        Args:
+            datos_entrada: Dict {variable: valor}
+            proyecto: Nombre del proyecto (p. ej. 'SUB_1_G78_BEV')
+            oem: OEM de la oferta
+
+        Returns:
+            (tiempo predicho, nombre del segmento usado)
+        """
+        i, nombre = self.enrutar(proyecto, oem)
+        x = np.array([datos_entrada[v] for v in self.variables_entrada], dtype=float)
+        return float(self.intercepts[i] + x @ self.coeficientes[i]), nombre
+
+    def predecir_lote(self, df, oem=None):
+        """
+        Predicción por lotes agrupando filas por modelo (un producto
+        matricial por grupo).
+
+        Args:
+            df: DataFrame con Proyecto (y opcionalmente OEM) y las variables
+
+        Returns:
+            (predicciones (n,), índice del modelo usado por fila (n,))
+        """
+        modelo = self.enrutar_lote(df, oem=oem)
+        X = df[self.variables_entrada].to_numpy(dtype=float)
+        prediccion = np.empty(len(df))
+
+        orden = np.argsort(modelo, kind='stable')
+        grupos, inicios = np.unique(modelo[orden], return_index=True)
+        for i, filas in zip(grupos, np.split(orden, inicios[1:])):
+            prediccion[filas] = self.intercepts[i] + X[filas] @ self.coeficientes[i]
+        return prediccion, modelo
+
+    def nombre_segmento(self, i):
+        return _nombre_clave(self.claves[i])
+
+    # ========================================================================
+    # PERSISTENCIA
+    # ========================================================================
+
+    def guardar(self, ruta=RUTA_SEGMENTOS_DEFECTO):
+        """Guarda la familia en un artefacto versionado (sin pickle)"""
+        hash_artefacto = guardar_artefacto(
+            ruta,
+            variables=np.array(self.variables_entrada, dtype=str),
+            variable_salida=np.array(self.variable_salida),
+            claves=np.array(self.claves, dtype=str).reshape(-1, len(DIMENSIONES)),
+            intercepts=self.intercepts,
+            coeficientes=self.coeficientes,
+            n_muestras=self.n_muestras,
+            rmse=self.rmse,
+        )
+        print(f"✅ Modelos segmentados guardados: {ruta} ({len(self.claves)} modelos)")
+        return hash_artefacto
+
+    @classmethod
+    def cargar(cls, ruta=RUTA_SEGMENTOS_DEFECTO):
+        campos = cargar_artefacto(ruta)
+        familia = cls(campos['variables'].tolist(), str(campos['variable_salida']))
+        familia.claves = [tuple(c) for c in campos['claves'].tolist()]
+        familia.intercepts = campos['intercepts']
+        familia.coeficientes = campos['coeficientes']
+        familia.n_muestras = campos['n_muestras']
+        familia.rmse = campos['rmse']
+        familia._construir_indice()
+        return familia
+
+
+if __name__ == "__main__":
+    import json
+    from almacen_historico import leer_historico
+
+    with open('config_modelo.json', 'r') as f:
+        variables = json.load(f)['variables_entrada']
+    df = leer_historico('base_datos_limpia.parquet', columnas=['Proyecto'] + variables + ['Tiempo_Real_Ofertado'])
+
+    familia = ModelosSegmentados(variables).entrenar(df)
+    familia.guardar()
+
+    prediccion, modelo = familia.predecir_lote(df)
+    print(f"\n  {'Proyecto':<20} | {'Segmento':<20} | {'Real':>8} | {'Predicho':>8}")
+    print(f"  {'-'*66}")
+    for proyecto, real, pred, i in zip(df['Proyecto'], df[familia.variable_salida], prediccion, modelo):
+        print(f"  {proyecto:<20} | {familia.nombre_segmento(i):<20} | {real:>8.1f} | {pred:>8.1f}")
@@ -0,0 +1,218 @@
+"""
+===============================================================================
+🎲 MOTOR MONTE CARLO DE INCERTIDUMBRE (P50 / P90 / P99)
+===============================================================================
+
+La oferta usa un único tiempo de ciclo puntual, y calcular_capacidad_y_mod lo
+redondea con math.ceil a un número de líneas. Pero el modelo tiene error
+(config_modelo.json guarda rmse y mae), y un error de pocos segundos puede
+cambiar el número de instalaciones.
+
+Este módulo muestrea el error del modelo:
+
+    • 'gaussiano': ε ~ N(0, rmse²)
+    • 'bootstrap': ε remuestreado de los residuos del entrenamiento
+
+y lo propaga por el motor de capacidad vectorizado:
+
+    t_sim = max(t_ciclo + ε, 10)  →  instalaciones / operarios por año
+
+Devuelve percentiles del tiempo de ciclo, instalaciones y operarios. Las
+simulaciones se procesan por bloques y todo se acumula en histogramas de
+tamaño fijo, así que la memoria no depende de n_simulaciones:
+
+    • Instalaciones / operarios (enteros): un contador por valor, los
+      percentiles son exactos
+    • Tiempo de ciclo: BINS_T_CICLO intervalos sobre el rango que pueden
+      tomar las muestras (t_ciclo ± SIGMAS_RANGO·rmse, o el rango de los
+      residuos); el percentil se interpola dentro de su intervalo, con un
+      error menor que el ancho (milisegundos con los rmse habituales)
+
+===============================================================================
+"""
+
+import numpy as np
+
+from logic import calcular_capacidad_escenarios, _cargar_modelo
+
+PERCENTILES_DEFECTO = (50, 90, 99)
+T_CICLO_MINIMO = 10.0
+BINS_T_CICLO = 65_536
+SIGMAS_RANGO = 9.0   # P(|ε| > 9σ) ≈ 2e-19: ninguna muestra gaussiana queda fuera
+
+
+def _muestrear_errores(rng, n, metodo, rmse, residuos):
+    if metodo == 'gaussiano':
+        return rng.standard_normal(n) * rmse
+    if metodo == 'bootstrap':
+        return residuos[rng.integers(0, len(residuos), n)]
+    raise ValueError(f"Método desconocido: {metodo} (usar 'gaussiano' o 'bootstrap')")
+
+
+def _percentiles_desde_conteos(conteos, percentiles):
+    """Percentiles exactos (CDF inversa) de una variable entera dada por su histograma"""
+    acumulado = np.cumsum(conteos)
+    total = acumulado[-1]
+    return {
+        f"P{p}": int(np.searchsorted(acumulado, total * p / 100.0))
+        for p in percentiles
+    }
+
+
+def _rango_t_ciclo(t_ciclo, metodo, rmse, residuos):
+    """[inferior, superior] que contiene los t_sim posibles"""
+    if metodo == 'gaussiano':
+        bajo, alto = -SIGMAS_RANGO * rmse, SIGMAS_RANGO * rmse
+    else:
+        bajo, alto = residuos.min(), residuos.max()
+    return max(t_ciclo + bajo, T_CICLO_MINIMO), max(t_ciclo + alto, T_CICLO_MINIMO)
+
+
+def _percentiles_desde_histograma(conteos, inferior, ancho, percentiles):
+    """
+    Percentiles de una variable continua dada por un histograma de
+    intervalos iguales: CDF inversa interpolada dentro del intervalo.
+    """
+    acumulado = np.cumsum(conteos)
+    total = acumulado[-1]
+    resultado = {}
+    for p in percentiles:
+        objetivo = total * p / 100.0
+        i = min(int(np.searchsorted(acumulado, objetivo)), len(conteos) - 1)
+        previos = acumulado[i - 1] if i else 0
+        fraccion = (objetivo - previos) / conteos[i] if conteos[i] else 0.0
+        resultado[f"P{p}"] = float(inferior + (i + fraccion) * ancho)
+    return resultado
+
+
+def _parametros_error(metodo, rmse, residuos):
+    """Completa rmse/residuos desde config_modelo.json si no se indican"""
+    if metodo == 'gaussiano' and rmse is None:
+        _, config = _cargar_modelo()
+        if config is None:
+            raise ValueError("No hay modelo cargado: indicar rmse explícitamente")
+        rmse = config['rmse']
+    if metodo == 'bootstrap':
+        if residuos is None:
+            _, config = _cargar_modelo()
+            if config is None or 'residuos' not in config:
+                raise ValueError("config_modelo.json no contiene residuos: reentrenar o pasar residuos")
+            residuos = config['residuos']
+        residuos = np.asarray(residuos, dtype=float)
+    return rmse, residuos
+
+
+# ============================================================================
+# SIMULACIÓN DE UNA OFERTA
+# ============================================================================
+
+def simular_oferta(t_ciclo, dias, turnos, horas, volumenes, p_kit, p_rack, peso,
+                   n_simulaciones=1_000_000, metodo='gaussiano', rmse=None, residuos=None,
+                   semilla=42, percentiles=PERCENTILES_DEFECTO, tamano_bloque=250_000):
+    """
+    Propaga el error del modelo a tiempo de ciclo, instalaciones y operarios.
+
+    Args:
+        t_ciclo: Tiempo de ciclo puntual (salida de calcular_ciclo_completo)
+        dias, turnos, horas, volumenes, p_kit, p_rack, peso: Como en
+            calcular_capacidad_y_mod
+        n_simulaciones: Número de extracciones
+        metodo: 'gaussiano' (usa rmse) o 'bootstrap' (usa residuos)
+        rmse, residuos: Si no se indican se leen de config_modelo.json
+        semilla: Semilla (int o np.random.SeedSequence). Mismo resultado para
+            la misma semilla y tamano_bloque
+        percentiles: Percentiles a devolver
+        tamano_bloque: Extracciones por bloque (la memoria es
+            O(tamano_bloque + BINS_T_CICLO), no O(n_simulaciones))
+
+    Returns:
+        Dict con:
+            't_ciclo': {P50, P90, P99} (precisión: resolucion_t)
+            'resolucion_t': Ancho de los intervalos del histograma (s)
+            'res_anual': lista por año con percentiles de Instalaciones y
+                         Operarios_Turno
+    """
+    rmse, residuos = _parametros_error(metodo, rmse, residuos)
+    rng = np.random.default_rng(semilla)
+    volumenes = np.asarray(volumenes, dtype=float)
+    n_anios = len(volumenes)
+
+    inferior, superior = _rango_t_ciclo(t_ciclo, metodo, rmse, residuos)
+    ancho = (superior - inferior) / BINS_T_CICLO
+    conteos_t = np.zeros(BINS_T_CICLO, dtype=np.int64)
+    conteos_inst = [np.zeros(1, dtype=np.int64) for _ in range(n_anios)]
+    conteos_oper = [np.zeros(1, dtype=np.int64) for _ in range(n_anios)]
+
+    for inicio in range(0, n_simulaciones, tamano_bloque):
+        n = min(tamano_bloque, n_simulaciones - inicio)
+        t_sim = np.maximum(t_ciclo + _muestrear_errores(rng, n, metodo, rmse, residuos), T_CICLO_MINIMO)
+        if ancho > 0:
+            bins = ((t_sim - inferior) / ancho).astype(np.int64)
+            conteos_t += np.bincount(np.clip(bins, 0, BINS_T_CICLO - 1), minlength=BINS_T_CICLO)
+        else:
+            conteos_t[0] += n
+
+        cap = calcular_capacidad_escenarios(t_sim, dias, turnos, horas, volumenes, p_kit, p_rack, peso)
+        for anio in range(n_anios):
+            for conteos, columna in ((conteos_inst, 'instalaciones'), (conteos_oper, 'operarios_turno')):
+                nuevos = np.bincount(cap[columna][:, anio])
+                if len(nuevos) > len(conteos[anio]):
+                    nuevos[:len(conteos[anio])] += conteos[anio]
+                    conteos[anio] = nuevos
+                else:
+                    conteos[anio][:len(nuevos)] += nuevos
+
+    return {
+        't_ciclo': _percentiles_desde_histograma(conteos_t, inferior, ancho, percentiles),
+        'resolucion_t': ancho,
+        'res_anual': [
+            {
+                'Año': anio + 1,
+                'Volumen': float(volumenes[anio]),
+                'Instalaciones': _percentiles_desde_conteos(conteos_inst[anio], percentiles),
+                'Operarios_Turno': _percentiles_desde_conteos(conteos_oper[anio], percentiles),
+            }
+            for anio in range(n_anios)
+        ],
+        'n_simulaciones': n_simulaciones,
+        'metodo': metodo,
+    }
+
+
+# ============================================================================
+# SIMULACIÓN DE UNA CARTERA DE OFERTAS
+# ============================================================================
+
+def simular_cartera(ofertas, n_simulaciones=100_000, metodo='gaussiano', rmse=None,
+                    residuos=None, semilla=42, percentiles=PERCENTILES_DEFECTO,
+                    tamano_bloque=250_000):
+    """
+    Ejecuta simular_oferta para cada oferta de una cartera.
+
+    Cada oferta recibe su propio flujo aleatorio (SeedSequence.spawn), de
+    modo que el resultado de una oferta no depende de su posición ni del
+    tamaño de la cartera.
+
+    Args:
+        ofertas: Iterable de dicts (o DataFrame) con las claves t_ciclo, dias,
+                 turnos, horas, volumenes, p_kit, p_rack, peso
+
+    Returns:
+        Lista de resultados de simular_oferta (mismo orden que ofertas)
+    """
+    if hasattr(ofertas, 'to_dict'):
+        ofertas = ofertas.to_dict('records')
+    ofertas = list(ofertas)
+
+    rmse, residuos = _parametros_error(metodo, rmse, residuos)
+    semillas = np.random.SeedSequence(semilla).spawn(len(ofertas))
+
+    return [
+        simular_oferta(
+            o['t_ciclo'], o['dias'], o['turnos'], o['horas'], o['volumenes'],
+            o['p_kit'], o['p_rack'], o['peso'],
+            n_simulaciones=n_simulaciones, metodo=metodo, rmse=rmse, residuos=residuos,
+            semilla=s, percentiles=percentiles, tamano_bloque=tamano_bloque,
+        )
+        for o, s in zip(ofertas, semillas)
+    ]
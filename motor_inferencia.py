@@ -0,0 +1,433 @@
+"""
+===============================================================================
+⚡ MOTOR DE INFERENCIA NATIVO (sin sklearn)
+===============================================================================
+
+El modelo entrenado es lineal:
+
+    Tiempo = intercept + Σ coef_i · x_i
+
+Para evaluarlo basta con un producto escalar, así que en producción no hace
+falta importar sklearn ni deserializar el pickle. Este módulo carga los
+coeficientes desde:
+
+    • config_modelo.json  (ya contiene 'intercept' y 'coeficientes')
+    • modelo_lineal.npz   (artefacto binario versionado, sin pickle)
+
+sklearn solo se necesita para entrenar (analysis.py) y para
+verificar_paridad_sklearn, que lo reajusta sobre el histórico limpio.
+
+ARTEFACTO VERSIONADO (modelo_lineal.npz, formato 3):
+    Un único .npz sin comprimir y sin objetos pickle con:
+      • version_formato, variables, variable_salida
+      • coef, intercept
+      • estadísticas de entrenamiento: n, medias, gram_inv = (ZᵀZ)⁻¹ con
+        Z = [1 | X], s (desv. típica residual), gl (grados de libertad)
+      • intervalo_niveles / intervalo_t: cuantiles t_{gl} precalculados para
+        los intervalos de predicción analíticos
+      • metricas_nombres / metricas_valores (r2, rmse, mae)
+      • opcionales: estadísticos suficientes (suf_*), residuos y muestras
+        bootstrap (bootstrap_*)
+      • digestos_campos / digestos: SHA-256 de cada campo
+      • hash: SHA-256 de la tabla de digestos (identifica el contenido)
+
+    Con los digestos por campo, el servidor lee y verifica solo
+    CAMPOS_SERVICIO; las muestras bootstrap y los estadísticos suficientes
+    se leen (y verifican) solo cuando se piden, p. ej. al reentrenar.
+    config_modelo.json es opcional: MotorLineal.a_config() reconstruye su
+    contenido desde el artefacto.
+
+===============================================================================
+"""
+
+import hashlib
+import json
+import sys
+import numpy as np
+from pathlib import Path
+
+RUTA_BINARIO_DEFECTO = Path(__file__).parent / 'modelo_lineal.npz'
+RUTA_CONFIG_DEFECTO = Path(__file__).parent / 'config_modelo.json'
+VERSION_FORMATO = 3
+
+# Campos que necesita el servidor (predicción, intervalos, métricas)
+CAMPOS_SERVICIO = ('variables', 'variable_salida', 'coef', 'intercept', 'n', 'medias', 'gram_inv',
+                   'gl', 's', 'intervalo_niveles', 'intervalo_t', 'metricas_nombres', 'metricas_valores')
+_CAMPOS_CONTROL = ('version_formato', 'digestos_campos', 'digestos', 'hash')
+
+
+# ============================================================================
+# ARTEFACTO VERSIONADO
+# ============================================================================
+
+def _digesto_campo(nombre, valor):
+    """SHA-256 de un campo (nombre, tipo, forma y bytes)"""
+    valor = np.ascontiguousarray(valor)
+    hasher = hashlib.sha256()
+    hasher.update(nombre.encode())
+    hasher.update(str(valor.dtype).encode())
+    hasher.update(str(valor.shape).encode())
+    hasher.update(valor.tobytes())
+    return hasher.hexdigest()
+
+
+def _hash_digestos(nombres, digestos):
+    """SHA-256 de la tabla de digestos (formato 3)"""
+    hasher = hashlib.sha256()
+    for nombre, digesto in zip(nombres, digestos):
+        hasher.update(f'{nombre}:{digesto}\n'.encode())
+    return hasher.hexdigest()
+
+
+def _hash_campos(campos):
+    """SHA-256 de todos los campos en orden alfabético (formato 2)"""
+    hasher = hashlib.sha256()
+    for nombre in sorted(campos):
+        if nombre == 'hash':
+            continue
+        valor = np.ascontiguousarray(campos[nombre])
+        hasher.update(nombre.encode())
+        hasher.update(str(valor.dtype).encode())
+        hasher.update(str(valor.shape).encode())
+        hasher.update(valor.tobytes())
+    return hasher.hexdigest()
+
+
+def guardar_artefacto(ruta, **campos):
+    """
+    Escribe el artefacto versionado (.npz sin comprimir, sin pickle).
+
+    Args:
+        ruta: Ruta de destino
+        **campos: Arrays o escalares (ver cabecera del módulo); se añaden
+                  version_formato, los digestos y el hash automáticamente
+
+    Returns:
+        Hash de contenido del artefacto
+    """
+    campos = {nombre: np.asarray(valor) for nombre, valor in campos.items()}
+    campos['version_formato'] = np.array(VERSION_FORMATO)
+    nombres = sorted(campos)
+    digestos = [_digesto_campo(nombre, campos[nombre]) for nombre in nombres]
+    campos['digestos_campos'] = np.array(nombres)
+    campos['digestos'] = np.array(digestos)
+    campos['hash'] = np.array(_hash_digestos(nombres, digestos))
+    np.savez(ruta, **campos)
+    return str(campos['hash'])
+
+
+def _verificar_digestos(leidos, presentes):
+    """
+    Comprueba la tabla de digestos contra el hash, que el fichero no tenga
+    campos de más o de menos y el digesto de cada campo leído.
+    """
+    nombres = leidos['digestos_campos'].tolist()
+    digestos = leidos['digestos'].tolist()
+    esperado = str(leidos['hash'])
+    if _hash_digestos(nombres, digestos) != esperado:
+        raise ValueError(f"Artefacto corrupto: la tabla de digestos no coincide ({esperado[:12]}…)")
+    if set(nombres) != set(presentes) - {'digestos_campos', 'digestos', 'hash'}:
+        raise ValueError(f"Artefacto corrupto: campos distintos de los registrados ({esperado[:12]}…)")
+    tabla = dict(zip(nombres, digestos))
+    for nombre, valor in leidos.items():
+        if nombre in tabla and _digesto_campo(nombre, valor) != tabla[nombre]:
+            raise ValueError(f"Artefacto corrupto: el campo '{nombre}' no coincide ({esperado[:12]}…)")
+
+
+def cargar_artefacto(ruta, verificar=True, campos=None):
+    """
+    Lee el artefacto y devuelve un dict {campo: array}.
+
+    Args:
+        ruta: Ruta o fichero abierto
+        verificar: Si True, comprueba el hash de contenido (en formato 3,
+                   el digesto de cada campo leído)
+        campos: Campos a leer (p. ej. CAMPOS_SERVICIO); None = todos. Los
+                artefactos anteriores al formato 3 se leen siempre enteros
+
+    Raises:
+        ValueError: Versión de formato no soportada o hash incorrecto
+    """
+    with np.load(ruta, allow_pickle=False) as datos:
+        presentes = datos.files
+        version = int(datos['version_formato']) if 'version_formato' in presentes else 1
+        if version > VERSION_FORMATO:
+            raise ValueError(f"Formato de artefacto {version} no soportado (máximo {VERSION_FORMATO})")
+        if campos is not None and version >= 3:
+            a_leer = [n for n in presentes if n in campos or n in _CAMPOS_CONTROL]
+        else:
+            a_leer = presentes
+        leidos = {nombre: datos[nombre] for nombre in a_leer}
+
+    if verificar and version >= 3:
+        _verificar_digestos(leidos, presentes)
+    elif verificar and version == 2:
+        esperado = str(leidos['hash'])
+        if _hash_campos(leidos) != esperado:
+            raise ValueError(f"Artefacto corrupto: el hash no coincide ({esperado[:12]}…)")
+
+    return leidos
+
+
+class MotorLineal:
+    """
+    Modelo lineal evaluado con NumPy puro.
+
+    Expone la misma interfaz mínima que LinearRegression (predict, coef_,
+    intercept_) para poder sustituirlo sin tocar el código que lo usa.
+
+    Atributos:
+        variables_entrada: Lista de variables en el orden de las columnas de X
+        coef_: Array de coeficientes (mismo orden que variables_entrada)
+        intercept_: Término independiente
+    """
+
+    def __init__(self, variables_entrada, coeficientes, intercept, artefacto=None):
+        self.variables_entrada = list(variables_entrada)
+        self.coef_ = np.asarray(coeficientes, dtype=float)
+        self.intercept_ = float(intercept)
+        self.n_features_in_ = len(self.variables_entrada)
+        # Campos completos del artefacto (estadísticas, métricas...) si se cargó de él
+        self.artefacto = artefacto or {}
+
+        if self.coef_.shape != (self.n_features_in_,):
+            raise ValueError(
+                f"Se esperaban {self.n_features_in_} coeficientes, recibidos {self.coef_.shape}"
+            )
+
+    # ========================================================================
+    # CARGA
+    # ========================================================================
+
+    @classmethod
+    def desde_config(cls, config):
+        """
+        Construye el motor a partir de config_modelo.json.
+
+        Args:
+            config: Dict ya cargado o ruta al JSON
+        """
+        if not isinstance(config, dict):
+            with open(config, 'r') as f:
+                config = json.load(f)
+
+        variables = config['variables_entrada']
+        coefs = [config['coeficientes'][var] for var in variables]
+        return cls(variables, coefs, config['intercept'])
+
+    @classmethod
+    def desde_binario(cls, ruta=RUTA_BINARIO_DEFECTO, verificar=True, campos=CAMPOS_SERVICIO):
+        """
+        Carga el motor desde el artefacto .npz (sin pickle, con verificación
+        de hash).
+
+        Args:
+            ruta: Ruta o fichero abierto
+            verificar: Comprobar los digestos de los campos leídos
+            campos: Campos a leer; por defecto los de servicio (None = todos,
+                    p. ej. para reentrenar con suf_* y bootstrap_*)
+        """
+        artefacto = cargar_artefacto(ruta, verificar=verificar, campos=campos)
+        return cls(artefacto['variables'].tolist(), artefacto['coef'], artefacto['intercept'],
+                   artefacto=artefacto)
+
+    @classmethod
+    def desde_sklearn(cls, modelo, variables_entrada):
+        """Convierte un LinearRegression ya entrenado"""
+        return cls(variables_entrada, np.ravel(modelo.coef_), modelo.intercept_)
+
+    @property
+    def hash(self):
+        """Hash de contenido del artefacto ('' si no se cargó de uno)"""
+        return str(self.artefacto.get('hash', ''))
+
+    def a_config(self):
+        """
+        Dict con los campos de config_modelo.json que usa la inferencia
+        (variables, coeficientes, intercept, métricas, n_muestras,
+        estimaciones_por_spw y hash_artefacto),
+        reconstruido desde el artefacto: el JSON es opcional.
+        """
+        config = {
+            'variables_entrada': list(self.variables_entrada),
+            'coeficientes': dict(zip(self.variables_entrada, self.coef_.tolist())),
+            'intercept': self.intercept_,
+            'hash_artefacto': self.hash,
+        }
+        if 'variable_salida' in self.artefacto:
+            config['variable_salida'] = str(self.artefacto['variable_salida'])
+        if 'n' in self.artefacto:
+            config['n_muestras'] = int(self.artefacto['n'])
+        if 'medias' in self.artefacto and 'SPW' in self.variables_entrada:
+            # Misma relación Σ variable / Σ SPW que guarda analysis.guardar
+            medias = dict(zip(self.variables_entrada, self.artefacto['medias'].tolist()))
+            if medias['SPW']:
+                config['estimaciones_por_spw'] = {v: media / medias['SPW'] for v, media in medias.items()
+                                                  if v != 'SPW'}
+        if 'metricas_nombres' in self.artefacto:
+            nombres = {'r2': 'r2_score', 'rmse': 'rmse', 'mae': 'mae'}
+            for nombre, valor in zip(self.artefacto['metricas_nombres'].tolist(),
+                                     self.artefacto['metricas_valores'].tolist()):
+                config[nombres.get(nombre, nombre)] = valor
+        return config
+
+    def guardar_binario(self, ruta=RUTA_BINARIO_DEFECTO, **campos_extra):
+        """
+        Guarda el artefacto versionado con coeficientes, orden de variables y
+        los campos adicionales indicados (estadísticas, métricas...).
+
+        Returns:
+            Hash de contenido
+        """
+        return guardar_artefacto(
+            ruta,
+            variables=np.array(self.variables_entrada, dtype=str),
+            coef=self.coef_,
+            intercept=np.array(self.intercept_),
+            **campos_extra,
+        )
+
+    # ========================================================================
+    # PREDICCIÓN
+    # ========================================================================
+    
+    @property
+    def tiene_intervalos(self):
+        """True si el artefacto trae (ZᵀZ)⁻¹, s y cuantiles t"""
+        return ('intervalo_t' in self.artefacto and 'gram_inv' in self.artefacto
+                and np.isfinite(self.artefacto['s']))
+
+    def t_critico(self, nivel):
+        """Cuantil t_{gl} bilateral del nivel (tabla del artefacto; scipy si no está)"""
+        niveles = self.artefacto['intervalo_niveles']
+        encontrado = np.flatnonzero(np.isclose(niveles, nivel))
+        if len(encontrado):
+            return float(self.artefacto['intervalo_t'][encontrado[0]])
+        from scipy import stats
+        return float(stats.t.ppf((1 + nivel) / 2, int(self.artefacto['gl'])))
+
+    def semiancho_intervalo(self, X, nivel=0.95):
+        """
+        Semiancho del intervalo de predicción por fila:
+
+            t_{n-p-1} · s · √(1 + zᵀ(ZᵀZ)⁻¹z),   z = [1, x]
+
+        Solo usa estadísticas del artefacto (sin datos de entrenamiento).
+        Cada fila se calcula de forma independiente (mismo resultado en
+        lote que de una en una).
+        """
+        if not self.tiene_intervalos:
+            raise ValueError("El artefacto no contiene estadísticas para intervalos: reentrenar")
+        X = np.asarray(X, dtype=float)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        Z = np.column_stack([np.ones(len(X)), X])
+        palanca = np.einsum('ij,jk,ik->i', Z, self.artefacto['gram_inv'], Z)
+        return self.t_critico(nivel) * float(self.artefacto['s']) * np.sqrt(1 + palanca)
+
+    def predict(self, X):
+        """
+        Predice el tiempo para cada fila de X.
+
+        Args:
+            X: Array (n, n_variables) en el orden de variables_entrada
+
+        Returns:
+            Array (n,) con los tiempos predichos
+        """
+        X = np.asarray(X, dtype=float)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        return X @ self.coef_ + self.intercept_
+
+
+# ============================================================================
+# VERIFICACIÓN DE PARIDAD
+# ============================================================================
+
+def verificar_paridad(ruta_artefacto=RUTA_BINARIO_DEFECTO, ruta_referencia=RUTA_CONFIG_DEFECTO,
+                      n_muestras=1000, tolerancia=1e-9, semilla=42):
+    """
+    Compara las predicciones del motor cargado del artefacto (verificando
+    todos sus campos) con una referencia:
+
+        • config_modelo.json (por defecto): los coeficientes que lee la UI
+        • un pickle de sklearn (.pkl), p. ej. tras migrar_desde_pickle;
+          requiere sklearn instalado
+
+    Returns:
+        Máxima diferencia absoluta encontrada
+    """
+    motor = MotorLineal.desde_binario(ruta_artefacto, campos=None)
+
+    if Path(ruta_referencia).suffix == '.pkl':
+        import pickle
+        with open(ruta_referencia, 'rb') as f:
+            referencia = pickle.load(f)
+    else:
+        referencia = MotorLineal.desde_config(ruta_referencia)
+        if referencia.variables_entrada != motor.variables_entrada:
+            raise AssertionError(f"Variables distintas: {referencia.variables_entrada} frente a "
+                                 f"{motor.variables_entrada}")
+
+    rng = np.random.default_rng(semilla)
+    X = rng.uniform(0, 2000, size=(n_muestras, motor.n_features_in_))
+
+    diferencia = float(np.max(np.abs(referencia.predict(X) - motor.predict(X))))
+    if diferencia > tolerancia:
+        raise AssertionError(f"Artefacto difiere de {Path(ruta_referencia).name}: "
+                             f"{diferencia:.3e} > {tolerancia:.0e}")
+
+    return diferencia
+
+
+def verificar_paridad_sklearn(df, ruta_artefacto=RUTA_BINARIO_DEFECTO, tolerancia=1e-9):
+    """
+    Reajusta sklearn.linear_model.LinearRegression sobre las filas de
+    entrenamiento y comprueba que MotorLineal (coeficientes del artefacto)
+    predice lo mismo que su predict en esas filas.
+
+    A diferencia de verificar_paridad con config_modelo.json (que se escribe
+    desde el mismo ajuste), la referencia es un ajuste independiente.
+    Requiere sklearn; solo aplica a artefactos OLS.
+
+    Args:
+        df: DataFrame con las filas con que se entrenó (variables y salida)
+        ruta_artefacto: modelo_lineal.npz a verificar
+        tolerancia: Máxima diferencia absoluta admitida (s)
+
+    Returns:
+        Máxima diferencia absoluta encontrada
+    """
+    from sklearn.linear_model import LinearRegression
+
+    motor = MotorLineal.desde_binario(ruta_artefacto, campos=None)
+    if 'gram_inv' not in motor.artefacto:
+        raise ValueError("El artefacto es de un ajuste regularizado: no es comparable con LinearRegression")
+    n = int(motor.artefacto['n'])
+    if len(df) != n:
+        raise ValueError(f"El artefacto se entrenó con {n} filas y df tiene {len(df)}")
+
+    X = df[motor.variables_entrada].to_numpy(dtype=float)
+    y = df[str(motor.artefacto['variable_salida'])].to_numpy(dtype=float)
+    referencia = LinearRegression().fit(X, y)
+
+    diferencia = float(np.max(np.abs(referencia.predict(X) - motor.predict(X))))
+    if diferencia > tolerancia:
+        raise AssertionError(f"Artefacto difiere de LinearRegression: {diferencia:.3e} > {tolerancia:.0e}")
+
+    return diferencia
+
+
+if __name__ == "__main__":
+    referencia = sys.argv[1] if len(sys.argv) > 1 else RUTA_CONFIG_DEFECTO
+    if Path(referencia).suffix in ('.parquet', '.csv'):
+        # Histórico limpio: reajuste independiente con sklearn
+        from almacen_historico import leer_historico
+        diferencia = verificar_paridad_sklearn(leer_historico(referencia))
+        nombre = f"LinearRegression sobre {Path(referencia).name}"
+    else:
+        diferencia = verificar_paridad(ruta_referencia=referencia)
+        nombre = Path(referencia).name
+    print(f"✅ Paridad de modelo_lineal.npz con {nombre} verificada "
+          f"(máx. diferencia: {diferencia:.2e}s)")
@@ -0,0 +1,321 @@
+"""
+===============================================================================
+🔢 PARSER NUMÉRICO ROBUSTO A DECIMALES MIXTOS
+===============================================================================
+
+base_datos_experta.csv mezcla 12.7 con "10,00" y "108,43". Con
+pd.read_csv(decimal=',') + pd.to_numeric(errors='coerce') esas celdas se
+convertían en NaN en silencio y dropna descartaba el proyecto entero.
+
+Reglas por celda:
+    • Con '.' y ',' a la vez, el último separador es el decimal y el otro el
+      de miles:          "1.234,5" → 1234.5     "1,234.5" → 1234.5
+    • Un único separador es siempre el decimal:
+                         "10,00" → 10.0         "12.7" → 12.7
+    • Un separador repetido es de miles:
+                         "1.234.567" → 1234567
+    • Una única coma seguida de exactamente tres dígitos, con 1-3 dígitos
+      delante, es ambigua ("12,700": ¿12.7 o 12700?) → NaN y se informa
+    • Espacios y apóstrofos internos se ignoran (miles): "1 234,5"
+    • Celdas vacías o nulas → NaN (faltante, no se informa)
+    • Cualquier otra cosa se intenta con float() ("1e3", "nan"); si falla
+      → NaN y se informa con su fila y columna
+
+Implementación: se trabaja sobre el buffer de bytes de la columna (el de
+Arrow si pandas usa cadenas pyarrow, sin copia; si no, se codifica). Cada
+celda de hasta 16 bytes se carga como dos uint64 con una sola indexación;
+las clases de byte salen de una tabla de 256 entradas, los separadores y el
+signo se eliminan desplazando bits, y los dígitos se convierten con SWAR
+(8 dígitos ASCII → entero con 3 multiplicaciones):
+
+    valor = ± mantisa / 10^(dígitos decimales)
+
+La mantisa es un entero exacto (≤ 15 dígitos) y la división está
+correctamente redondeada, así que el resultado es idéntico a
+float("1234.5"). Solo las celdas raras (más de 16 bytes, notación
+científica, texto) pasan por Python.
+
+===============================================================================
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+MAX_DIGITOS_RAPIDO = 15
+MAX_BYTES_RAPIDO = 16
+_POTENCIAS_10 = 10.0 ** np.arange(MAX_DIGITOS_RAPIDO + 1)
+
+# _MASCARA_BAJA[k]: los k bytes bajos de una palabra de 64 bits
+_MASCARA_BAJA = np.array([(1 << (8 * k)) - 1 for k in range(9)], dtype=np.uint64)
+_U8, _U16, _U32, _U56 = np.uint64(8), np.uint64(16), np.uint64(32), np.uint64(56)
+_UNOS = np.uint64(0x0101010101010101)
+TAMANO_BLOQUE = 16_384
+_AMBIGUA = re.compile(r'^[+-]?[1-9]\d{0,2},\d{3}$')
+
+
+def _buffers(valores):
+    """
+    (datos uint8, offsets int64, nulos bool) de una columna de texto.
+
+    Usa los buffers de Arrow directamente si la Serie ya está respaldada por
+    pyarrow (pandas ≥ 3) o pyarrow está disponible; si no, codifica en Python.
+    """
+    serie = valores if isinstance(valores, pd.Series) else pd.Series(valores)
+    try:
+        import pyarrow as pa
+        if not pd.api.types.is_string_dtype(serie.dtype) or serie.dtype == object:
+            serie = serie.astype(object).where(serie.notna(), None)
+            serie = serie.map(lambda v: v if v is None or isinstance(v, str) else str(v))
+        array = pa.array(serie, type=pa.large_string(), from_pandas=True)
+        if isinstance(array, pa.ChunkedArray):
+            # Columnas grandes leídas por read_csv llegan en varios trozos
+            array = array.combine_chunks()
+    except ImportError:
+        texto = serie.astype(object)
+        nulos = texto.isna().to_numpy()
+        codificados = [b'' if nulo else str(v).encode() for v, nulo in zip(texto, nulos)]
+        offsets = np.zeros(len(codificados) + 1, dtype=np.int64)
+        np.cumsum([len(c) for c in codificados], out=offsets[1:])
+        return np.frombuffer(b''.join(codificados), dtype=np.uint8), offsets, nulos
+
+    _, buffer_offsets, buffer_datos = array.buffers()
+    offsets = np.frombuffer(buffer_offsets, dtype=np.int64)[array.offset:array.offset + len(array) + 1]
+    datos = (np.frombuffer(buffer_datos, dtype=np.uint8) if buffer_datos is not None
+             else np.empty(0, dtype=np.uint8))
+    nulos = array.is_null().to_numpy(zero_copy_only=False)
+    return datos, offsets, nulos
+
+
+def _ocho_digitos(palabras):
+    """
+    Valor de 8 dígitos ASCII empaquetados en un uint64 (el primero en el byte
+    bajo; bytes 0 = dígito 0). SWAR: 3 multiplicaciones por palabra.
+    """
+    v = (palabras & np.uint64(0x0F0F0F0F0F0F0F0F)) * np.uint64(2561) >> _U8
+    v = (v & np.uint64(0x00FF00FF00FF00FF)) * np.uint64(6553601) >> _U16
+    return (v & np.uint64(0x0000FFFF0000FFFF)) * np.uint64(42949672960001) >> _U32
+
+
+def _contar_bytes(indicador):
+    """Nº de bytes a 1 por fila de una matriz (n, 16) de 0/1 (suma horizontal SWAR)"""
+    palabras = indicador.view(np.uint64)
+    return (((palabras[:, 0] * _UNOS) >> _U56) + ((palabras[:, 1] * _UNOS) >> _U56)).astype(np.int64)
+
+
+def _ultimo_byte(indicador):
+    """Posición (0-15) del último byte a 1 de cada fila (-1 si ninguno)"""
+    palabras = indicador.view(np.uint64)
+    # Bytes 0/1 → la palabra es < 2^57 y su conversión a float conserva el bit alto
+    _, exp0 = np.frexp(palabras[:, 0].astype(float))
+    _, exp1 = np.frexp(palabras[:, 1].astype(float))
+    return np.where(palabras[:, 1] > 0, 8 + (exp1 - 1) // 8,
+                    np.where(palabras[:, 0] > 0, (exp0 - 1) // 8, -1))
+
+
+def _quitar_byte(w0, w1, posicion):
+    """Elimina el byte `posicion` (0-15) de la cadena de 16 bytes (w0, w1)"""
+    en_w0 = posicion < 8
+    baja = _MASCARA_BAJA[np.where(en_w0, posicion, posicion - 8)]
+    nuevo_w0 = np.where(en_w0, (w0 & baja) | ((w0 >> _U8) & ~baja) | (w1 << np.uint64(56)), w0)
+    nuevo_w1 = np.where(en_w0, w1 >> _U8, (w1 & baja) | ((w1 >> _U8) & ~baja))
+    return nuevo_w0, nuevo_w1
+
+
+def _parsear_bloque(ventana, inicio, longitudes, nulos):
+    """
+    Ruta vectorizada para un bloque de celdas.
+
+    Returns:
+        (numeros, rapida, ambigua): valores, máscara de las celdas resueltas
+        aquí (el resto pasa a Python) y de las ambiguas ("12,700"), a NaN
+    """
+    n = len(inicio)
+    w0 = ventana[inicio] & _MASCARA_BAJA[np.minimum(longitudes, 8)]
+    w1 = ventana[inicio + 8] & _MASCARA_BAJA[np.clip(longitudes - 8, 0, 8)]
+    bytes_celda = np.column_stack([w0, w1]).view(np.uint8)
+
+    es_digito = (bytes_celda - np.uint8(ord('0'))) < 10
+    es_coma = bytes_celda == ord(',')
+    es_punto = bytes_celda == ord('.')
+    n_digitos = _contar_bytes(es_digito)
+    n_comas = _contar_bytes(es_coma)
+    n_puntos = _contar_bytes(es_punto)
+    n_otros = longitudes - n_digitos - n_comas - n_puntos
+
+    # Signo: solo en el primer byte
+    primero = bytes_celda[:, 0]
+    signo = (primero == ord('-')) | (primero == ord('+'))
+
+    # Separadores: el último es el decimal si es único en su tipo
+    ultimo_sep = _ultimo_byte(es_coma | es_punto)
+    ultimo_es_coma = bytes_celda[np.arange(n), np.maximum(ultimo_sep, 0)] == ord(',')
+    ambos = (n_comas > 0) & (n_puntos > 0)
+    tiene_decimal = (n_comas + n_puntos == 1) | ambos
+    separadores_validos = ~ambos | (np.where(ultimo_es_coma, n_comas, n_puntos) == 1)
+
+    # Miles con separador o espacios: más de un byte no numérico aparte del signo
+    admitidos = n_otros == signo
+    resto = np.flatnonzero(~admitidos)
+    if len(resto):
+        espacios = bytes_celda[resto]
+        admitidos[resto] = (n_otros[resto] - signo[resto]
+                            == _contar_bytes(espacios == ord(' ')) + _contar_bytes(espacios == ord("'")))
+    rapida = ((longitudes <= MAX_BYTES_RAPIDO) & admitidos & (n_digitos > 0)
+              & (n_digitos <= MAX_DIGITOS_RAPIDO) & separadores_validos & ~nulos)
+
+    # Dígitos a la derecha del separador decimal
+    digitos = es_digito.view(np.uint64)
+    corte = ultimo_sep + 1
+    altos0 = digitos[:, 0] & ~_MASCARA_BAJA[np.clip(corte, 0, 8)]
+    altos1 = digitos[:, 1] & ~_MASCARA_BAJA[np.clip(corte - 8, 0, 8)]
+    decimales = np.where(tiene_decimal, ((altos0 * _UNOS) >> _U56) + ((altos1 * _UNOS) >> _U56), 0)
+
+    # --- Quitar el último separador y el signo (caso normal: sin bucles) ---
+    con_sep = ultimo_sep >= 0
+    sin_sep0, sin_sep1 = _quitar_byte(w0, w1, np.maximum(ultimo_sep, 0))
+    w0 = np.where(con_sep, sin_sep0, w0)
+    w1 = np.where(con_sep, sin_sep1, w1)
+    w0 = np.where(signo, (w0 >> _U8) | (w1 << _U56), w0)
+    w1 = np.where(signo, w1 >> _U8, w1)
+
+    # Separadores de miles y espacios restantes (poco frecuente)
+    filas = np.flatnonzero(rapida & (n_digitos < longitudes - signo - con_sep))
+    while len(filas):
+        restantes = np.column_stack([w0[filas], w1[filas]]).view(np.uint8)
+        no_digito = ((restantes - np.uint8(ord('0'))) >= 10) & (restantes != 0)
+        posicion = _ultimo_byte(no_digito)
+        pendientes = posicion >= 0
+        filas, posicion = filas[pendientes], posicion[pendientes]
+        w0[filas], w1[filas] = _quitar_byte(w0[filas], w1[filas], posicion)
+
+    # --- Alinear los dígitos a la derecha de 16 posiciones y convertir ---
+    desplazamiento = (8 * (16 - np.minimum(n_digitos, 16))).astype(np.uint64)
+    alto = np.where(desplazamiento >= 64, w0 << (desplazamiento - np.uint64(64)),
+                    (w1 << desplazamiento) | (w0 >> (np.uint64(64) - desplazamiento)))
+    bajo = np.where(desplazamiento >= 64, np.uint64(0), w0 << desplazamiento)
+    mantisa = _ocho_digitos(bajo) * np.uint64(100_000_000) + _ocho_digitos(alto)
+
+    numeros = mantisa.astype(float) / _POTENCIAS_10[np.minimum(decimales, MAX_DIGITOS_RAPIDO)]
+    numeros[signo & (primero == ord('-'))] *= -1
+    numeros[~rapida] = np.nan
+
+    # "12,700": coma única + 3 decimales + 1-3 dígitos enteros sin cero inicial
+    # puede ser 12.7 o 12700; no se adivina
+    primer_digito = bytes_celda[np.arange(n), signo.astype(np.int64)]
+    ambigua = (rapida & (n_comas == 1) & (n_puntos == 0) & (n_otros == signo) & (decimales == 3)
+               & (n_digitos >= 4) & (n_digitos <= 6) & (primer_digito != ord('0')))
+    numeros[ambigua] = np.nan
+    return numeros, rapida, ambigua
+
+
+def parsear_numeros(valores, tamano_bloque=TAMANO_BLOQUE):
+    """
+    Convierte una columna de texto con decimales mixtos a float64.
+
+    Args:
+        valores: Serie, array o lista (texto, números o nulos)
+        tamano_bloque: Celdas por bloque vectorizado (acota la memoria temporal)
+
+    Returns:
+        (numeros, coaccionadas): array float64 y máscara bool de las celdas
+        con texto no numérico o ambiguo ("12,700") que se convirtieron en NaN
+    """
+    if isinstance(valores, pd.Series) and pd.api.types.is_numeric_dtype(valores.dtype):
+        return valores.to_numpy(dtype=float, na_value=np.nan), np.zeros(len(valores), dtype=bool)
+
+    datos, offsets, nulos = _buffers(valores)
+    n = len(offsets) - 1
+    inicio = offsets[:-1]
+    longitudes = np.diff(offsets)
+
+    # Ventana de uint64 solapados sobre el buffer: palabra i = bytes i..i+7
+    relleno = np.zeros(len(datos) + 16, dtype=np.uint8)
+    relleno[:len(datos)] = datos
+    ventana = np.ndarray((len(datos) + 9,), dtype='<u8', buffer=relleno, strides=(1,))
+
+    numeros = np.empty(n)
+    rapida = np.empty(n, dtype=bool)
+    coaccionadas = np.empty(n, dtype=bool)
+    for b in range(0, n, tamano_bloque):
+        bloque = slice(b, b + tamano_bloque)
+        numeros[bloque], rapida[bloque], coaccionadas[bloque] = _parsear_bloque(
+            ventana, inicio[bloque], longitudes[bloque], nulos[bloque])
+
+    # --- Celdas raras (largas, notación científica, texto): Python ---
+    for i in np.flatnonzero(~rapida & ~nulos):
+        texto = bytes(datos[inicio[i]:offsets[i + 1]]).decode(errors='replace')
+        texto = texto.strip().replace(' ', '').replace("'", '')
+        if not texto:
+            continue
+        try:
+            numeros[i] = float(texto)
+        except ValueError:
+            numeros[i] = _parsear_celda(texto)
+            coaccionadas[i] = np.isnan(numeros[i])
+
+    return numeros, coaccionadas
+
+
+def _parsear_celda(texto):
+    """Versión escalar de las reglas (celdas con más de 15 dígitos)"""
+    limpio = texto.replace(' ', '').replace("'", '').replace('\t', '')
+    comas, puntos = limpio.count(','), limpio.count('.')
+    if comas and puntos:
+        decimal = ',' if limpio.rfind(',') > limpio.rfind('.') else '.'
+        miles = '.' if decimal == ',' else ','
+        if limpio.count(decimal) != 1:
+            return np.nan
+        limpio = limpio.replace(miles, '').replace(decimal, '.')
+    elif comas + puntos > 1:
+        limpio = limpio.replace(',', '').replace('.', '')
+    else:
+        limpio = limpio.replace(',', '.')
+    try:
+        return float(limpio)
+    except ValueError:
+        return np.nan
+
+
+# ============================================================================
+# CONVERSIÓN DE UN DATAFRAME
+# ============================================================================
+
+def convertir_columnas_numericas(df, columnas):
+    """
+    Convierte las columnas indicadas con parsear_numeros (en el propio df).
+
+    Las columnas sin NaN y con todos los valores enteros quedan como int64
+    (igual que las infiere read_csv).
+
+    Args:
+        df: DataFrame (p. ej. leído con dtype=str para esas columnas)
+        columnas: Columnas a convertir
+
+    Returns:
+        DataFrame con las celdas coaccionadas a NaN: 'fila' (índice del df),
+        'columna', 'valor' (texto original) y 'motivo' ('no numérico' o
+        'ambiguo' si puede leerse con coma decimal o de miles)
+    """
+    informes = []
+    for col in columnas:
+        numeros, coaccionadas = parsear_numeros(df[col])
+        if coaccionadas.any():
+            valores = df[col][coaccionadas].astype(object).to_numpy()
+            informes.append(pd.DataFrame({
+                'fila': df.index[coaccionadas],
+                'columna': col,
+                'valor': valores,
+                'motivo': ['ambiguo' if _AMBIGUA.match(str(v).strip()) else 'no numérico' for v in valores],
+            }))
+        if len(numeros) and np.isfinite(numeros).all() and (numeros == np.round(numeros)).all() \
+                and np.abs(numeros).max() < 2 ** 53:
+            df[col] = numeros.astype(np.int64)
+        else:
+            df[col] = numeros
+
+    if informes:
+        return pd.concat(informes, ignore_index=True)
+    return pd.DataFrame({'fila': pd.Series(dtype=df.index.dtype), 'columna': pd.Series(dtype=object),
+                         'valor': pd.Series(dtype=object), 'motivo': pd.Series(dtype=object)})
@@ -0,0 +1,284 @@
+"""
+===============================================================================
+🔁 PIPELINE LIMPIAR → ENTRENAR → PUBLICAR (caché direccionada por contenido)
+===============================================================================
+
+Sustituye los tres pasos manuales (data_cleaning.py, analysis.py y copiar
+los artefactos) por un pequeño DAG:
+
+    base_datos_experta.csv ─► limpiar ─► entrenar ─► publicar
+
+    • Cada etapa tiene una huella = SHA-256 de (nombre, código del módulo
+      que la implementa, parámetros, hashes de sus entradas).
+    • Las salidas se guardan en <cache>/<etapa>/<huella>/ junto a un
+      manifiesto con el hash de cada fichero. Si la huella ya existe la
+      etapa no se ejecuta.
+    • Las etapas siguientes usan como entrada el hash de las SALIDAS, así que
+      si una limpieza se repite y da el mismo CSV, no se reentrena.
+    • publicar copia las salidas al destino con os.replace (atómico por
+      fichero) y solo si el contenido ha cambiado.
+
+Un reentrenamiento sin cambios solo lee y hashea el CSV de entrada (ms).
+pandas/sklearn se importan dentro de las etapas, solo si hay que ejecutarlas.
+
+Uso:
+    python pipeline.py            # Ejecuta lo necesario
+    python pipeline.py --forzar   # Ignora la caché
+
+===============================================================================
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+DIRECTORIO = Path(__file__).parent
+DIRECTORIO_CACHE_DEFECTO = DIRECTORIO / '.pipeline_cache'
+
+PARAMETROS_LIMPIEZA_DEFECTO = {
+    'decimal': ',',
+    'columnas_numericas': None,      # None = data_cleaning.COLUMNAS_NUMERICAS
+    'tamano_bloque': None,           # None = en memoria; filas por bloque = una pasada
+}
+
+PARAMETROS_ENTRENAMIENTO_DEFECTO = {
+    'umbral_correlacion': 0.5,
+    'n_folds': 3,
+    'n_remuestreos': 2000,
+    'semilla': 42,
+    'regularizacion': None,          # None (OLS), 'ridge', 'lasso' o 'elasticnet'
+    'outliers': None,                # None = todos; método de deteccion_outliers para excluirlos
+}
+
+
+def _hash_fichero(ruta):
+    hasher = hashlib.sha256()
+    with open(ruta, 'rb') as f:
+        for bloque in iter(lambda: f.read(1 << 20), b''):
+            hasher.update(bloque)
+    return hasher.hexdigest()
+
+
+def _huella(*partes):
+    return hashlib.sha256(json.dumps(partes, sort_keys=True, default=str).encode()).hexdigest()
+
+
+# ============================================================================
+# ETAPAS
+# ============================================================================
+
+def _etapa_limpiar(entradas, parametros, directorio_salida):
+    from almacen_historico import guardar_historico
+    from data_cleaning import COLUMNAS_NUMERICAS, limpiar_base_datos, limpiar_base_datos_por_bloques
+
+    if parametros['tamano_bloque']:
+        limpiar_base_datos_por_bloques(entradas['base_datos_experta.csv'],
+                                       directorio_salida / 'base_datos_limpia.csv',
+                                       columnas_numericas=parametros['columnas_numericas'],
+                                       decimal=parametros['decimal'],
+                                       tamano_bloque=parametros['tamano_bloque'],
+                                       ruta_parquet=directorio_salida / 'base_datos_limpia.parquet')
+        return
+
+    df_clean = limpiar_base_datos(entradas['base_datos_experta.csv'],
+                                  columnas_numericas=parametros['columnas_numericas'],
+                                  decimal=parametros['decimal'])
+    guardar_historico(df_clean, directorio_salida / 'base_datos_limpia.parquet',
+                      columnas_numericas=parametros['columnas_numericas'] or COLUMNAS_NUMERICAS)
+    df_clean.to_csv(directorio_salida / 'base_datos_limpia.csv', index=False, decimal='.')
+
+
+def _etapa_entrenar(entradas, parametros, directorio_salida):
+    from almacen_historico import leer_historico
+    from analysis import ModeloRegresionLineal
+    from modelos_segmentados import ModelosSegmentados
+    from motor_inferencia import verificar_paridad_sklearn
+
+    df = leer_historico(entradas['base_datos_limpia.parquet'])
+    modelo = ModeloRegresionLineal()
+    modelo.seleccionar_variables(df, umbral_correlacion=parametros['umbral_correlacion'])
+    if parametros['outliers']:
+        df = df[~modelo.entrenar_robusto(df, metodo=parametros['outliers'])]
+    else:
+        modelo.entrenar(df)
+    if parametros['regularizacion']:
+        modelo.entrenar_regularizado(df, tipo=parametros['regularizacion'], semilla=parametros['semilla'])
+    modelo.validacion_cruzada(df, n_folds=parametros['n_folds'])
+    modelo.bootstrap(df, n_remuestreos=parametros['n_remuestreos'], semilla=parametros['semilla'])
+    modelo.analizar_residuos(df)
+    modelo.guardar(directorio_salida / 'modelo_lineal.npz', directorio_salida / 'config_modelo.json')
+    if not parametros['regularizacion']:
+        # El motor sin sklearn debe predecir igual que LinearRegression reajustado
+        diferencia = verificar_paridad_sklearn(df, directorio_salida / 'modelo_lineal.npz')
+        print(f"✅ Paridad con LinearRegression (máx. diferencia: {diferencia:.2e}s)")
+    modelo.generar_reporte(directorio_salida / 'reporte_modelo.txt')
+
+    familia = ModelosSegmentados(modelo.variables_entrada, modelo.variable_salida).entrenar(df)
+    familia.guardar(directorio_salida / 'modelos_segmentados.npz')
+
+
+class Etapa:
+    """
+    Nodo del DAG.
+
+    Args:
+        nombre: Identificador (y subdirectorio de la caché)
+        funcion: funcion(entradas, parametros, directorio_salida); entradas es
+                 {nombre_fichero: ruta}
+        dependencias: Etapas cuyas salidas son entradas de esta
+        salidas: Ficheros que la función debe escribir en directorio_salida
+        modulos: Ficheros de código que implementan la etapa (entran en la huella)
+    """
+
+    def __init__(self, nombre, funcion, dependencias, salidas, modulos=()):
+        self.nombre = nombre
+        self.funcion = funcion
+        self.dependencias = list(dependencias)
+        self.salidas = list(salidas)
+        self.modulos = [DIRECTORIO / m for m in modulos]
+
+
+ETAPAS = [
+    Etapa('limpiar', _etapa_limpiar, [], ['base_datos_limpia.parquet', 'base_datos_limpia.csv'],
+          modulos=['data_cleaning.py', 'estadisticas_flujo.py', 'parser_numerico.py', 'almacen_historico.py',
+                   'deteccion_outliers.py']),
+    Etapa('entrenar', _etapa_entrenar, ['limpiar'],
+          ['modelo_lineal.npz', 'config_modelo.json', 'reporte_modelo.txt', 'modelos_segmentados.npz'],
+          modulos=['analysis.py', 'motor_inferencia.py', 'modelos_segmentados.py', 'deteccion_outliers.py']),
+]
+
+# Ficheros que publicar copia al destino (los que lee la app)
+FICHEROS_PUBLICADOS = ['base_datos_limpia.parquet', 'base_datos_limpia.csv', 'modelo_lineal.npz', 'modelos_segmentados.npz',
+                       'config_modelo.json']
+
+
+# ============================================================================
+# EJECUCIÓN
+# ============================================================================
+
+def _ejecutar_etapa(etapa, entradas, parametros, directorio_cache, forzar):
+    """
+    Devuelve (salidas, ejecutada), con salidas = {fichero: (ruta, hash)}.
+    """
+    huella = _huella(
+        etapa.nombre,
+        {str(m.name): _hash_fichero(m) for m in etapa.modulos},
+        parametros,
+        {nombre: h for nombre, (_, h) in sorted(entradas.items())},
+    )
+    directorio = directorio_cache / etapa.nombre / huella
+    manifiesto = directorio / 'manifiesto.json'
+
+    if not forzar and manifiesto.exists():
+        hashes = json.loads(manifiesto.read_text())
+        return {f: (directorio / f, hashes[f]) for f in etapa.salidas}, False
+
+    # Se ejecuta en un directorio temporal y se renombra al final: una
+    # ejecución interrumpida nunca deja una entrada de caché a medias.
+    directorio.parent.mkdir(parents=True, exist_ok=True)
+    temporal = Path(tempfile.mkdtemp(dir=directorio.parent, prefix='.tmp_'))
+    try:
+        etapa.funcion({f: ruta for f, (ruta, _) in entradas.items()}, parametros, temporal)
+        hashes = {f: _hash_fichero(temporal / f) for f in etapa.salidas}
+        (temporal / 'manifiesto.json').write_text(json.dumps(hashes, indent=2))
+        if directorio.exists():
+            shutil.rmtree(directorio)
+        os.replace(temporal, directorio)
+    except BaseException:
+        shutil.rmtree(temporal, ignore_errors=True)
+        raise
+
+    return {f: (directorio / f, hashes[f]) for f in etapa.salidas}, True
+
+
+def publicar(salidas, destino):
+    """
+    Copia las salidas al destino (temporal + os.replace) solo si cambian.
+
+    El modelo se publica antes que config_modelo.json para que el registro
+    de modelos, que se dispara con cualquiera de los dos, vea el par nuevo
+    en cuanto cambie el JSON.
+
+    Returns:
+        Lista de ficheros actualizados
+    """
+    destino = Path(destino)
+    actualizados = []
+    for fichero in FICHEROS_PUBLICADOS:
+        origen, hash_origen = salidas[fichero]
+        ruta = destino / fichero
+        if ruta.exists() and _hash_fichero(ruta) == hash_origen:
+            continue
+        descriptor, temporal = tempfile.mkstemp(dir=destino, prefix=f'.{fichero}.')
+        os.close(descriptor)
+        try:
+            shutil.copyfile(origen, temporal)
+            os.replace(temporal, ruta)
+        except BaseException:
+            os.unlink(temporal)
+            raise
+        actualizados.append(fichero)
+    return actualizados
+
+
+def ejecutar_pipeline(ruta_csv=DIRECTORIO / 'base_datos_experta.csv', parametros_limpieza=None,
+                      parametros_entrenamiento=None, directorio_cache=DIRECTORIO_CACHE_DEFECTO,
+                      destino=DIRECTORIO, forzar=False):
+    """
+    Ejecuta limpiar → entrenar → publicar reutilizando la caché.
+
+    Args:
+        ruta_csv: CSV histórico de entrada
+        parametros_limpieza: Sobrescribe PARAMETROS_LIMPIEZA_DEFECTO
+        parametros_entrenamiento: Sobrescribe PARAMETROS_ENTRENAMIENTO_DEFECTO
+        directorio_cache: Directorio de la caché direccionada por contenido
+        destino: Directorio donde se publican los artefactos
+        forzar: Ejecutar todas las etapas aunque estén en caché
+
+    Returns:
+        Dict con 'ejecutadas', 'omitidas', 'publicados' y 'segundos'
+    """
+    inicio = time.perf_counter()
+    parametros = {
+        'limpiar': dict(PARAMETROS_LIMPIEZA_DEFECTO, **(parametros_limpieza or {})),
+        'entrenar': dict(PARAMETROS_ENTRENAMIENTO_DEFECTO, **(parametros_entrenamiento or {})),
+    }
+    directorio_cache = Path(directorio_cache)
+
+    ruta_csv = Path(ruta_csv)
+    disponibles = {'base_datos_experta.csv': (ruta_csv, _hash_fichero(ruta_csv))}
+    resultado = {'ejecutadas': [], 'omitidas': []}
+
+    # ETAPAS está en orden topológico
+    for etapa in ETAPAS:
+        if etapa.dependencias:
+            entradas = {f: disponibles[f] for dep in etapa.dependencias
+                        for f in next(e for e in ETAPAS if e.nombre == dep).salidas}
+        else:
+            entradas = {'base_datos_experta.csv': disponibles['base_datos_experta.csv']}
+
+        salidas, ejecutada = _ejecutar_etapa(etapa, entradas, parametros[etapa.nombre],
+                                             directorio_cache, forzar)
+        disponibles.update(salidas)
+        resultado['ejecutadas' if ejecutada else 'omitidas'].append(etapa.nombre)
+
+    resultado['publicados'] = publicar(disponibles, destino)
+    resultado['segundos'] = time.perf_counter() - inicio
+    return resultado
+
+
+if __name__ == "__main__":
+    r = ejecutar_pipeline(forzar='--forzar' in sys.argv[1:])
+
+    print("\n" + "=" * 80)
+    print("🔁 PIPELINE")
+    print("=" * 80)
+    print(f"  Ejecutadas: {', '.join(r['ejecutadas']) or '—'}")
+    print(f"  En caché:   {', '.join(r['omitidas']) or '—'}")
+    print(f"  Publicados: {', '.join(r['publicados']) or '— (sin cambios)'}")
+    print(f"  ⏱️  {r['segundos']*1000:.1f} ms")
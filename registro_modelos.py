@@ -0,0 +1,216 @@
+"""
+===============================================================================
+🗂️ REGISTRO DE MODELOS (recarga en caliente, thread-safe)
+===============================================================================
+
+Sustituye la caché en variables globales de logic.py:
+
+    • Cada versión se identifica por el hash SHA-256 del contenido de los
+      artefactos (config_modelo.json + modelo_lineal.npz).
+    • Si cambia el mtime/tamaño de un artefacto, la nueva versión se carga
+      entera y se publica con una única asignación (atómica): las sesiones en
+      curso siguen usando la versión que ya tenían.
+    • Cada petición obtiene una pareja (modelo, config) coherente: el
+      hash_artefacto y el orden de variables del JSON deben coincidir con
+      el .npz; si no (publicación a medias) se sigue sirviendo la vigente.
+      Sin JSON, la config se reconstruye desde el .npz.
+    • La versión anterior se mantiene cargada para poder hacer rollback.
+    • La comprobación de mtime se hace como mucho cada `intervalo_comprobacion`
+      segundos, de modo que una petición normal no toca el disco.
+
+===============================================================================
+"""
+
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from motor_inferencia import MotorLineal
+
+
+class VersionModelo:
+    """
+    Versión inmutable de un modelo publicado.
+
+    Atributos:
+        modelo: MotorLineal (o None si no hay artefactos)
+        config: Dict de config_modelo.json (o None)
+        hash: SHA-256 del contenido de los artefactos
+        cargado_en: time.time() de la carga
+    """
+
+    __slots__ = ('modelo', 'config', 'hash', 'cargado_en')
+
+    def __init__(self, modelo, config, hash, cargado_en):
+        self.modelo = modelo
+        self.config = config
+        self.hash = hash
+        self.cargado_en = cargado_en
+
+    def __iter__(self):
+        # Permite: modelo, config = registro.obtener()
+        return iter((self.modelo, self.config))
+
+    def __repr__(self):
+        return f"VersionModelo(hash={self.hash[:12]}, cargado_en={self.cargado_en:.0f})"
+
+
+VERSION_VACIA = VersionModelo(None, None, '', 0.0)
+
+
+def _verificar_pareja(config, modelo):
+    """
+    Comprueba que config_modelo.json corresponde al artefacto cargado.
+
+    publicar() reemplaza el .npz antes que el JSON: entre ambos reemplazos
+    el registro puede ver un artefacto nuevo con la config antigua. Con el
+    hash o el orden de variables distintos se lanza ValueError y
+    _comprobar sigue sirviendo la versión vigente hasta que llegue el par.
+    """
+    hash_config = config.get('hash_artefacto')
+    if hash_config is not None and hash_config != modelo.hash:
+        raise ValueError(f"config_modelo.json ({hash_config[:12]}…) no corresponde al artefacto "
+                         f"({modelo.hash[:12]}…)")
+    if list(config.get('variables_entrada', [])) != modelo.variables_entrada:
+        raise ValueError(f"Variables de config_modelo.json {config.get('variables_entrada')} distintas "
+                         f"de las del artefacto {modelo.variables_entrada}")
+
+
+class RegistroModelos:
+    """
+    Registro thread-safe de versiones del modelo con recarga en caliente.
+
+    Args:
+        ruta_config: Ruta a config_modelo.json (opcional si existe el .npz)
+        ruta_binario: Ruta a modelo_lineal.npz (opcional; si no existe se
+                      usan los coeficientes del JSON)
+        intervalo_comprobacion: Segundos mínimos entre comprobaciones de mtime
+    """
+
+    def __init__(self, ruta_config, ruta_binario=None, intervalo_comprobacion=2.0):
+        self.ruta_config = Path(ruta_config)
+        self.ruta_binario = Path(ruta_binario) if ruta_binario else None
+        self.intervalo_comprobacion = intervalo_comprobacion
+
+        self._lock = threading.Lock()
+        self._actual = VERSION_VACIA
+        self._anterior = None
+        self._firma = None
+        self._ultima_comprobacion = float('-inf')
+
+    # ========================================================================
+    # CONSULTA
+    # ========================================================================
+
+    def obtener(self):
+        """
+        Devuelve la versión vigente (modelo y config siempre coherentes).
+
+        Solo consulta el disco si ha pasado intervalo_comprobacion desde la
+        última comprobación.
+        """
+        if time.monotonic() - self._ultima_comprobacion >= self.intervalo_comprobacion:
+            self._comprobar()
+        return self._actual
+
+    @property
+    def version_anterior(self):
+        return self._anterior
+
+    # ========================================================================
+    # RECARGA
+    # ========================================================================
+
+    def _firma_archivos(self):
+        """(mtime_ns, tamaño) de cada artefacto, None si no existe"""
+        firma = []
+        for ruta in (self.ruta_config, self.ruta_binario):
+            if ruta is None:
+                continue
+            try:
+                st = os.stat(ruta)
+                firma.append((st.st_mtime_ns, st.st_size))
+            except FileNotFoundError:
+                firma.append(None)
+        return tuple(firma)
+
+    def _comprobar(self, forzar=False):
+        with self._lock:
+            # Otro hilo pudo comprobar mientras esperábamos el lock
+            ahora = time.monotonic()
+            if not forzar and ahora - self._ultima_comprobacion < self.intervalo_comprobacion:
+                return
+            self._ultima_comprobacion = ahora
+
+            firma = self._firma_archivos()
+            if not forzar and firma == self._firma:
+                return
+
+            try:
+                nueva = self._cargar_version()
+            except Exception as e:
+                # Se sigue sirviendo la versión vigente
+                print(f"⚠️ Error cargando modelo: {e}")
+                return
+
+            self._firma = firma
+            if nueva.hash == self._actual.hash:
+                return
+
+            self._anterior = self._actual if self._actual.modelo is not None else self._anterior
+            self._actual = nueva
+
+    def _cargar_version(self):
+        """
+        Lee los artefactos una sola vez y construye la versión completa.
+
+        Con el .npz presente config_modelo.json es opcional: si falta, la
+        config se reconstruye desde el artefacto (MotorLineal.a_config).
+        """
+        hay_config = self.ruta_config.exists()
+        hay_binario = self.ruta_binario is not None and self.ruta_binario.exists()
+        if not hay_config and not hay_binario:
+            return VERSION_VACIA
+
+        hasher = hashlib.sha256()
+
+        config = None
+        if hay_config:
+            contenido_config = self.ruta_config.read_bytes()
+            hasher.update(contenido_config)
+            config = json.loads(contenido_config)
+
+        if hay_binario:
+            contenido_binario = self.ruta_binario.read_bytes()
+            hasher.update(contenido_binario)
+            modelo = MotorLineal.desde_binario(io.BytesIO(contenido_binario))
+            if config is None:
+                config = modelo.a_config()
+            else:
+                _verificar_pareja(config, modelo)
+        else:
+            modelo = MotorLineal.desde_config(config)
+
+        return VersionModelo(modelo, config, hasher.hexdigest(), time.time())
+
+    def recargar(self):
+        """Fuerza la comprobación inmediata de los artefactos"""
+        self._comprobar(forzar=True)
+        return self._actual
+
+    def rollback(self):
+        """
+        Vuelve a publicar la versión anterior (que sigue cargada en memoria).
+
+        Returns:
+            La versión publicada tras el rollback
+        """
+        with self._lock:
+            if self._anterior is None:
+                raise ValueError("No hay versión anterior disponible para rollback")
+            self._actual, self._anterior = self._anterior, self._actual
+            return self._actual
@@ -7,6 +7,26 @@ import matplotlib.pyplot as plt
 import matplotlib
 matplotlib.use('Agg')
 
+# Grados de libertad (n - p) mínimos para mostrar los intervalos bootstrap
+# de los coeficientes en el reporte
+GL_MINIMO_INTERVALOS = 20
+
+def datos_modelo(config_modelo):
+    """
+    Campos de config_modelo.json que usa la diapositiva del modelo
+    (se añaden a los datos del reporte; {} sin modelo).
+    """
+    if not config_modelo:
+        return {}
+    return {
+        'r2_score': config_modelo['r2_score'],
+        'rmse': config_modelo['rmse'],
+        'mae': config_modelo['mae'],
+        'variables_entrada': config_modelo['variables_entrada'],
+        'n_muestras': config_modelo.get('n_muestras'),
+        'bootstrap': config_modelo.get('bootstrap'),
+    }
+
 def generar_reporte_pptx(datos, img_producto):
     """Función antigua - mantener para compatibilidad"""
     return generar_reporte_pptx_mejorado(datos, img_producto)
@@ -210,13 +230,15 @@ def generar_reporte_pptx_mejorado(datos, img_producto):
     p.font.size = Pt(14)
     p.font.bold = True
     
-    items = [
-        "Algoritmo: Mínimos Cuadrados Ordinarios (OLS)",
-        "Datos de Entrenamiento: 8 proyectos históricos",
-        "Variables Independientes: SPW, Peso, ANCHO_ASSY",
-        f"R² Score: {datos.get('r2_score', 0.70):.2%} (varianza explicada)",
-        f"RMSE: ~14.80 segundos (error típico)"
-    ]
+    # Datos del modelo vigente (datos_modelo): nada escrito a mano
+    items = ["Algoritmo: Mínimos Cuadrados Ordinarios (OLS)"]
+    if datos.get('n_muestras'):
+        items.append(f"Datos de Entrenamiento: {datos['n_muestras']} proyectos históricos")
+    if datos.get('variables_entrada'):
+        items.append(f"Variables Independientes: {', '.join(datos['variables_entrada'])}")
+    items.append(f"R² Score: {datos.get('r2_score', 0.70):.2%} (varianza explicada)")
+    if datos.get('rmse') is not None:
+        items.append(f"RMSE: {datos['rmse']:.2f} segundos (error típico)")
     
     for item in items:
         p = tf.add_paragraph()
@@ -224,6 +246,34 @@ def generar_reporte_pptx_mejorado(datos, img_producto):
         p.font.size = Pt(12)
         p.level = 1
     
+    # Intervalos de confianza bootstrap de los pesos (si el modelo los trae).
+    # Con pocos grados de libertad (n - p) no significan nada: se omiten y
+    # se indica por qué
+    bootstrap = datos.get('bootstrap')
+    n = datos.get('n_muestras')
+    gl = n - len(datos.get('variables_entrada') or []) - 1 if n else None
+    if bootstrap and (gl is None or gl < GL_MINIMO_INTERVALOS):
+        p = tf.add_paragraph()
+        p.text = (f"Intervalos de los coeficientes no mostrados: n = {n}, gl = {gl} "
+                  f"(mínimo {GL_MINIMO_INTERVALOS})" if n else
+                  "Intervalos de los coeficientes no mostrados: tamaño de muestra desconocido")
+        p.font.size = Pt(11)
+        p.level = 1
+    elif bootstrap:
+        p = tf.add_paragraph()
+        p.text = f"Intervalos de confianza {bootstrap['nivel']:.0%} (bootstrap, n = {n}, gl = {gl}):"
+        p.font.size = Pt(12)
+        p.font.bold = True
+        p.level = 1
+        
+        for var, (inferior, superior) in bootstrap['intervalos'].items():
+            if var == 'intercept':
+                continue
+            p = tf.add_paragraph()
+            p.text = f"{var}: [{inferior:.4g}, {superior:.4g}]"
+            p.font.size = Pt(11)
+            p.level = 2
+    
     # ====================================================================
     # DIAPOSITIVA 6: NOTAS IMPORTANTES
     # ====================================================================
@@ -240,11 +290,19 @@ def generar_reporte_pptx_mejorado(datos, img_producto):
     p.font.size = Pt(14)
     p.font.bold = True
     
+    # Intervalo de predicción de esta oferta si el modelo lo proporciona;
+    # si no, el MAE global como margen orientativo
+    if datos.get('t_ciclo_inferior') is not None:
+        margen = (f"Intervalo de predicción {datos.get('nivel_intervalo', 0.95):.0%}: "
+                  f"[{datos['t_ciclo_inferior']:.1f}, {datos['t_ciclo_superior']:.1f}] segundos")
+    else:
+        margen = f"Margen de error estimado: ±{datos.get('mae', 11):.1f} segundos"
+    
     items = [
         "El modelo se basa en datos históricos de procesos similares.",
         "La precisión depende de la consistencia de datos y procesos.",
         "Se recomienda validar con pruebas piloto antes de inversión.",
-        f"Margen de error estimado: ±{datos.get('mae', 11):.1f} segundos",
+        margen,
         "Para procesamiento manual (MOD), aplicar factores de seguridad."
     ]
     
@@ -29,17 +29,27 @@ else:
 
 sys.path.insert(0, str(BASE_DIR))
 
-from logic import calcular_ciclo_completo, calcular_capacidad_y_mod
-from report_gen import generar_reporte_pptx_mejorado
+from cache_predicciones import calcular_ciclo_cacheado, calcular_capacidad_cacheada, configurar_cache
+from report_gen import datos_modelo, generar_reporte_pptx_mejorado
+from comparables import obtener_indice
+from almacen_historico import contar_filas, leer_filas, leer_historico, resolver_historico
 
 # ============================================================================
 # CONFIGURACIÓN
 # ============================================================================
 
 DB_FILE = BASE_DIR / "base_datos_experta.csv"
-DB_LIMPIA = BASE_DIR / "base_datos_limpia.csv"
+DB_LIMPIA = BASE_DIR / "base_datos_limpia.parquet"   # el .csv hermano es solo exportación
 CONFIG_FILE = BASE_DIR / "config_modelo.json"
 
+# La caché de predicciones vive fuera de BASE_DIR (en el ejecutable es un
+# directorio temporal) para que sobreviva entre ejecuciones
+CACHE_DIR = Path.home() / ".gestamp_estimador"
+CACHE_FILE = CACHE_DIR / "cache_predicciones.sqlite"
+
+# Número de proyectos históricos que muestra "Buscar comparables"
+K_COMPARABLES = 5
+
 # ============================================================================
 # CLASE PRINCIPAL DE LA APLICACIÓN
 # ============================================================================
@@ -50,10 +60,20 @@ class GestampEstimadorApp:
         self.root.title("Gestamp Factory 21 v3.1 - Estimador Modular")
         self.root.geometry("1400x900")
         
+        # Caché de predicciones persistente
+        try:
+            CACHE_DIR.mkdir(exist_ok=True)
+            configurar_cache(max_entradas=4096, ttl=30 * 24 * 3600, ruta_sqlite=CACHE_FILE)
+        except Exception as e:
+            print(f"⚠️ Caché persistente no disponible, se usa solo memoria: {e}")
+        
         # Cargar configuración del modelo
         self.config_modelo = self.cargar_config_modelo()
         self.factor_ia = self.obtener_factor_ia()
         
+        # (mtime de la base limpia, índice de comparables); se abre al buscar
+        self.indice_comparables = None
+        
         # Variables para almacenar foto del producto
         self.img_producto = None
         
@@ -70,10 +90,10 @@ class GestampEstimadorApp:
     
     def obtener_factor_ia(self):
         """Obtener factor IA basado en el R² del modelo"""
-        if DB_LIMPIA.exists():
+        if resolver_historico(DB_LIMPIA) is not None:
             try:
-                df_temp = pd.read_csv(DB_LIMPIA)
-                if not df_temp.empty:
+                # Solo el nº de filas: del pie del Parquet, sin leer datos
+                if contar_filas(DB_LIMPIA) > 0:
                     if self.config_modelo:
                         return 1.0 + (self.config_modelo.get('r2_score', 0.7) - 0.7) * 0.1
             except Exception as e:
@@ -322,6 +342,11 @@ class GestampEstimadorApp:
                  bg="#9C27B0", fg="white", font=("Arial", 12, "bold"),
                  width=40, height=2).pack(pady=10)
         
+        tk.Button(self.tab_historico, text=f"🔎 BUSCAR {K_COMPARABLES} PROYECTOS COMPARABLES",
+                 command=self.buscar_comparables,
+                 bg="#673AB7", fg="white", font=("Arial", 12, "bold"),
+                 width=40, height=2).pack(pady=10)
+        
         # Frame para tabla
         self.frame_tabla_historico = tk.Frame(self.tab_historico)
         self.frame_tabla_historico.pack(fill=tk.BOTH, expand=True, padx=20, pady=10)
@@ -416,8 +441,8 @@ class GestampEstimadorApp:
             peso = float(self.entry_peso.get())
             
             # Calcular
-            res_f1 = calcular_ciclo_completo(spw, mastico, tox, 0, tuercas, tuckers, marcado, self.factor_ia)
-            t_man, n_mod, sat, cap_max, res_anual = calcular_capacidad_y_mod(
+            res_f1 = calcular_ciclo_cacheado(spw, mastico, tox, 0, tuercas, tuckers, marcado, self.factor_ia, peso)
+            t_man, n_mod, sat, cap_max, res_anual = calcular_capacidad_cacheada(
                 res_f1['t_ciclo'], dias, turnos, horas, volumenes, p_kit, p_rack, peso
             )
             
@@ -432,6 +457,10 @@ class GestampEstimadorApp:
             self.text_resultados.insert(tk.END, "MÉTRICAS PRINCIPALES:\n")
             self.text_resultados.insert(tk.END, "-"*100 + "\n")
             self.text_resultados.insert(tk.END, f"⏱️  Tiempo de Ciclo:     {res_f1['t_ciclo']:.2f} segundos\n")
+            if res_f1.get('t_ciclo_inferior') is not None:
+                self.text_resultados.insert(
+                    tk.END, f"   Intervalo {res_f1['nivel_intervalo']:.0%}:        "
+                            f"[{res_f1['t_ciclo_inferior']:.1f}, {res_f1['t_ciclo_superior']:.1f}] segundos\n")
             self.text_resultados.insert(tk.END, f"🤖 MOD:                  {n_mod} módulos\n")
             self.text_resultados.insert(tk.END, f"📊 Saturación:           {sat*100:.1f}%\n")
             self.text_resultados.insert(tk.END, f"📈 Capacidad Máxima:     {cap_max:,.0f} piezas/año\n")
@@ -470,7 +499,12 @@ class GestampEstimadorApp:
                 "spw": spw,
                 "peso": peso,
                 "cap_max": cap_max,
-                "res_anual": res_anual
+                "res_anual": res_anual,
+                "t_ciclo_inferior": res_f1.get('t_ciclo_inferior'),
+                "t_ciclo_superior": res_f1.get('t_ciclo_superior'),
+                "nivel_intervalo": res_f1.get('nivel_intervalo'),
+                "mae": 11,
+                **datos_modelo(self.config_modelo),
             }
             
             messagebox.showinfo("Éxito", "Análisis completado correctamente")
@@ -529,7 +563,7 @@ class GestampEstimadorApp:
             peso = float(self.entry_peso.get())
             
             # Calcular tiempo base
-            res_base = calcular_ciclo_completo(spw, mastico, tox, 0, tuercas, tuckers, marcado, self.factor_ia)
+            res_base = calcular_ciclo_cacheado(spw, mastico, tox, 0, tuercas, tuckers, marcado, self.factor_ia, peso)
             t_base = res_base['t_ciclo']
             
             # Análisis para SPW
@@ -538,7 +572,7 @@ class GestampEstimadorApp:
             
             for pct in variaciones_pct:
                 spw_temp = spw * (1 + pct/100)
-                res_temp = calcular_ciclo_completo(spw_temp, mastico, tox, 0, tuercas, tuckers, marcado, self.factor_ia)
+                res_temp = calcular_ciclo_cacheado(spw_temp, mastico, tox, 0, tuercas, tuckers, marcado, self.factor_ia, peso)
                 tiempos_spw.append(res_temp['t_ciclo'])
             
             # Crear gráfico para SPW
@@ -561,46 +595,80 @@ class GestampEstimadorApp:
         except Exception as e:
             messagebox.showerror("Error", f"Error en análisis de sensibilidad:\n{str(e)}")
     
+    def _mostrar_tabla_historico(self, df):
+        """Sustituye el contenido de la pestaña de histórico por una tabla"""
+        # Limpiar frame anterior
+        for widget in self.frame_tabla_historico.winfo_children():
+            widget.destroy()
+        
+        # Crear treeview
+        tree = ttk.Treeview(self.frame_tabla_historico, show='headings')
+        tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        
+        # Scrollbars
+        vsb = ttk.Scrollbar(self.frame_tabla_historico, orient="vertical", command=tree.yview)
+        vsb.pack(side=tk.RIGHT, fill=tk.Y)
+        hsb = ttk.Scrollbar(self.frame_tabla_historico, orient="horizontal", command=tree.xview)
+        hsb.pack(side=tk.BOTTOM, fill=tk.X)
+        
+        tree.configure(yscrollcommand=vsb.set, xscrollcommand=hsb.set)
+        
+        # Configurar columnas
+        tree['columns'] = list(df.columns)
+        for col in df.columns:
+            tree.heading(col, text=col)
+            tree.column(col, width=120)
+        
+        # Insertar datos
+        for row in df.itertuples(index=False):
+            tree.insert('', tk.END, values=list(row))
+    
     def cargar_historico(self):
         """Cargar y mostrar datos históricos"""
         try:
-            # Limpiar frame anterior
-            for widget in self.frame_tabla_historico.winfo_children():
-                widget.destroy()
-            
-            if not DB_LIMPIA.exists():
+            if resolver_historico(DB_LIMPIA) is None:
                 messagebox.showwarning("Advertencia", 
                                       "Base de datos histórica limpia no encontrada")
                 return
             
-            df_historico = pd.read_csv(DB_LIMPIA)
+            df_historico = leer_historico(DB_LIMPIA)
+            self._mostrar_tabla_historico(df_historico)
             
-            # Crear treeview
-            tree = ttk.Treeview(self.frame_tabla_historico, show='headings')
-            tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+            messagebox.showinfo("Éxito", f"Cargados {len(df_historico)} registros históricos")
             
-            # Scrollbars
-            vsb = ttk.Scrollbar(self.frame_tabla_historico, orient="vertical", command=tree.yview)
-            vsb.pack(side=tk.RIGHT, fill=tk.Y)
-            hsb = ttk.Scrollbar(self.frame_tabla_historico, orient="horizontal", command=tree.xview)
-            hsb.pack(side=tk.BOTTOM, fill=tk.X)
+        except Exception as e:
+            messagebox.showerror("Error", f"Error al cargar histórico:\n{str(e)}")
+    
+    def buscar_comparables(self):
+        """Mostrar los proyectos históricos más parecidos a la oferta actual"""
+        try:
+            ruta_historico = resolver_historico(DB_LIMPIA)
+            if ruta_historico is None:
+                messagebox.showwarning("Advertencia", 
+                                      "Base de datos histórica limpia no encontrada")
+                return
             
-            tree.configure(yscrollcommand=vsb.set, xscrollcommand=hsb.set)
+            # El índice se reabre solo si la base limpia ha cambiado
+            mtime = ruta_historico.stat().st_mtime_ns
+            if self.indice_comparables is None or self.indice_comparables[0] != mtime:
+                self.indice_comparables = (mtime, obtener_indice(DB_LIMPIA))
+            indice = self.indice_comparables[1]
             
-            # Configurar columnas
-            tree['columns'] = list(df_historico.columns)
-            for col in df_historico.columns:
-                tree.heading(col, text=col)
-                tree.column(col, width=120)
+            consulta = {'SPW': int(self.spin_spw.get()), 'Peso': float(self.entry_peso.get())}
+            vecinos = indice.buscar(consulta, k=K_COMPARABLES)
             
-            # Insertar datos
-            for idx, row in df_historico.iterrows():
-                tree.insert('', tk.END, values=list(row))
+            # Solo se leen los grupos de filas del Parquet que contienen a los vecinos
+            df_vecinos = leer_filas(DB_LIMPIA, vecinos['indices'])
+            df_vecinos.insert(0, 'Distancia', np.round(vecinos['distancias'], 3))
+            self._mostrar_tabla_historico(df_vecinos)
             
-            messagebox.showinfo("Éxito", f"Cargados {len(df_historico)} registros históricos")
+            messagebox.showinfo("Comparables",
+                               f"{len(df_vecinos)} proyectos más parecidos "
+                               f"({', '.join(vecinos['variables'])})\n"
+                               f"Tiempo medio real: {np.mean(vecinos['tiempos']):.2f}s")
             
         except Exception as e:
-            messagebox.showerror("Error", f"Error al cargar histórico:\n{str(e)}")
+            messagebox.showerror("Error", f"Error al buscar comparables:\n{str(e)}")
 
 # ============================================================================
 # FUNCIÓN PRINCIPAL